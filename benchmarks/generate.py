@@ -0,0 +1,110 @@
+# Deterministic synthetic history for benchmarking DevFlow at scale
+
+import os
+import sys
+import random
+import itertools
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devflow import DevFlowDB, _epoch
+
+BATCH_SIZE = 10000
+
+NOTE_TEXTS = [
+    'Fixed flaky test in the parser', 'Refactored session storage', 'Reviewed pull request',
+    'Investigated slow query on stats', 'Paired on the export format', 'Wrote migration for rollups',
+    'Cleaned up template walker', 'Profiled heatmap rendering', 'Updated documentation',
+]
+TAG_NAMES = ['bugfix', 'feature', 'refactor', 'review', 'docs', 'perf', 'ops', 'spike']
+
+def _sessions(count, projects, days, end_date, rng):
+    # Sessions are spread evenly over `days` ending at `end_date`, in start
+    # order, with 5 minute to 3 hour durations and a weekday-heavy mix
+    names = [f'project-{index:03d}' for index in range(projects)]
+    # Zipf-like popularity, so a few projects dominate as in real histories
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(projects)))
+    end = datetime.datetime.combine(end_date, datetime.time(23, 0))
+    span = days * 86400
+    step = span / count
+    for index in range(count):
+        start = end - datetime.timedelta(seconds=span - int(index * step) - rng.randrange(max(1, int(step))))
+        if start.weekday() >= 5 and rng.random() < 0.6:
+            start -= datetime.timedelta(days=2)
+        duration = rng.randrange(300, 3 * 3600)
+        finish = start + datetime.timedelta(seconds=duration)
+        project = rng.choices(names, cum_weights=cum_weights)[0]
+        files = rng.randrange(0, 40)
+        yield (
+            project, f'/home/dev/src/{project}', start.isoformat(), finish.isoformat(), duration,
+            files, files * rng.randrange(0, 30), files * rng.randrange(0, 15),
+            _epoch(start), _epoch(finish), start.strftime('%Y-%m-%d')
+        )
+
+def generate(db_path, sessions=10000, projects=20, days=730, seed=0, end_date=None):
+    # Same arguments (including end_date) always produce the same rows
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date.today()
+    db = DevFlowDB(db_path)
+    
+    with db.transaction() as cursor:
+        batch = []
+        for row in _sessions(sessions, projects, days, end_date, rng):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                _insert_sessions(cursor, batch)
+                batch = []
+        _insert_sessions(cursor, batch)
+        
+        # Roughly one note per ten sessions and one or two tags per four
+        first_id, last_id = cursor.execute('SELECT MIN(id), MAX(id) FROM sessions').fetchone()
+        notes = []
+        tags = []
+        for session_id in range(first_id, last_id + 1):
+            if rng.random() < 0.1:
+                notes.append((session_id, rng.choice(NOTE_TEXTS)))
+            if rng.random() < 0.25:
+                for tag in rng.sample(TAG_NAMES, rng.randrange(1, 3)):
+                    tags.append((session_id, tag))
+        cursor.executemany('INSERT INTO notes (session_id, content) VALUES (?, ?)', notes)
+        cursor.executemany('INSERT INTO tags (session_id, tag_name) VALUES (?, ?)', tags)
+        cursor.execute('UPDATE notes SET created_at = (SELECT end_time FROM sessions WHERE id = notes.session_id)')
+        
+        cursor.execute(
+            "INSERT INTO goals (goal_type, target_value, date) VALUES ('daily', 240, ?)",
+            (end_date.strftime('%Y-%m-%d'),)
+        )
+    
+    # Activity, rollups, streaks and achievements come from the sessions
+    # exactly as an import would build them
+    db.rebuild_derived()
+    db.close()
+    return {'sessions': sessions, 'projects': projects, 'days': days, 'seed': seed,
+            'end_date': end_date.isoformat(), 'notes': len(notes), 'tags': len(tags)}
+
+def _insert_sessions(cursor, rows):
+    cursor.executemany(
+        '''INSERT INTO sessions (project_name, project_path, start_time, end_time, duration,
+                                 files_changed, lines_added, lines_removed, start_ts, end_ts, start_date, active)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)''',
+        rows
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a DevFlow database with synthetic history')
+    parser.add_argument('db_path', help='Database to create (must not exist)')
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--days', type=int, default=730, help='Days of history')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end-date', type=datetime.date.fromisoformat, help='Last day of history (default: today)')
+    args = parser.parse_args()
+    
+    if os.path.exists(args.db_path):
+        parser.error(f'{args.db_path} already exists')
+    print(generate(args.db_path, args.sessions, args.projects, args.days, args.seed, args.end_date))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+# Times DevFlow CLI commands and DevFlowDB methods against synthetic
+# histories of increasing size and records the results as JSON.
+#
+#   python benchmarks/run.py --sizes 10000 100000 -o results.json
+#   python benchmarks/run.py --sizes 10000 --compare results.json
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import platform
+import argparse
+import datetime
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import devflow
+from devflow import DevFlowCLI
+from generate import generate
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+TEMPLATE_FILES = 2000
+
+def _db_benchmarks(db, project):
+    return [
+        ('db.get_project_totals(7)', lambda: db.get_project_totals(7)),
+        ('db.get_project_totals(365)', lambda: db.get_project_totals(365)),
+        ('db.get_project_leaderboard(30)', lambda: db.get_project_leaderboard(30)),
+        ('db.get_time_distribution', lambda: db.get_time_distribution(project, 30)),
+        ('db.get_weekly_summary', lambda: db.get_weekly_summary(project)),
+        ('db.get_productivity_score', lambda: db.get_productivity_score(project, 30)),
+        ('db.get_daily_minutes(1y)', lambda: db.get_daily_minutes(devflow._cutoff_date(365))),
+        ('db.get_current_streak', db.get_current_streak),
+        ('db.get_achievements', db.get_achievements),
+        ('db.get_notes', db.get_notes),
+        ('db.get_session_tags', lambda: db.get_session_tags(1)),
+        ('db.iter_table(sessions)', lambda: sum(1 for _ in db.iter_table('sessions')[1])),
+    ]
+
+def _cli_benchmarks(cli, workdir):
+    # Each repeat creates a fresh template and applies one that exists
+    created = []
+    applied = []
+    export_path = os.path.join(workdir, 'export.ndjson')
+    tree = os.path.join(workdir, 'tree')
+    
+    def create_template():
+        cwd = os.getcwd()
+        os.chdir(tree)
+        try:
+            cli.create_template(f'bench-{len(created)}')
+        finally:
+            os.chdir(cwd)
+        created.append(True)
+    
+    def use_template():
+        index = len(applied) % len(created)
+        cli.use_template(f'bench-{index}', os.path.join(workdir, f'out-{len(applied)}'))
+        applied.append(True)
+    
+    def session_cycle():
+        cli.start_session('bench-cycle')
+        cli.stop_session()
+    
+    return [
+        ('cli.show_status', cli.show_status),
+        ('cli.show_stats', cli.show_stats),
+        ('cli.show_heatmap(12)', cli.show_heatmap),
+        ('cli.show_heatmap(52)', lambda: cli.show_heatmap(52)),
+        ('cli.show_heatmap(520)', lambda: cli.show_heatmap(520)),
+        ('cli.show_heatmap(52, project)', lambda: cli.show_heatmap(52, 'project-000')),
+        ('cli.show_leaderboard', cli.show_leaderboard),
+        ('cli.show_weekly_summary', lambda: cli.show_weekly_summary('project-000')),
+        ('cli.show_streak', cli.show_streak),
+        ('cli.show_productivity_score', cli.show_productivity_score),
+        ('cli.show_achievements', cli.show_achievements),
+        ('cli.show_insights', cli.show_insights),
+        ('cli.list_notes', cli.list_notes),
+        ('cli.export_data(ndjson)', lambda: cli.export_data('ndjson', export_path)),
+        ('cli.import_data(duplicates)', lambda: cli.import_data(export_path)),
+        ('cli.create_template', create_template),
+        ('cli.use_template', use_template),
+        ('cli.start_stop_session', session_cycle),
+        # Analytics again, served from a fresh columnar snapshot
+        ('db.build_session_columns(full)', lambda: cli.db.build_session_columns(True)),
+        ('db.get_project_totals(7, snapshot)', lambda: cli.db.get_project_totals(7)),
+        ('db.get_project_totals(90, snapshot)', lambda: cli.db.get_project_totals(90)),
+        ('cli.show_stats(snapshot)', cli.show_stats),
+        ('cli.show_leaderboard(snapshot)', cli.show_leaderboard),
+        # Derived-table rebuilds last; they rewrite what the others read
+        ('db.rebuild_activity', cli.db.rebuild_activity),
+        ('db.rebuild_rollups', cli.db.rebuild_rollups),
+        ('db.rebuild_streaks', cli.db.rebuild_streaks),
+        ('db.backfill_achievements', cli.db.backfill_achievements),
+    ]
+
+PROCESS_COMMANDS = [
+    ['status'], ['prompt'], ['stats'], ['heatmap'], ['leaderboard'], ['streak'], ['insights'],
+]
+
+def _time(func, repeat):
+    runs = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - started)
+    return {'best': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+def _write_tree(root):
+    # Deterministic project tree for the template benchmarks
+    for index in range(TEMPLATE_FILES):
+        directory = os.path.join(root, f'pkg{index % 40:02d}', f'mod{index % 7}')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'file{index}.py'), 'w') as f:
+            f.write(f'# module {index}\n' + 'value = 1\n' * (index % 50))
+
+def _dataset(data_dir, sessions, projects, seed, end_date):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'{sessions}-{projects}-{seed}-{end_date}.db')
+    info_path = path + '.json'
+    if not os.path.exists(info_path):
+        started = time.perf_counter()
+        info = generate(path, sessions, projects, seed=seed, end_date=end_date)
+        info['generate_seconds'] = time.perf_counter() - started
+        # Fold the WAL in so the dataset is a single file to copy
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.close()
+        with open(info_path, 'w') as f:
+            json.dump(info, f)
+    with open(info_path) as f:
+        return path, json.load(f)
+
+def run_size(args, sessions):
+    db_file, info = _dataset(args.data_dir, sessions, args.projects, args.seed, args.end_date)
+    workdir = tempfile.mkdtemp(prefix=f'devflow-bench-{sessions}-')
+    home = os.path.join(workdir, 'home')
+    os.makedirs(os.path.join(home, '.devflow'))
+    shutil.copyfile(db_file, os.path.join(home, '.devflow', 'devflow.db'))
+    _write_tree(os.path.join(workdir, 'tree'))
+    
+    results = {}
+    previous_home = os.environ.get('HOME')
+    os.environ['HOME'] = home
+    os.environ['DEVFLOW_NO_SERVER'] = '1'
+    try:
+        started = time.perf_counter()
+        cli = DevFlowCLI()
+        results['cli.open'] = {'best': time.perf_counter() - started, 'median': None, 'runs': []}
+        
+        benchmarks = _db_benchmarks(cli.db, 'project-000') + _cli_benchmarks(cli, workdir)
+        for name, func in benchmarks:
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            results[name] = _time(func, args.repeat)
+            print(f"  {sessions:>8} {name:<32} {results[name]['best'] * 1000:10.1f} ms", file=sys.stderr)
+        # Process timings below measure the plain SQLite paths
+        cli.db.clear_session_columns()
+        cli.close()
+        
+        # Whole-process timings include interpreter startup and imports
+        for command in PROCESS_COMMANDS:
+            name = 'process.devflow ' + ' '.join(command)
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            results[name] = _time(lambda: subprocess.run(
+                [sys.executable, os.path.join(ROOT, 'devflow'), *command],
+                stdout=subprocess.DEVNULL, check=True
+            ), args.repeat)
+            print(f"  {sessions:>8} {name:<32} {results[name]['best'] * 1000:10.1f} ms", file=sys.stderr)
+    finally:
+        if previous_home is None:
+            os.environ.pop('HOME', None)
+        else:
+            os.environ['HOME'] = previous_home
+        os.environ.pop('DEVFLOW_NO_SERVER', None)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return info, results
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current, threshold, min_delta):
+    # Prints best-time ratios per benchmark; returns the regressions.
+    # Sub-millisecond timings are too noisy for ratios alone.
+    regressions = []
+    for size, results in current['results'].items():
+        base = baseline['results'].get(size, {})
+        for name, result in results.items():
+            if name not in base or not base[name]['best']:
+                continue
+            ratio = result['best'] / base[name]['best']
+            flag = ''
+            if ratio > threshold and result['best'] - base[name]['best'] > min_delta:
+                flag = '  REGRESSION'
+                regressions.append((size, name, ratio))
+            print(f"{size:>8} {name:<32} {base[name]['best'] * 1000:10.1f} -> "
+                  f"{result['best'] * 1000:10.1f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DevFlow against synthetic histories')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Session counts to test')
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--end-date', default=datetime.date.today().isoformat(),
+                        help='Last day of generated history; fix it when comparing runs from different days')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='Only run benchmarks whose name contains one of these')
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'benchmarks', '.data'),
+                        help='Where generated datasets are cached')
+    parser.add_argument('--keep', action='store_true', help='Keep the per-size working directories')
+    parser.add_argument('--output', '-o', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown ratio reported as a regression')
+    parser.add_argument('--min-delta', type=float, default=0.002,
+                        help='Ignore slowdowns smaller than this many seconds')
+    args = parser.parse_args()
+    args.end_date = datetime.date.fromisoformat(args.end_date)
+    
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'projects': args.projects,
+            'seed': args.seed,
+            'end_date': args.end_date.isoformat(),
+            'repeat': args.repeat,
+        },
+        'datasets': {},
+        'results': {},
+    }
+    for sessions in args.sizes:
+        info, results = run_size(args, sessions)
+        report['datasets'][str(sessions)] = info
+        report['results'][str(sessions)] = results
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold, args.min_delta)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,1042 +1,4531 @@
-import os
-import sys
-import json
-import time
-import datetime
-import argparse
-import sqlite3
-import hashlib
-import subprocess
-from pathlib import Path
-from collections import defaultdict, Counter
-
-class DevFlowDB:
-    
-    def __init__(self, db_path=None):
-        if db_path is None:
-            db_path = Path.home() / '.devflow' / 'devflow.db'
-        
-        self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(exist_ok=True)
-        self.init_database()
-    
-    def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_name TEXT NOT NULL,
-                project_path TEXT,
-                start_time TIMESTAMP NOT NULL,
-                end_time TIMESTAMP,
-                duration INTEGER,
-                files_changed INTEGER DEFAULT 0,
-                lines_added INTEGER DEFAULT 0,
-                lines_removed INTEGER DEFAULT 0,
-                active BOOLEAN DEFAULT 1
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                files TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                goal_type TEXT NOT NULL,
-                target_value INTEGER NOT NULL,
-                current_value INTEGER DEFAULT 0,
-                date TEXT NOT NULL,
-                completed BOOLEAN DEFAULT 0
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS activity (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                project_name TEXT NOT NULL,
-                minutes_coded INTEGER NOT NULL,
-                UNIQUE(date, project_name)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS streaks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                start_date TEXT NOT NULL,
-                end_date TEXT,
-                length INTEGER DEFAULT 1,
-                active BOOLEAN DEFAULT 1
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS achievements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                earned_date TEXT,
-                project_name TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(session_id) REFERENCES sessions(id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                tag_name TEXT NOT NULL,
-                FOREIGN KEY(session_id) REFERENCES sessions(id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def execute_query(self, query, params=None, fetch=False, fetch_one=False):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
-        result = None
-        if fetch_one:
-            result = cursor.fetchone()
-        elif fetch:
-            result = cursor.fetchall()
-        else:
-            result = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
-        return result
-
-    def update_streak(self, project_name):
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        yesterday = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM streaks WHERE active = 1 ORDER BY id DESC LIMIT 1')
-        current_streak = cursor.fetchone()
-        
-        if current_streak:
-            start_date, end_date, length = current_streak[1], current_streak[2], current_streak[3]
-            
-            cursor.execute('SELECT * FROM activity WHERE date = ? AND project_name = ?', (yesterday, project_name))
-            if cursor.fetchone() or end_date == yesterday:
-                cursor.execute('UPDATE streaks SET end_date = ?, length = ? WHERE id = ?', (today, length + 1, current_streak[0]))
-            else:
-                cursor.execute('UPDATE streaks SET active = 0 WHERE id = ?', (current_streak[0],))
-                cursor.execute('INSERT INTO streaks (start_date, end_date, length) VALUES (?, ?, ?)', (today, today, 1))
-        else:
-            cursor.execute('INSERT INTO streaks (start_date, end_date, length) VALUES (?, ?, ?)', (today, today, 1))
-        
-        conn.commit()
-        conn.close()
-
-    def check_achievements(self, project_name, session_duration):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        achievements_to_award = []
-        
-        cursor.execute('SELECT COUNT(*) FROM sessions WHERE project_name = ?', (project_name,))
-        session_count = cursor.fetchone()[0]
-        if session_count == 1:
-            achievements_to_award.append(("First Steps", "Completed your first coding session"))
-        
-        if session_duration >= 240:
-            achievements_to_award.append(("Marathon Coder", "Coded for 4+ hours in a single session"))
-        
-        cursor.execute('SELECT MAX(length) FROM streaks')
-        max_streak = cursor.fetchone()[0] or 0
-        if max_streak >= 7:
-            achievements_to_award.append(("Week Warrior", "Maintained a 7-day coding streak"))
-        
-        current_hour = datetime.datetime.now().hour
-        if current_hour < 8:
-            achievements_to_award.append(("Early Bird", "Started coding before 8 AM"))
-        elif current_hour >= 22:
-            achievements_to_award.append(("Night Owl", "Coded past 10 PM"))
-        
-        for name, description in achievements_to_award:
-            cursor.execute('SELECT * FROM achievements WHERE name = ? AND project_name = ?', (name, project_name))
-            if not cursor.fetchone():
-                cursor.execute('INSERT INTO achievements (name, description, earned_date, project_name) VALUES (?, ?, ?, ?)',
-                             (name, description, datetime.datetime.now().strftime('%Y-%m-%d'), project_name))
-                print(f"Achievement unlocked: {name} - {description}")
-        
-        conn.commit()
-        conn.close()
-
-    def add_note(self, session_id, content):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO notes (session_id, content) VALUES (?, ?)', (session_id, content))
-        conn.commit()
-        conn.close()
-
-    def get_notes(self, session_id=None):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if session_id:
-            cursor.execute('SELECT * FROM notes WHERE session_id = ? ORDER BY created_at', (session_id,))
-        else:
-            cursor.execute('SELECT * FROM notes ORDER BY created_at DESC LIMIT 20')
-        
-        notes = cursor.fetchall()
-        conn.close()
-        return notes
-
-    def get_achievements(self, project_name=None):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if project_name:
-            cursor.execute('SELECT * FROM achievements WHERE project_name = ? ORDER BY earned_date DESC', (project_name,))
-        else:
-            cursor.execute('SELECT * FROM achievements ORDER BY earned_date DESC')
-        
-        achievements = cursor.fetchall()
-        conn.close()
-        return achievements
-
-    def get_current_streak(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT length FROM streaks WHERE active = 1 ORDER BY id DESC LIMIT 1')
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else 0
-
-    def get_productivity_score(self, project_name, days=7):
-        end_date = datetime.datetime.now()
-        start_date = end_date - datetime.timedelta(days=days)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT duration FROM sessions WHERE project_name = ? AND start_time >= ? AND end_time IS NOT NULL',
-            (project_name, start_date.strftime('%Y-%m-%d %H:%M:%S'))
-        )
-        sessions = cursor.fetchall()
-        conn.close()
-        
-        total_minutes = sum(session[0] for session in sessions) if sessions else 0
-        target_minutes = days * 60
-        score = min(100, (total_minutes / target_minutes) * 100) if target_minutes > 0 else 0
-        
-        return round(score, 1)
-
-    def get_weekly_summary(self, project_name):
-        end_date = datetime.datetime.now()
-        start_date = end_date - datetime.timedelta(days=7)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT COUNT(*), SUM(duration), AVG(duration), SUM(files_changed), SUM(lines_added), SUM(lines_removed) FROM sessions WHERE project_name = ? AND start_time >= ? AND end_time IS NOT NULL',
-            (project_name, start_date.strftime('%Y-%m-%d %H:%M:%S'))
-        )
-        result = cursor.fetchone()
-        conn.close()
-        
-        return {
-            'session_count': result[0] or 0,
-            'total_time': result[1] or 0,
-            'avg_session': result[2] or 0,
-            'files_changed': result[3] or 0,
-            'lines_added': result[4] or 0,
-            'lines_removed': result[5] or 0,
-            'productivity_score': self.get_productivity_score(project_name, 7),
-            'current_streak': self.get_current_streak()
-        }
-
-    def add_session_tag(self, session_id, tag_name):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO tags (session_id, tag_name) VALUES (?, ?)', (session_id, tag_name))
-        conn.commit()
-        conn.close()
-
-    def get_session_tags(self, session_id):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT tag_name FROM tags WHERE session_id = ?', (session_id,))
-        tags = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return tags
-
-    def get_project_leaderboard(self, days=30):
-        end_date = datetime.datetime.now()
-        start_date = end_date - datetime.timedelta(days=days)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            '''SELECT project_name, 
-                      COUNT(*) as session_count,
-                      SUM(duration) as total_minutes,
-                      AVG(duration) as avg_session,
-                      SUM(files_changed) as total_files,
-                      SUM(lines_added) as total_lines_added
-               FROM sessions 
-               WHERE start_time >= ? AND end_time IS NOT NULL
-               GROUP BY project_name 
-               ORDER BY total_minutes DESC
-               LIMIT 10''',
-            (start_date.strftime('%Y-%m-%d %H:%M:%S'),)
-        )
-        results = cursor.fetchall()
-        conn.close()
-        return results
-
-    def get_time_distribution(self, project_name, days=7):
-        end_date = datetime.datetime.now()
-        start_date = end_date - datetime.timedelta(days=days)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            '''SELECT strftime('%H', start_time) as hour, SUM(duration)
-               FROM sessions 
-               WHERE project_name = ? AND start_time >= ? AND end_time IS NOT NULL
-               GROUP BY hour
-               ORDER BY hour''',
-            (project_name, start_date.strftime('%Y-%m-%d %H:%M:%S'))
-        )
-        results = cursor.fetchall()
-        conn.close()
-        
-        hour_data = {}
-        for hour, minutes in results:
-            hour_data[int(hour)] = minutes
-        
-        return hour_data
-
-class DevFlowCLI:
-    
-    def __init__(self):
-        self.db = DevFlowDB()
-        self.current_session = None
-        self.load_current_session()
-    
-    def load_current_session(self):
-        sessions = self.db.execute_query(
-            "SELECT * FROM sessions WHERE active = 1 ORDER BY start_time DESC LIMIT 1",
-            fetch=True
-        )
-        
-        if sessions:
-            session = sessions[0]
-            self.current_session = {
-                'id': session[0],
-                'project_name': session[1],
-                'project_path': session[2],
-                'start_time': session[3]
-            }
-    
-    def start_session(self, project_name=None, project_path=None):
-        if self.current_session:
-            print(f"WARNING: Session already active for '{self.current_session['project_name']}'")
-            print(f"   Started: {self.current_session['start_time']}")
-            return
-        
-        if not project_name:
-            current_dir = os.getcwd()
-            project_name = os.path.basename(current_dir)
-            project_path = current_dir
-        
-        start_time = datetime.datetime.now().isoformat()
-        
-        session_id = self.db.execute_query(
-            "INSERT INTO sessions (project_name, project_path, start_time) VALUES (?, ?, ?)",
-            (project_name, project_path, start_time)
-        )
-        
-        self.current_session = {
-            'id': session_id,
-            'project_name': project_name,
-            'project_path': project_path,
-            'start_time': start_time
-        }
-        
-        print(f"Started session for '{project_name}'")
-        print(f"   Time: {datetime.datetime.now().strftime('%H:%M:%S')}")
-        if project_path:
-            print(f"   Path: {project_path}")
-    
-    def stop_session(self):
-        if not self.current_session:
-            print("No active session found")
-            return
-        
-        end_time = datetime.datetime.now().isoformat()
-        start_dt = datetime.datetime.fromisoformat(self.current_session['start_time'])
-        end_dt = datetime.datetime.fromisoformat(end_time)
-        duration = int((end_dt - start_dt).total_seconds())
-        
-        files_changed, lines_added, lines_removed = self.get_git_stats()
-        
-        self.db.execute_query(
-            """UPDATE sessions 
-               SET end_time = ?, duration = ?, active = 0, 
-                   files_changed = ?, lines_added = ?, lines_removed = ?
-               WHERE id = ?""",
-            (end_time, duration, files_changed, lines_added, lines_removed, self.current_session['id'])
-        )
-        
-        date_str = start_dt.strftime('%Y-%m-%d')
-        minutes = duration // 60
-        
-        self.db.execute_query(
-            """INSERT OR REPLACE INTO activity (date, project_name, minutes_coded)
-               VALUES (?, ?, COALESCE((SELECT minutes_coded FROM activity WHERE date = ? AND project_name = ?), 0) + ?)""",
-            (date_str, self.current_session['project_name'], date_str, self.current_session['project_name'], minutes)
-        )
-        
-        # Update streak and check achievements
-        self.db.update_streak(self.current_session['project_name'])
-        self.db.check_achievements(self.current_session['project_name'], minutes)
-        
-        print(f"Stopped session for '{self.current_session['project_name']}'")
-        print(f"   Duration: {self.format_duration(duration)}")
-        print(f"   Current streak: {self.db.get_current_streak()} days")
-        if files_changed > 0:
-            print(f"   Files changed: {files_changed}")
-            print(f"   Lines: +{lines_added} -{lines_removed}")
-        
-        self.current_session = None
-    
-    def get_git_stats(self):
-        if not self.current_session or not self.current_session.get('project_path'):
-            return 0, 0, 0
-        
-        try:
-            os.chdir(self.current_session['project_path'])
-            
-            start_time = self.current_session['start_time']
-            result = subprocess.run(
-                ['git', 'diff', '--stat', f'--since={start_time}'],
-                capture_output=True, text=True
-            )
-            
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                if len(lines) > 1:
-                    stats_line = lines[-1]
-                    parts = stats_line.split(',')
-                    files_changed = int(parts[0].strip().split()[0]) if parts else 0
-                    
-                    lines_added = 0
-                    lines_removed = 0
-                    for part in parts[1:]:
-                        if 'insertion' in part:
-                            lines_added = int(part.strip().split()[0])
-                        elif 'deletion' in part:
-                            lines_removed = int(part.strip().split()[0])
-                    
-                    return files_changed, lines_added, lines_removed
-        except:
-            pass
-        
-        return 0, 0, 0
-    
-    def show_status(self):
-        if not self.current_session:
-            print("No active session")
-            return
-        
-        start_dt = datetime.datetime.fromisoformat(self.current_session['start_time'])
-        current_duration = int((datetime.datetime.now() - start_dt).total_seconds())
-        
-        print(f"Active Session: {self.current_session['project_name']}")
-        print(f"   Started: {start_dt.strftime('%H:%M:%S')}")
-        print(f"   Duration: {self.format_duration(current_duration)}")
-        if self.current_session.get('project_path'):
-            print(f"   Path: {self.current_session['project_path']}")
-    
-    def show_stats(self, days=7):
-        print(f"Productivity Stats (Last {days} days)")
-        print("=" * 50)
-        
-        cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
-        
-        sessions = self.db.execute_query(
-            """SELECT project_name, SUM(duration), COUNT(*), SUM(files_changed), 
-                      SUM(lines_added), SUM(lines_removed)
-               FROM sessions 
-               WHERE end_time IS NOT NULL AND DATE(start_time) >= ?
-               GROUP BY project_name
-               ORDER BY SUM(duration) DESC""",
-            (cutoff_date,), fetch=True
-        )
-        
-        total_time = 0
-        total_sessions = 0
-        
-        print("\nTop Projects:")
-        for i, (project, duration, count, files, added, removed) in enumerate(sessions[:5], 1):
-            total_time += duration or 0
-            total_sessions += count or 0
-            print(f"  {i}. {project}")
-            print(f"     Time: {self.format_duration(duration or 0)} ({count} sessions)")
-            if files:
-                print(f"     Changes: {files} files, +{added or 0}/-{removed or 0} lines")
-        
-        print(f"\nTotal Coding Time: {self.format_duration(total_time)}")
-        print(f"Total Sessions: {total_sessions}")
-        
-        if total_sessions > 0:
-            avg_session = total_time // total_sessions
-            print(f"Average Session: {self.format_duration(avg_session)}")
-        
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        today_minutes = self.db.execute_query(
-            "SELECT SUM(minutes_coded) FROM activity WHERE date = ?",
-            (today,), fetch=True
-        )[0][0] or 0
-        
-        goals = self.db.execute_query(
-            "SELECT target_value FROM goals WHERE goal_type = 'daily' AND date = ?",
-            (today,), fetch=True
-        )
-        
-        if goals:
-            target_minutes = goals[0][0]
-            progress = min(100, (today_minutes / target_minutes) * 100)
-            print(f"\nToday's Goal: {today_minutes//60}h {today_minutes%60}m / {target_minutes//60}h {target_minutes%60}m ({progress:.1f}%)")
-            print(f"   {'█' * int(progress//5)}{'░' * (20-int(progress//5))} {progress:.1f}%")
-    
-    def create_template(self, name, description=""):
-        current_dir = Path.cwd()
-        
-        template_files = {}
-        
-        for file_path in current_dir.rglob('*'):
-            if file_path.is_file() and not self.should_ignore_file(file_path):
-                relative_path = file_path.relative_to(current_dir)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    template_files[str(relative_path)] = content
-                except:
-                    template_files[str(relative_path)] = f"BINARY_FILE:{file_path.suffix}"
-        
-        files_json = json.dumps(template_files)
-        
-        try:
-            self.db.execute_query(
-                "INSERT INTO templates (name, description, files) VALUES (?, ?, ?)",
-                (name, description, files_json)
-            )
-            print(f"Template '{name}' created successfully!")
-            print(f"   Files included: {len(template_files)}")
-        except sqlite3.IntegrityError:
-            print(f"Template '{name}' already exists")
-    
-    def use_template(self, name, target_path):
-        templates = self.db.execute_query(
-            "SELECT files FROM templates WHERE name = ?",
-            (name,), fetch=True
-        )
-        
-        if not templates:
-            print(f"Template '{name}' not found")
-            return
-        
-        target_dir = Path(target_path)
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        template_files = json.loads(templates[0][0])
-        
-        created_count = 0
-        for file_path, content in template_files.items():
-            full_path = target_dir / file_path
-            full_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            if content.startswith("BINARY_FILE:"):
-                print(f"Skipping binary file: {file_path}")
-                continue
-            
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            created_count += 1
-        
-        print(f"Template '{name}' applied to {target_path}")
-        print(f"   Created {created_count} files")
-    
-    def set_goal(self, goal_type, target_value):
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        
-        if goal_type == 'daily':
-            target_minutes = int(float(target_value) * 60)
-        else:
-            target_minutes = target_value
-        
-        self.db.execute_query(
-            "INSERT OR REPLACE INTO goals (goal_type, target_value, date) VALUES (?, ?, ?)",
-            (goal_type, target_minutes, today)
-        )
-        
-        print(f"{goal_type.title()} goal set: {target_value}{'h' if goal_type == 'daily' else ''}")
-    
-    def show_heatmap(self, weeks=12):
-        end_date = datetime.datetime.now()
-        start_date = end_date - datetime.timedelta(weeks=weeks)
-        
-        activity = self.db.execute_query(
-            "SELECT date, SUM(minutes_coded) FROM activity WHERE date >= ? GROUP BY date",
-            (start_date.strftime('%Y-%m-%d'),), fetch=True
-        )
-        
-        activity_dict = {date: minutes for date, minutes in activity}
-        
-        print(f"Activity Heatmap (Last {weeks} weeks)")
-        print("=" * 60)
-        
-        current_date = start_date
-        week_days = []
-        
-        print("    ", end="")
-        month_positions = []
-        for i in range(weeks):
-            week_start = start_date + datetime.timedelta(weeks=i)
-            if i == 0 or week_start.month != (week_start - datetime.timedelta(days=7)).month:
-                month_positions.append((i * 3, week_start.strftime('%b')))
-        
-        for pos, month in month_positions:
-            print(f"{month:>3}", end="   " if pos < weeks * 3 - 6 else "")
-        print()
-        
-        day_labels = ['   ', 'Mon', '   ', 'Wed', '   ', 'Fri', '   ']
-        for label in day_labels:
-            print(f"{label:>3}", end="")
-            for week in range(weeks):
-                current_date = start_date + datetime.timedelta(weeks=week, days=['   ', 'Mon', '   ', 'Wed', '   ', 'Fri', '   '].index(label))
-                if current_date <= end_date:
-                    date_str = current_date.strftime('%Y-%m-%d')
-                    minutes = activity_dict.get(date_str, 0)
-                    intensity = self.get_intensity_char(minutes)
-                    print(f" {intensity} ", end="")
-                else:
-                    print("   ", end="")
-            print()
-        
-        print("\nLegend: ░ No activity  ▒ Low  ▓ Medium  █ High")
-    
-    def get_intensity_char(self, minutes):
-        if minutes == 0:
-            return '░'
-        elif minutes < 60:
-            return '▒'
-        elif minutes < 180:
-            return '▓'
-        else:
-            return '█'
-    
-    def should_ignore_file(self, file_path):
-        ignore_patterns = [
-            '.git', '__pycache__', '.vscode', '.idea', 'node_modules',
-            '.env', '.DS_Store', '*.pyc', '*.log', '*.tmp'
-        ]
-        
-        path_str = str(file_path)
-        for pattern in ignore_patterns:
-            if pattern in path_str or path_str.endswith(pattern.replace('*', '')):
-                return True
-        return False
-    
-    def format_duration(self, seconds):
-        if seconds < 60:
-            return f"{seconds}s"
-        elif seconds < 3600:
-            return f"{seconds//60}m {seconds%60}s"
-        else:
-            hours = seconds // 3600
-            minutes = (seconds % 3600) // 60
-            return f"{hours}h {minutes}m"
-    
-    def export_data(self, format_type='json'):
-        export_data = {
-            'sessions': [],
-            'templates': [],
-            'goals': [],
-            'activity': []
-        }
-        
-        sessions = self.db.execute_query(
-            "SELECT * FROM sessions WHERE end_time IS NOT NULL ORDER BY start_time DESC",
-            fetch=True
-        )
-        
-        for session in sessions:
-            export_data['sessions'].append({
-                'project_name': session[1],
-                'project_path': session[2],
-                'start_time': session[3],
-                'end_time': session[4],
-                'duration': session[5],
-                'files_changed': session[6],
-                'lines_added': session[7],
-                'lines_removed': session[8]
-            })
-        
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"devflow_export_{timestamp}.{format_type}"
-        
-        with open(filename, 'w') as f:
-            if format_type == 'json':
-                json.dump(export_data, f, indent=2)
-            elif format_type == 'csv':
-                f.write("project_name,start_time,end_time,duration,files_changed,lines_added,lines_removed\n")
-                for session in export_data['sessions']:
-                    f.write(f"{session['project_name']},{session['start_time']},{session['end_time']},{session['duration']},{session['files_changed']},{session['lines_added']},{session['lines_removed']}\n")
-        
-        print(f"Data exported to {filename}")
-
-    def get_current_project_name(self):
-        if self.current_session:
-            return self.current_session['project_name']
-        else:
-            current_dir = os.getcwd()
-            return os.path.basename(current_dir)
-
-    def show_achievements(self):
-        achievements = self.db.get_achievements()
-        
-        print(f"\nAll Achievements:")
-        print("=" * 40)
-        
-        if not achievements:
-            print("No achievements earned yet. Keep coding!")
-            return
-        
-        current_project = None
-        for achievement in achievements:
-            if achievement[4] != current_project:
-                current_project = achievement[4]
-                print(f"\n{current_project}:")
-                print("-" * len(current_project))
-            
-            print(f"🏆 {achievement[1]} - {achievement[2]}")
-            print(f"   Earned: {achievement[3]}")
-            print()
-
-    def add_session_note(self, content):
-        if not self.current_session:
-            print("No active session. Start a session first with 'devflow start'")
-            return
-        
-        self.db.add_note(self.current_session['id'], content)
-        print(f"Note added to current session: {content}")
-
-    def list_notes(self):
-        notes = self.db.get_notes()
-        
-        print("\nRecent Session Notes:")
-        print("=" * 30)
-        
-        if not notes:
-            print("No notes found.")
-            return
-        
-        for note in notes:
-            print(f"Session {note[1]}: {note[2]}")
-            print(f"  Created: {note[3]}")
-            print()
-
-    def show_weekly_summary(self, project_name=None):
-        if not project_name:
-            project_name = self.get_current_project_name()
-        
-        summary = self.db.get_weekly_summary(project_name)
-        
-        print(f"\nWeekly Summary for '{project_name}':")
-        print("=" * 40)
-        print(f"Sessions completed: {summary['session_count']}")
-        print(f"Total time coded: {self.format_duration(summary['total_time'] * 60) if summary['total_time'] else '0m'}")
-        if summary['avg_session']:
-            print(f"Average session: {self.format_duration(summary['avg_session'] * 60)}")
-        print(f"Files changed: {summary['files_changed']}")
-        print(f"Lines added: {summary['lines_added']}")
-        print(f"Lines removed: {summary['lines_removed']}")
-        print(f"Productivity score: {summary['productivity_score']}%")
-        print(f"Current streak: {summary['current_streak']} days")
-
-    def show_streak(self):
-        streak = self.db.get_current_streak()
-        project_name = self.get_current_project_name()
-        
-        print(f"\nCoding Streak for '{project_name}':")
-        print("=" * 30)
-        if streak > 0:
-            print(f"🔥 Current streak: {streak} days")
-            if streak >= 7:
-                print("Amazing! You're on a roll!")
-            elif streak >= 3:
-                print("Great job! Keep it up!")
-        else:
-            print("No active streak. Start coding to begin a new streak!")
-
-    def show_productivity_score(self, days=7):
-        project_name = self.get_current_project_name()
-        score = self.db.get_productivity_score(project_name, days)
-        
-        print(f"\nProductivity Score ({days} days):")
-        print("=" * 30)
-        print(f"Project: {project_name}")
-        print(f"Score: {score}%")
-        
-        if score >= 80:
-            print("🌟 Excellent productivity!")
-        elif score >= 60:
-            print("👍 Good productivity!")
-        elif score >= 40:
-            print("📈 Room for improvement!")
-        else:
-            print("💪 Let's get coding!")
-
-    def show_leaderboard(self):
-        leaderboard = self.db.get_project_leaderboard(30)
-        
-        print("\nProject Leaderboard (Last 30 days):")
-        print("=" * 45)
-        
-        if not leaderboard:
-            print("No projects found. Start coding to see your projects here!")
-            return
-        
-        for i, (project, sessions, total_min, avg_min, files, lines) in enumerate(leaderboard, 1):
-            print(f"{i}. {project}")
-            print(f"   Time: {self.format_duration(total_min * 60)} ({sessions} sessions)")
-            print(f"   Avg: {self.format_duration(avg_min * 60)} | Files: {files} | Lines: +{lines}")
-            print()
-
-    def add_tag(self, tag_name):
-        if not self.current_session:
-            print("No active session. Start a session first with 'devflow start'")
-            return
-        
-        self.db.add_session_tag(self.current_session['id'], tag_name)
-        print(f"Added tag '{tag_name}' to current session")
-
-    def show_insights(self):
-        project_name = self.get_current_project_name()
-        time_dist = self.db.get_time_distribution(project_name, 7)
-        
-        print(f"\nAdvanced Insights for '{project_name}':")
-        print("=" * 50)
-        
-        # Time distribution analysis
-        if time_dist:
-            print("\nHourly Coding Distribution (Last 7 days):")
-            print("-" * 40)
-            
-            # Find peak hours
-            peak_hour = max(time_dist.items(), key=lambda x: x[1])
-            total_minutes = sum(time_dist.values())
-            
-            for hour in range(24):
-                minutes = time_dist.get(hour, 0)
-                if minutes > 0:
-                    percentage = (minutes / total_minutes) * 100
-                    bar_length = int(percentage / 5)
-                    bar = "█" * bar_length
-                    print(f"{hour:2d}:00 │{bar:<20} {self.format_duration(minutes * 60)} ({percentage:.1f}%)")
-            
-            print(f"\n🔥 Peak productivity: {peak_hour[0]}:00 with {self.format_duration(peak_hour[1] * 60)}")
-            
-            # Productivity insights
-            morning_time = sum(time_dist.get(h, 0) for h in range(6, 12))
-            afternoon_time = sum(time_dist.get(h, 0) for h in range(12, 18))
-            evening_time = sum(time_dist.get(h, 0) for h in range(18, 24))
-            
-            best_period = max([
-                ("Morning", morning_time),
-                ("Afternoon", afternoon_time), 
-                ("Evening", evening_time)
-            ], key=lambda x: x[1])
-            
-            print(f"🌟 Best period: {best_period[0]} ({self.format_duration(best_period[1] * 60)})")
-        else:
-            print("No coding activity in the last 7 days. Start a session to see insights!")
-
-def main():
-    parser = argparse.ArgumentParser(
-        description='DevFlow CLI - Comprehensive development workflow manager',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  devflow start                    # Start session for current directory
-  devflow start "My Project"       # Start named session
-  devflow stop                     # Stop current session
-  devflow status                   # Show session status
-  devflow stats                    # Show productivity stats
-  devflow template create webapp   # Create template from current dir
-  devflow template use webapp ./new-project  # Use template
-  devflow goals set 4              # Set 4-hour daily goal
-  devflow heatmap                  # Show activity heatmap
-  devflow export json              # Export data to JSON
-        """
-    )
-    
-    subparsers = parser.add_subparsers(dest='command', help='Available commands')
-    
-    start_parser = subparsers.add_parser('start', help='Start coding session')
-    start_parser.add_argument('project', nargs='?', help='Project name')
-    start_parser.add_argument('--path', help='Project path')
-    
-    subparsers.add_parser('stop', help='Stop coding session')
-    
-    subparsers.add_parser('status', help='Show session status')
-    
-    stats_parser = subparsers.add_parser('stats', help='Show productivity statistics')
-    stats_parser.add_argument('--days', type=int, default=7, help='Number of days to include')
-    
-    template_parser = subparsers.add_parser('template', help='Template management')
-    template_subparsers = template_parser.add_subparsers(dest='template_action')
-    
-    create_template_parser = template_subparsers.add_parser('create', help='Create template')
-    create_template_parser.add_argument('name', help='Template name')
-    create_template_parser.add_argument('--description', help='Template description')
-    
-    use_template_parser = template_subparsers.add_parser('use', help='Use template')
-    use_template_parser.add_argument('name', help='Template name')
-    use_template_parser.add_argument('path', help='Target path')
-    
-    goals_parser = subparsers.add_parser('goals', help='Goal management')
-    goals_subparsers = goals_parser.add_subparsers(dest='goals_action')
-    
-    set_goal_parser = goals_subparsers.add_parser('set', help='Set goal')
-    set_goal_parser.add_argument('hours', type=float, help='Daily goal in hours')
-    
-    heatmap_parser = subparsers.add_parser('heatmap', help='Show activity heatmap')
-    heatmap_parser.add_argument('--weeks', type=int, default=12, help='Number of weeks to show')
-    
-    export_parser = subparsers.add_parser('export', help='Export data')
-    export_parser.add_argument('format', choices=['json', 'csv'], default='json', nargs='?')
-    
-    # New commands for enhanced features
-    subparsers.add_parser('achievements', help='Show earned achievements')
-    
-    notes_parser = subparsers.add_parser('notes', help='Session notes management')
-    notes_subparsers = notes_parser.add_subparsers(dest='notes_action')
-    add_note_parser = notes_subparsers.add_parser('add', help='Add note to current session')
-    add_note_parser.add_argument('content', help='Note content')
-    notes_subparsers.add_parser('list', help='List recent notes')
-    
-    summary_parser = subparsers.add_parser('summary', help='Show weekly summary')
-    summary_parser.add_argument('--project', help='Project name (default: current project)')
-    
-    subparsers.add_parser('streak', help='Show current coding streak')
-    
-    score_parser = subparsers.add_parser('score', help='Show productivity score')
-    score_parser.add_argument('--days', type=int, default=7, help='Number of days to calculate score for')
-    
-    # Advanced features
-    subparsers.add_parser('leaderboard', help='Show project leaderboard')
-    
-    tags_parser = subparsers.add_parser('tags', help='Session tagging')
-    tags_subparsers = tags_parser.add_subparsers(dest='tags_action')
-    add_tag_parser = tags_subparsers.add_parser('add', help='Add tag to current session')
-    add_tag_parser.add_argument('tag', help='Tag name')
-    
-    subparsers.add_parser('insights', help='Show advanced analytics and insights')
-    
-    if len(sys.argv) == 1:
-        print("DevFlow CLI - Development Workflow Manager")
-        print("=" * 50)
-        print("Available commands:")
-        print("  start [project]     - Start coding session")
-        print("  stop               - Stop current session")
-        print("  status             - Show session status")
-        print("  stats              - Show productivity stats")
-        print("  template create    - Create project template")
-        print("  template use       - Use project template")
-        print("  goals set <hours>  - Set daily goal")
-        print("  heatmap            - Show activity heatmap")
-        print("  export [format]    - Export data")
-        print("  achievements       - Show earned achievements")
-        print("  notes add <text>   - Add note to session")
-        print("  notes list         - List recent notes")
-        print("  summary [project]  - Show weekly summary")
-        print("  streak             - Show coding streak")
-        print("  score [days]       - Show productivity score")
-        print("  leaderboard        - Show project leaderboard")
-        print("  tags add <tag>     - Add tag to current session")
-        print("  insights           - Show advanced analytics")
-        print("\nUse 'devflow <command> --help' for detailed help")
-        return
-    
-    args = parser.parse_args()
-    cli = DevFlowCLI()
-    
-    if args.command == 'start':
-        cli.start_session(args.project, getattr(args, 'path', None))
-    elif args.command == 'stop':
-        cli.stop_session()
-    elif args.command == 'status':
-        cli.show_status()
-    elif args.command == 'stats':
-        cli.show_stats(args.days)
-    elif args.command == 'template':
-        if args.template_action == 'create':
-            cli.create_template(args.name, getattr(args, 'description', ''))
-        elif args.template_action == 'use':
-            cli.use_template(args.name, args.path)
-    elif args.command == 'goals':
-        if args.goals_action == 'set':
-            cli.set_goal('daily', args.hours)
-    elif args.command == 'heatmap':
-        cli.show_heatmap(args.weeks)
-    elif args.command == 'export':
-        cli.export_data(args.format)
-    elif args.command == 'achievements':
-        cli.show_achievements()
-    elif args.command == 'notes':
-        if args.notes_action == 'add':
-            cli.add_session_note(args.content)
-        elif args.notes_action == 'list':
-            cli.list_notes()
-    elif args.command == 'summary':
-        cli.show_weekly_summary(args.project)
-    elif args.command == 'streak':
-        cli.show_streak()
-    elif args.command == 'score':
-        cli.show_productivity_score(args.days)
-    elif args.command == 'leaderboard':
-        cli.show_leaderboard()
-    elif args.command == 'tags':
-        if args.tags_action == 'add':
-            cli.add_tag(args.tag)
-    elif args.command == 'insights':
-        cli.show_insights()
-
-if __name__ == '__main__':
+import os
+import sys
+import io
+import time
+import select
+import struct
+import datetime
+import threading
+import zlib
+from contextlib import contextmanager, nullcontext
+from collections import defaultdict, deque, Counter
+
+# Heavier modules (sqlite3, argparse, json, subprocess, hashlib, pathlib,
+# concurrent.futures, ...) are imported by the code that needs them so
+# that lightweight commands such as `devflow status` start quickly.
+
+def _column_names(cursor, table):
+    return {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+
+def _add_column(cursor, table, column, definition):
+    if column not in _column_names(cursor, table):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _migrate_base_schema(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_name TEXT NOT NULL,
+            project_path TEXT,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP,
+            duration INTEGER,
+            files_changed INTEGER DEFAULT 0,
+            lines_added INTEGER DEFAULT 0,
+            lines_removed INTEGER DEFAULT 0,
+            active BOOLEAN DEFAULT 1
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            files TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            goal_type TEXT NOT NULL,
+            target_value INTEGER NOT NULL,
+            current_value INTEGER DEFAULT 0,
+            date TEXT NOT NULL,
+            completed BOOLEAN DEFAULT 0
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS activity (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            project_name TEXT NOT NULL,
+            minutes_coded INTEGER NOT NULL,
+            UNIQUE(date, project_name)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS streaks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            length INTEGER DEFAULT 1,
+            active BOOLEAN DEFAULT 1
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS achievements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            earned_date TEXT,
+            project_name TEXT
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(session_id) REFERENCES sessions(id)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER,
+            tag_name TEXT NOT NULL,
+            FOREIGN KEY(session_id) REFERENCES sessions(id)
+        )
+    ''')
+
+def _migrate_time_columns(cursor):
+    # Integer epoch seconds and a local calendar date make range filters
+    # sargable; start_time/end_time stay as the human-readable originals.
+    _add_column(cursor, 'sessions', 'start_ts', 'INTEGER')
+    _add_column(cursor, 'sessions', 'end_ts', 'INTEGER')
+    _add_column(cursor, 'sessions', 'start_date', 'TEXT')
+    
+    # The 'utc' modifier treats the stored naive value as local time,
+    # matching datetime.timestamp() for sessions written from now on.
+    cursor.execute('''
+        UPDATE sessions
+        SET start_ts = CAST(strftime('%s', start_time, 'utc') AS INTEGER),
+            start_date = DATE(start_time),
+            end_ts = CAST(strftime('%s', end_time, 'utc') AS INTEGER)
+        WHERE start_ts IS NULL
+    ''')
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_project_start ON sessions(project_name, start_ts)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions(start_ts)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_active ON sessions(active)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_activity_date ON activity(date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tags_session ON tags(session_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notes_session_created ON notes(session_id, created_at)')
+
+def _migrate_rollups(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_daily (
+            date TEXT NOT NULL,
+            project_name TEXT NOT NULL,
+            seconds INTEGER NOT NULL DEFAULT 0,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            files_changed INTEGER NOT NULL DEFAULT 0,
+            lines_added INTEGER NOT NULL DEFAULT 0,
+            lines_removed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, project_name)
+        ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_hourly (
+            project_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            seconds INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_name, date, hour)
+        ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rollup_daily_project ON rollup_daily(project_name, date)')
+    _rebuild_rollups(cursor)
+
+def _migrate_blob_store(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            compressed BOOLEAN NOT NULL DEFAULT 0,
+            data BLOB NOT NULL
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS template_files (
+            template_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            mode INTEGER,
+            PRIMARY KEY (template_id, path),
+            FOREIGN KEY(template_id) REFERENCES templates(id),
+            FOREIGN KEY(sha256) REFERENCES blobs(sha256)
+        ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_template_files_sha ON template_files(sha256)')
+    
+    # Move legacy JSON templates into the blob store one template at a time.
+    # Binary files were never captured, so their placeholders are dropped.
+    import json
+    import hashlib
+    from pathlib import Path
+    
+    legacy = cursor.connection.execute("SELECT id FROM templates WHERE files != ''").fetchall()
+    for (template_id,) in legacy:
+        files = json.loads(cursor.execute('SELECT files FROM templates WHERE id = ?', (template_id,)).fetchone()[0])
+        for path, content in files.items():
+            if content.startswith('BINARY_FILE:'):
+                continue
+            data = content.encode('utf-8')
+            sha256 = hashlib.sha256(data).hexdigest()
+            compressed, payload = _encode_blob(data)
+            cursor.execute(
+                'INSERT OR IGNORE INTO blobs (sha256, size, compressed, data) VALUES (?, ?, ?, ?)',
+                (sha256, len(data), compressed, payload)
+            )
+            cursor.execute(
+                'INSERT OR REPLACE INTO template_files (template_id, path, sha256) VALUES (?, ?, ?)',
+                (template_id, Path(path).as_posix(), sha256)
+            )
+        cursor.execute("UPDATE templates SET files = '' WHERE id = ?", (template_id,))
+
+def _migrate_git_stats(cursor):
+    _add_column(cursor, 'sessions', 'start_commit', 'TEXT')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_file_stats (
+            session_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            lines_added INTEGER NOT NULL DEFAULT 0,
+            lines_removed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (session_id, path),
+            FOREIGN KEY(session_id) REFERENCES sessions(id)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Committed ranges never change, so their per-file diff is cached by
+    # (base, head) commit SHA
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS git_ranges (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            base_sha TEXT NOT NULL,
+            head_sha TEXT NOT NULL,
+            UNIQUE(base_sha, head_sha)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS git_range_files (
+            range_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            lines_added INTEGER NOT NULL DEFAULT 0,
+            lines_removed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (range_id, path),
+            FOREIGN KEY(range_id) REFERENCES git_ranges(id)
+        ) WITHOUT ROWID
+    ''')
+
+def _migrate_file_activity(cursor):
+    # Per-minute file event counts written in batches by `devflow daemon`
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_activity (
+            project_name TEXT NOT NULL,
+            bucket_ts INTEGER NOT NULL,
+            events INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (project_name, bucket_ts)
+        ) WITHOUT ROWID
+    ''')
+
+def _migrate_single_active_session(cursor):
+    # Concurrent starts could leave several sessions active. Keep the
+    # newest open, close the others as zero-length, then let a partial
+    # unique index guarantee at most one active session from now on.
+    cursor.execute('''
+        UPDATE sessions
+        SET active = 0,
+            end_time = COALESCE(end_time, start_time),
+            end_ts = COALESCE(end_ts, start_ts),
+            duration = COALESCE(duration, 0)
+        WHERE active = 1 AND id != (SELECT MAX(id) FROM sessions WHERE active = 1)
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_single_active ON sessions(active) WHERE active = 1')
+
+def _migrate_project_streaks(cursor):
+    # Streaks are kept globally (project_name '') and per project. Old rows
+    # were global only and could be wrong after project switches, so they
+    # are re-derived from activity before the indexes are added.
+    _add_column(cursor, 'streaks', 'project_name', "TEXT NOT NULL DEFAULT ''")
+    _rebuild_streaks(cursor)
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_streaks_active ON streaks(project_name) WHERE active = 1')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_streaks_length ON streaks(project_name, length)')
+
+def _migrate_achievement_index(cursor):
+    # One award per (name, project); lets awards be inserted with OR IGNORE
+    cursor.execute('''
+        DELETE FROM achievements
+        WHERE id NOT IN (SELECT MIN(id) FROM achievements GROUP BY name, project_name)
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_achievements_project ON achievements(project_name, name)')
+
+def _migrate_notes_search(cursor):
+    # Recent notes are listed newest first; the FTS5 index mirrors notes
+    # (external content) and is kept in sync by triggers. Builds of SQLite
+    # without FTS5 skip it and search with LIKE instead.
+    import sqlite3
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notes_created ON notes(created_at)')
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(content, content='notes', content_rowid='id')")
+    except sqlite3.OperationalError:
+        return
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO notes_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    # Backfill existing notes in place
+    cursor.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+
+def _migrate_tag_dimension(cursor):
+    # Tag names live once in tag_names; session_tags is the junction, keyed
+    # (tag_id, session_id) for tag filters with a reverse index for lookups
+    # by session. `tags` becomes a view so old readers and writers work.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tag_names (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_tags (
+            tag_id INTEGER NOT NULL,
+            session_id INTEGER NOT NULL,
+            PRIMARY KEY (tag_id, session_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_tags_session ON session_tags(session_id, tag_id)')
+    
+    cursor.execute("INSERT OR IGNORE INTO tag_names (name) SELECT DISTINCT tag_name FROM tags")
+    cursor.execute('''
+        INSERT OR IGNORE INTO session_tags (tag_id, session_id)
+        SELECT n.id, t.session_id FROM tags t JOIN tag_names n ON n.name = t.tag_name
+        WHERE t.session_id IS NOT NULL
+    ''')
+    cursor.execute('DROP TABLE tags')
+    cursor.execute('''
+        CREATE VIEW tags AS
+        SELECT st.session_id, n.name AS tag_name
+        FROM session_tags st JOIN tag_names n ON n.id = st.tag_id
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER tags_insert INSTEAD OF INSERT ON tags BEGIN
+            INSERT OR IGNORE INTO tag_names (name) VALUES (new.tag_name);
+            INSERT OR IGNORE INTO session_tags (tag_id, session_id)
+            SELECT id, new.session_id FROM tag_names WHERE name = new.tag_name;
+        END
+    ''')
+
+def _migrate_session_snapshot(cursor):
+    # `devflow cache build` snapshots finished sessions up to covered_id into
+    # column files. Changing or deleting a covered session bumps generation,
+    # which tells readers the files are stale; new sessions only extend them.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_snapshot (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            covered_id INTEGER NOT NULL DEFAULT 0,
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO session_snapshot (id) VALUES (1)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sessions_snapshot_update
+        AFTER UPDATE OF project_name, start_ts, duration, end_ts, files_changed, lines_added, lines_removed ON sessions
+        WHEN old.id <= (SELECT covered_id FROM session_snapshot) BEGIN
+            UPDATE session_snapshot SET generation = generation + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS sessions_snapshot_delete AFTER DELETE ON sessions
+        WHEN old.id <= (SELECT covered_id FROM session_snapshot) BEGIN
+            UPDATE session_snapshot SET generation = generation + 1;
+        END
+    ''')
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run, so a current database skips DDL entirely. Append new steps here;
+# never edit or reorder released ones.
+def _migrate_unique_goals(cursor):
+    # One goal per (type, date) so `goals set` replaces instead of adding a
+    # row the readers never see; the latest setting wins
+    cursor.execute('''
+        DELETE FROM goals
+        WHERE id NOT IN (SELECT MAX(id) FROM goals GROUP BY goal_type, date)
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_goals_type_date ON goals(goal_type, date)')
+
+MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_time_columns,
+    _migrate_rollups,
+    _migrate_blob_store,
+    _migrate_git_stats,
+    _migrate_file_activity,
+    _migrate_single_active_session,
+    _migrate_project_streaks,
+    _migrate_achievement_index,
+    _migrate_notes_search,
+    _migrate_tag_dimension,
+    _migrate_session_snapshot,
+    _migrate_unique_goals,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+BUSY_TIMEOUT = float(os.environ.get('DEVFLOW_BUSY_TIMEOUT', '30'))
+LOCK_RETRIES = 5
+
+def _retry_locked(func, *args):
+    # The busy timeout covers ordinary lock waits; this also retries the
+    # cases SQLite reports straight away (a stale WAL snapshot, or a
+    # journal mode switch while other connections are open)
+    import sqlite3
+    
+    delay = 0.05
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            message = str(e)
+            if attempt == LOCK_RETRIES - 1 or ('locked' not in message and 'busy' not in message):
+                raise
+        import random
+        time.sleep(delay * (1 + random.random()))
+        delay *= 2
+
+# Profiling (`--profile` / DEVFLOW_TRACE). When enabled, every connection
+# records per-statement timings and row counts, and git and file I/O are
+# timed as spans; the breakdown is printed to stderr at exit.
+
+PROFILE_MODES = ('text', 'json', 'cprofile')
+SLOW_QUERY_MS = float(os.environ.get('DEVFLOW_TRACE_SLOW_MS', '50'))
+
+_PROFILER = None
+_NO_SPAN = nullcontext()
+
+def _traced(kind, label):
+    # Times a block when profiling is on; a shared no-op otherwise
+    if _PROFILER is None:
+        return _NO_SPAN
+    return _PROFILER.span(kind, label)
+
+def _traced_iter(kind, label, items):
+    # Times each step of a lazy producer such as a directory walk
+    if _PROFILER is None:
+        return items
+    return _PROFILER.iterate(kind, label, items)
+
+def _normalize_sql(sql):
+    return ' '.join(sql.split())
+
+class Profiler:
+    
+    def __init__(self, mode='text', slow_ms=SLOW_QUERY_MS):
+        self.mode = mode
+        self.slow = slow_ms / 1000
+        self.started = time.perf_counter()
+        self.queries = []  # [sql, seconds, rows] per execution
+        self.plans = {}
+        self.spans = []  # (kind, label, seconds)
+        self._connection_class = None
+    
+    @contextmanager
+    def span(self, kind, label):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((kind, label, time.perf_counter() - started))
+    
+    def iterate(self, kind, label, items):
+        items = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                self.spans.append((kind, label, time.perf_counter() - started))
+            yield item
+    
+    def connection_class(self):
+        # Passed as sqlite3.connect(factory=...); built on first use so
+        # sqlite3 is still only imported by code that needs it
+        if self._connection_class is None:
+            self._connection_class = _tracing_connection_class(self)
+        return self._connection_class
+    
+    def explain(self, conn, sql, params):
+        # Plans are taken on the connection that ran the statement, so temp
+        # tables and the open transaction are visible
+        if sql in self.plans or not sql.split(None, 1)[0].upper() in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'):
+            return
+        import sqlite3
+        
+        try:
+            rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params or ()).fetchall()
+            self.plans[sql] = [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            self.plans[sql] = [f'unavailable: {e}']
+    
+    def report(self):
+        total = time.perf_counter() - self.started
+        
+        queries = {}
+        for sql, seconds, rows in list(self.queries):
+            entry = queries.setdefault(sql, {'sql': sql, 'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            entry['rows'] += rows
+        for sql, entry in queries.items():
+            if sql in self.plans:
+                entry['plan'] = self.plans[sql]
+        
+        spans = {}
+        for kind, label, seconds in list(self.spans):
+            entry = spans.setdefault((kind, label), {'kind': kind, 'label': label, 'calls': 0, 'seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+        
+        categories = {'sql': sum(entry['seconds'] for entry in queries.values())}
+        for entry in spans.values():
+            categories[entry['kind']] = categories.get(entry['kind'], 0.0) + entry['seconds']
+        # Worker threads overlap, so this is a lower bound on Python time
+        categories['other'] = max(0.0, total - sum(categories.values()))
+        
+        return {
+            'total_seconds': total,
+            'categories': categories,
+            'queries': sorted(queries.values(), key=lambda entry: entry['seconds'], reverse=True),
+            'spans': sorted(spans.values(), key=lambda entry: entry['seconds'], reverse=True),
+        }
+    
+    def write_report(self, out=None):
+        out = out or sys.stderr
+        report = self.report()
+        if self.mode == 'json':
+            import json
+            json.dump(report, out, indent=2)
+            out.write('\n')
+            return
+        
+        print(f"\nProfile: {report['total_seconds'] * 1000:.1f} ms total", file=out)
+        for kind, seconds in sorted(report['categories'].items(), key=lambda item: item[1], reverse=True):
+            print(f"  {kind:<8} {seconds * 1000:10.1f} ms", file=out)
+        
+        if report['queries']:
+            print(f"\n{'ms':>10} {'calls':>6} {'rows':>8}  SQL", file=out)
+            for entry in report['queries'][:25]:
+                sql = entry['sql'] if len(entry['sql']) <= 90 else entry['sql'][:87] + '...'
+                print(f"{entry['seconds'] * 1000:10.1f} {entry['calls']:6} {entry['rows']:8}  {sql}", file=out)
+                for line in entry.get('plan', []):
+                    print(f"{'':27}  -> {line}", file=out)
+        
+        if report['spans']:
+            print(f"\n{'ms':>10} {'calls':>6}  Span", file=out)
+            for entry in report['spans']:
+                print(f"{entry['seconds'] * 1000:10.1f} {entry['calls']:6}  {entry['kind']}: {entry['label']}", file=out)
+
+def _tracing_connection_class(profiler):
+    import sqlite3
+    
+    class TracingCursor(sqlite3.Cursor):
+        # Time spent fetching is charged to the statement that produced
+        # the rows, since SQLite does most of its work while stepping
+        record = None
+        
+        def _charge(self, started, rows):
+            record = self.record
+            if record is not None:
+                record[1] += time.perf_counter() - started
+                record[2] += rows
+        
+        def execute(self, sql, params=()):
+            record = [_normalize_sql(sql), 0.0, 0]
+            self.record = record
+            profiler.queries.append(record)
+            started = time.perf_counter()
+            super().execute(sql, params)
+            elapsed = time.perf_counter() - started
+            record[1] += elapsed
+            record[2] += max(self.rowcount, 0)
+            if elapsed >= profiler.slow:
+                profiler.explain(self.connection, record[0], params)
+            return self
+        
+        def executemany(self, sql, seq_of_params):
+            record = [_normalize_sql(sql), 0.0, 0]
+            self.record = record
+            profiler.queries.append(record)
+            started = time.perf_counter()
+            super().executemany(sql, seq_of_params)
+            record[1] += time.perf_counter() - started
+            record[2] += max(self.rowcount, 0)
+            return self
+        
+        def fetchone(self):
+            started = time.perf_counter()
+            row = super().fetchone()
+            self._charge(started, row is not None)
+            return row
+        
+        def fetchmany(self, size=None):
+            started = time.perf_counter()
+            rows = super().fetchmany(self.arraysize if size is None else size)
+            self._charge(started, len(rows))
+            return rows
+        
+        def fetchall(self):
+            started = time.perf_counter()
+            rows = super().fetchall()
+            self._charge(started, len(rows))
+            return rows
+        
+        def __next__(self):
+            started = time.perf_counter()
+            try:
+                row = super().__next__()
+            finally:
+                self._charge(started, 0)
+            if self.record is not None:
+                self.record[2] += 1
+            return row
+    
+    class TracingConnection(sqlite3.Connection):
+        
+        def cursor(self, factory=TracingCursor):
+            return super().cursor(factory)
+        
+        def execute(self, sql, params=()):
+            return self.cursor().execute(sql, params)
+        
+        def executemany(self, sql, seq_of_params):
+            return self.cursor().executemany(sql, seq_of_params)
+        
+        def commit(self):
+            started = time.perf_counter()
+            super().commit()
+            profiler.queries.append(['COMMIT', time.perf_counter() - started, 0])
+    
+    return TracingConnection
+
+def _epoch(dt):
+    return int(dt.timestamp())
+
+def _cutoff_date(days):
+    return (datetime.date.today() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+
+def _cutoff_epoch(days):
+    # Local midnight starting the same range as _cutoff_date
+    midnight = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=days), datetime.time())
+    return _epoch(midnight)
+
+def _productivity_score(total_seconds, days):
+    # Percent of an hour a day over the period, capped at 100
+    target_minutes = days * 60
+    score = min(100, (total_seconds / 60 / target_minutes) * 100) if target_minutes > 0 else 0
+    return round(score, 1)
+
+def _local_date(ts):
+    local = time.localtime(ts)
+    return '%04d-%02d-%02d' % (local.tm_year, local.tm_mon, local.tm_mday)
+
+def _split_by_hour(start_ts, duration):
+    # Break a session into (date, hour, seconds) pieces on local hour
+    # boundaries so sessions crossing an hour or midnight land correctly
+    pieces = []
+    current = start_ts
+    end_ts = start_ts + duration
+    while current < end_ts:
+        local = time.localtime(current)
+        piece_end = min(end_ts, current - local.tm_min * 60 - local.tm_sec + 3600)
+        pieces.append((
+            '%04d-%02d-%02d' % (local.tm_year, local.tm_mon, local.tm_mday),
+            local.tm_hour, piece_end - current
+        ))
+        current = piece_end
+    return pieces
+
+def _apply_rollups(cursor, project_name, start_ts, duration, files_changed, lines_added, lines_removed):
+    start_date = _local_date(start_ts)
+    hourly = _split_by_hour(start_ts, duration)
+    daily = defaultdict(int)
+    for date, hour, seconds in hourly:
+        daily[date] += seconds
+    daily.setdefault(start_date, 0)
+    
+    cursor.executemany(
+        'INSERT OR IGNORE INTO rollup_hourly (project_name, date, hour) VALUES (?, ?, ?)',
+        [(project_name, date, hour) for date, hour, _ in hourly]
+    )
+    cursor.executemany(
+        'UPDATE rollup_hourly SET seconds = seconds + ? WHERE project_name = ? AND date = ? AND hour = ?',
+        [(seconds, project_name, date, hour) for date, hour, seconds in hourly]
+    )
+    
+    # Session counts and git stats are attributed to the day the session started
+    cursor.executemany(
+        'INSERT OR IGNORE INTO rollup_daily (date, project_name) VALUES (?, ?)',
+        [(date, project_name) for date in daily]
+    )
+    cursor.executemany(
+        '''UPDATE rollup_daily
+           SET seconds = seconds + ?, sessions = sessions + ?, files_changed = files_changed + ?,
+               lines_added = lines_added + ?, lines_removed = lines_removed + ?
+           WHERE date = ? AND project_name = ?''',
+        [(seconds, 1, files_changed or 0, lines_added or 0, lines_removed or 0, date, project_name)
+         if date == start_date else (seconds, 0, 0, 0, 0, date, project_name)
+         for date, seconds in daily.items()]
+    )
+
+GIT_TIMEOUT = float(os.environ.get('DEVFLOW_GIT_TIMEOUT', '10'))
+
+def _run_git(repo_path, *args):
+    import subprocess
+    
+    try:
+        with _traced('git', ' '.join(['git', *args[:2]])):
+            result = subprocess.run(
+                ['git', *args], cwd=repo_path,
+                capture_output=True, text=True, timeout=GIT_TIMEOUT
+            )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+def _git_head(repo_path):
+    output = _run_git(repo_path, 'rev-parse', '--verify', '--quiet', 'HEAD')
+    return output.strip() if output else None
+
+def _parse_numstat(output):
+    stats = {}
+    for line in output.splitlines():
+        parts = line.split('\t', 2)
+        if len(parts) != 3:
+            continue
+        added, removed, path = parts
+        # Binary files report '-' for both counts
+        stats[path] = (int(added) if added != '-' else 0, int(removed) if removed != '-' else 0)
+    return stats
+
+def _merge_file_stats(target, stats):
+    for path, (added, removed) in stats.items():
+        previous = target.get(path, (0, 0))
+        target[path] = (previous[0] + added, previous[1] + removed)
+    return target
+
+ENRICH_JOBS = 8
+# One log covers a repository's whole history window, so it gets longer
+ENRICH_TIMEOUT = float(os.environ.get('DEVFLOW_ENRICH_TIMEOUT', '120'))
+
+def _parse_numstat_log(output):
+    # `git log --numstat --format=%x00%ct` output as [(commit time, stats)],
+    # oldest first
+    commits = []
+    for record in output.split('\0')[1:]:
+        header, _, body = record.partition('\n')
+        commits.append((int(header), _parse_numstat(body)))
+    commits.sort(key=lambda commit: commit[0])
+    return commits
+
+async def _git_async(repo_path, args, timeout):
+    # stdout of a git command, or None when it failed or timed out
+    import asyncio
+    
+    try:
+        process = await asyncio.create_subprocess_exec(
+            'git', *args, cwd=repo_path, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+    with _traced('git', f'git {args[0]}'):
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return None
+    if process.returncode != 0:
+        return None
+    return output.decode('utf-8', 'replace')
+
+async def _git_log_numstat(repo_path, since, until, semaphore, timeout):
+    # Only the user's own commits on local branches count; teammates'
+    # work and fetched remote refs are not part of their sessions
+    async with semaphore:
+        email = await _git_async(repo_path, ('config', 'user.email'), timeout)
+        if not email or not email.strip():
+            return None
+        output = await _git_async(repo_path, (
+            'log', '--branches', '--no-merges', '--numstat', '--no-renames', '--format=%x00%ct',
+            '--fixed-strings', f'--author=<{email.strip()}>',
+            # ISO dates: git reads @<epoch> only with nine or more digits
+            time.strftime('--since=%Y-%m-%dT%H:%M:%S+0000', time.gmtime(since)),
+            time.strftime('--until=%Y-%m-%dT%H:%M:%S+0000', time.gmtime(until)),
+        ), timeout)
+    if output is None:
+        return None
+    return _parse_numstat_log(output)
+
+def _git_logs(windows, jobs=ENRICH_JOBS, timeout=ENRICH_TIMEOUT):
+    # {repo path: (since, until)} -> {repo path: commits, or None when git
+    # failed or timed out}, with at most `jobs` git processes at a time
+    import asyncio
+    
+    async def run():
+        semaphore = asyncio.Semaphore(jobs)
+        paths = list(windows)
+        logs = await asyncio.gather(*(
+            _git_log_numstat(path, since, until, semaphore, timeout) for path, (since, until) in windows.items()
+        ))
+        return dict(zip(paths, logs))
+    
+    return asyncio.run(run())
+
+def _attribute_commits(sessions, commits):
+    # Per-file stats of the commits made during each (id, start_ts, end_ts)
+    # session; commits must be sorted by time
+    from bisect import bisect_left, bisect_right
+    
+    times = [commit_ts for commit_ts, _ in commits]
+    attributed = {}
+    for session_id, start_ts, end_ts in sessions:
+        stats = {}
+        for _, files in commits[bisect_left(times, start_ts):bisect_right(times, end_ts)]:
+            _merge_file_stats(stats, files)
+        if stats:
+            attributed[session_id] = stats
+    return attributed
+
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+def _hash_file(path):
+    import hashlib
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(BLOB_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _encode_blob(data):
+    # Only keep the compressed form when it actually saves space
+    compressed = zlib.compress(data, 6)
+    if len(compressed) < len(data) * 0.9:
+        return 1, compressed
+    return 0, data
+
+def _rebuild_rollups(cursor):
+    cursor.execute('DELETE FROM rollup_hourly')
+    cursor.execute('DELETE FROM rollup_daily')
+    
+    hourly = defaultdict(int)
+    daily = defaultdict(lambda: [0, 0, 0, 0, 0])
+    rows = cursor.connection.execute(
+        '''SELECT project_name, start_ts, duration, files_changed, lines_added, lines_removed
+           FROM sessions WHERE end_ts IS NOT NULL AND start_ts IS NOT NULL'''
+    )
+    for project_name, start_ts, duration, files_changed, lines_added, lines_removed in rows:
+        totals = daily[(_local_date(start_ts), project_name)]
+        totals[1] += 1
+        totals[2] += files_changed or 0
+        totals[3] += lines_added or 0
+        totals[4] += lines_removed or 0
+        for date, hour, seconds in _split_by_hour(start_ts, duration or 0):
+            hourly[(project_name, date, hour)] += seconds
+            daily[(date, project_name)][0] += seconds
+    
+    cursor.executemany(
+        'INSERT INTO rollup_hourly (project_name, date, hour, seconds) VALUES (?, ?, ?, ?)',
+        [key + (seconds,) for key, seconds in hourly.items()]
+    )
+    cursor.executemany(
+        '''INSERT INTO rollup_daily (date, project_name, seconds, sessions, files_changed, lines_added, lines_removed)
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        [key + tuple(totals) for key, totals in daily.items()]
+    )
+
+GLOBAL_STREAK = ''
+
+def _streak_runs(rows):
+    # rows are (scope, date) in date order. Returns [scope, start_date,
+    # end_date, length, active] runs of consecutive days; the last run of
+    # each scope is the active one.
+    runs = []
+    latest = {}
+    date_str = ordinal = None
+    for scope, day in rows:
+        if day != date_str:
+            date_str, ordinal = day, datetime.date.fromisoformat(day).toordinal()
+        current = latest.get(scope)
+        if current is not None and current[1] == ordinal:
+            continue
+        if current is not None and current[1] == ordinal - 1:
+            run = current[0]
+            run[2] = date_str
+            run[3] += 1
+        else:
+            run = [scope, date_str, date_str, 1, 0]
+            runs.append(run)
+        latest[scope] = (run, ordinal)
+    for run, _ in latest.values():
+        run[4] = 1
+    return runs
+
+def _rebuild_streaks(cursor, scope=None):
+    # One ordered scan of activity; with a scope only that streak is redone
+    conn = cursor.connection
+    if scope is None:
+        cursor.execute('DELETE FROM streaks')
+        rows = conn.execute('SELECT date, project_name FROM activity ORDER BY date')
+        runs = _streak_runs((name, date) for date, project_name in rows for name in (GLOBAL_STREAK, project_name))
+    elif scope == GLOBAL_STREAK:
+        cursor.execute('DELETE FROM streaks WHERE project_name = ?', (scope,))
+        runs = _streak_runs((scope, date) for (date,) in conn.execute('SELECT DISTINCT date FROM activity ORDER BY date'))
+    else:
+        cursor.execute('DELETE FROM streaks WHERE project_name = ?', (scope,))
+        rows = conn.execute('SELECT date FROM activity WHERE project_name = ? ORDER BY date', (scope,))
+        runs = _streak_runs((scope, date) for (date,) in rows)
+    
+    cursor.executemany(
+        'INSERT INTO streaks (project_name, start_date, end_date, length, active) VALUES (?, ?, ?, ?, ?)',
+        runs
+    )
+    return runs
+
+# Achievement registry. `needs` lists the facts a rule reads and `check`
+# decides it for a finished session; `when` and `earned` do the same for
+# one sessions row when backfilling history. minutes, start_hour and
+# end_hour come from the session, the rest from ACHIEVEMENT_FACTS.
+ACHIEVEMENT_FACTS = {
+    'other_sessions': '''SELECT COUNT(*) FROM (SELECT 1 FROM sessions WHERE project_name = :project
+                         AND end_ts IS NOT NULL AND id != :session_id LIMIT 1)''',
+    'streak': '''SELECT COALESCE(MAX(length), 0) FROM streaks
+                 WHERE project_name = '' AND active = 1 AND end_date >= :date''',
+}
+
+ACHIEVEMENTS = [
+    {
+        'name': 'First Steps', 'description': 'Completed your first coding session',
+        'needs': ('other_sessions',), 'check': lambda facts: not facts['other_sessions'],
+        'when': '1', 'earned': 'start_date',
+    },
+    {
+        'name': 'Marathon Coder', 'description': 'Coded for 4+ hours in a single session',
+        'needs': ('minutes',), 'check': lambda facts: facts['minutes'] >= 240,
+        'when': 'duration >= 4 * 3600', 'earned': 'start_date',
+    },
+    {
+        'name': 'Week Warrior', 'description': 'Maintained a 7-day coding streak',
+        'needs': ('streak',), 'check': lambda facts: facts['streak'] >= 7,
+        'when': '''EXISTS (SELECT 1 FROM streaks k WHERE k.project_name = '' AND k.length >= 7
+                           AND sessions.start_date BETWEEN DATE(k.start_date, '+6 days') AND k.end_date)''',
+        'earned': 'start_date',
+    },
+    {
+        'name': 'Early Bird', 'description': 'Started coding before 8 AM',
+        'needs': ('start_hour',), 'check': lambda facts: facts['start_hour'] < 8,
+        'when': "CAST(strftime('%H', start_time) AS INTEGER) < 8", 'earned': 'start_date',
+    },
+    {
+        'name': 'Night Owl', 'description': 'Coded past 10 PM',
+        'needs': ('end_hour',), 'check': lambda facts: facts['end_hour'] >= 22,
+        'when': "CAST(strftime('%H', end_time) AS INTEGER) >= 22", 'earned': 'start_date',
+    },
+]
+
+def _achievement_facts_query():
+    # Earned names plus every fact some rule needs, as one SELECT
+    names = sorted({fact for rule in ACHIEVEMENTS for fact in rule['needs'] if fact in ACHIEVEMENT_FACTS})
+    columns = ''.join(f', ({ACHIEVEMENT_FACTS[name]}) AS {name}' for name in names)
+    query = f"SELECT (SELECT group_concat(name, char(31)) FROM achievements WHERE project_name = :project){columns}"
+    return query, names
+
+def _fts_query(text):
+    # Each word is matched literally (quoted, so punctuation is not FTS5
+    # syntax); a trailing * keeps prefix matching
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+def _like_snippet(content, words, start, end, width=60):
+    # Highlighted excerpt around the first match, for the LIKE fallback
+    lowered = content.lower()
+    first = min((lowered.find(word.lower()) for word in words if word.lower() in lowered), default=0)
+    begin = max(0, first - width // 3)
+    excerpt = content[begin:begin + width]
+    for word in words:
+        index = excerpt.lower().find(word.lower())
+        if index >= 0:
+            excerpt = excerpt[:index] + start + excerpt[index:index + len(word)] + end + excerpt[index + len(word):]
+    return ('…' if begin else '') + excerpt + ('…' if begin + width < len(content) else '')
+
+EXPORT_CHUNK_SIZE = 5000
+
+# Exported tables and the query that streams each one
+EXPORT_TABLES = {
+    'sessions': '''SELECT id, project_name, project_path, start_time, end_time, duration,
+                          files_changed, lines_added, lines_removed
+                   FROM sessions WHERE end_time IS NOT NULL ORDER BY start_ts DESC''',
+    'templates': 'SELECT id, name, description, created_at FROM templates ORDER BY id',
+    'template_files': '''SELECT t.name AS template, f.path, f.sha256, f.mode
+                         FROM template_files f JOIN templates t ON t.id = f.template_id
+                         ORDER BY t.name, f.path''',
+    'goals': 'SELECT goal_type, target_value, current_value, date, completed FROM goals ORDER BY id',
+    'activity': 'SELECT date, project_name, minutes_coded FROM activity ORDER BY date, project_name',
+    'streaks': 'SELECT project_name, start_date, end_date, length, active FROM streaks ORDER BY id',
+    'achievements': 'SELECT name, description, earned_date, project_name FROM achievements ORDER BY id',
+    'notes': 'SELECT id, session_id, content, created_at FROM notes ORDER BY id',
+    'tags': 'SELECT session_id, tag_name FROM tags ORDER BY session_id, tag_name',
+}
+
+# Exported tables that belong to a session, and the column naming it;
+# tag filters on export apply to these
+EXPORT_SESSION_COLUMNS = {'sessions': 'id', 'notes': 'session_id', 'tags': 'session_id'}
+
+@contextmanager
+def _open_export(path, compress=False):
+    import gzip
+    
+    if path == '-':
+        if compress:
+            with gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb') as raw:
+                stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                yield stream
+                stream.flush()
+                stream.detach()
+        else:
+            yield sys.stdout
+            sys.stdout.flush()
+    elif compress:
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+            yield f
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            yield f
+
+IMPORT_BATCH_SIZE = 10000
+
+SESSION_IMPORT_COLUMNS = (
+    'id', 'project_name', 'project_path', 'start_time', 'end_time', 'duration',
+    'files_changed', 'lines_added', 'lines_removed'
+)
+
+def _detect_import_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    for suffix, format_type in (('.ndjson', 'ndjson'), ('.jsonl', 'ndjson'), ('.json', 'json'), ('.csv', 'csv')):
+        if name.endswith(suffix):
+            return format_type
+    return None
+
+def _open_import(path):
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if magic == b'\x1f\x8b':
+        import gzip
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+def _read_import_file(path, format_type, table=None):
+    # Yields (table, record) pairs from any format export_data writes
+    import csv
+    import json
+    
+    with _open_import(path) as f:
+        if format_type == 'ndjson':
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.pop('table', table or 'sessions'), record
+        elif format_type == 'csv':
+            if table is None:
+                stem = os.path.basename(path).split('.')[0]
+                table = next((name for name in EXPORT_TABLES if stem.endswith(f'_{name}')), 'sessions')
+            for record in csv.DictReader(f):
+                yield table, {key: (value if value != '' else None) for key, value in record.items()}
+        else:
+            for name, records in json.load(f).items():
+                for record in records:
+                    yield name, record
+
+DEFAULT_IGNORE_PATTERNS = [
+    '.git', '__pycache__', '.vscode', '.idea', 'node_modules', '.venv', 'venv',
+    '.env', '.DS_Store', '*.pyc', '*.log', '*.tmp'
+]
+
+IGNORE_FILES = ('.devflowignore',)
+
+def _glob_to_regex(pattern):
+    # gitignore-style globs: '*' and '?' stay within one path segment,
+    # '**' may span segments
+    import re
+    
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile(''.join(parts) + r'\Z')
+
+class IgnoreRules:
+    
+    def __init__(self, patterns=(), base=''):
+        self.rules = []
+        self.add(patterns, base)
+    
+    def copy(self):
+        rules = IgnoreRules()
+        rules.rules = list(self.rules)
+        return rules
+    
+    def add(self, patterns, base=''):
+        for line in patterns:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            # Patterns containing a slash are anchored to the ignore file's
+            # directory; bare names match at any depth
+            anchored = '/' in line
+            line = line.lstrip('/')
+            if line:
+                self.rules.append((base, _glob_to_regex(line), anchored, dir_only, negated))
+    
+    def load(self, directory, base, names):
+        for name in names:
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    self.add(f.read().splitlines(), base)
+            except OSError:
+                pass
+    
+    def ignored(self, relative_path, is_dir=False):
+        name = relative_path.rsplit('/', 1)[-1]
+        ignored = False
+        for base, regex, anchored, dir_only, negated in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = relative_path
+            if base:
+                if not relative_path.startswith(base + '/'):
+                    continue
+                target = relative_path[len(base) + 1:]
+            # Last matching rule wins, as in .gitignore
+            if regex.match(target if anchored else name):
+                ignored = not negated
+        return ignored
+
+_DEFAULT_IGNORE_RULES = None
+
+def _default_ignore_rules():
+    # Compiled on first use; most commands never walk a tree
+    global _DEFAULT_IGNORE_RULES
+    if _DEFAULT_IGNORE_RULES is None:
+        _DEFAULT_IGNORE_RULES = IgnoreRules(DEFAULT_IGNORE_PATTERNS)
+    return _DEFAULT_IGNORE_RULES
+
+def _scan_project(root, rules, ignore_files=IGNORE_FILES, base=''):
+    # Yields (entry, relative_path, is_dir) for everything not ignored.
+    # Ignored directories (and virtualenvs) are pruned before descending,
+    # so node_modules and friends are never scanned. Ignore files found on
+    # the way are added to `rules` in place.
+    stack = [base]
+    while stack:
+        relative_dir = stack.pop()
+        directory = os.path.join(root, relative_dir) if relative_dir else str(root)
+        rules.load(directory, relative_dir, ignore_files)
+        
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        
+        for entry in entries:
+            relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if (not rules.ignored(relative_path, True)
+                            and not os.path.exists(os.path.join(entry.path, 'pyvenv.cfg'))):
+                        stack.append(relative_path)
+                        yield entry, relative_path, True
+                elif entry.is_file() and not rules.ignored(relative_path):
+                    yield entry, relative_path, False
+            except OSError:
+                continue
+
+def walk_project_files(root, rules=None, ignore_files=IGNORE_FILES):
+    rules = (rules or _default_ignore_rules()).copy()
+    for entry, relative_path, is_dir in _scan_project(root, rules, ignore_files):
+        if not is_dir:
+            yield entry.path, relative_path
+
+def _unlink_target(target):
+    # The target may be a hard link into the blob cache; writing through
+    # it would change the cached blob and every other project linked to it
+    try:
+        os.unlink(target)
+    except FileNotFoundError:
+        pass
+
+def _copy_file(source, target):
+    # copy_file_range lets the kernel copy (or reflink on CoW filesystems)
+    # without moving bytes through Python
+    _unlink_target(target)
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            if remaining == 0:
+                return
+    except (AttributeError, OSError):
+        pass
+    import shutil
+    shutil.copyfile(source, target)
+
+def _link_file(source, target):
+    # Returns False when it had to copy instead (e.g. across filesystems)
+    _unlink_target(target)
+    try:
+        os.link(source, target)
+        return True
+    except OSError:
+        _copy_file(source, target)
+        return False
+
+def _bounded_map(executor, func, items, window):
+    # Like executor.map, but keeps at most `window` results in flight so
+    # large trees are processed with bounded memory
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+SNAPSHOT_DIR = 'columns'
+SNAPSHOT_FORMAT = 1
+# Column files of the session snapshot, as array typecodes
+SNAPSHOT_COLUMNS = (
+    ('start_ts', 'q'), ('duration', 'q'), ('project', 'i'),
+    ('files_changed', 'q'), ('lines_added', 'q'), ('lines_removed', 'q'),
+)
+# Past this many sessions in range, summing rollups beats scanning columns
+# (about a year of history at 140 sessions a day)
+SNAPSHOT_SCAN_ROWS = 40000
+SNAPSHOT_BATCH_SIZE = 10000
+
+def _snapshot_file(directory, name, build):
+    return os.path.join(directory, f'{name}-{build}.col')
+
+def _read_snapshot_meta(directory):
+    import json
+    
+    try:
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    layout = [[name, code, struct.calcsize(code)] for name, code in SNAPSHOT_COLUMNS]
+    if (meta.get('format'), meta.get('byteorder'), meta.get('columns')) != (SNAPSHOT_FORMAT, sys.byteorder, layout):
+        return None
+    return meta
+
+class SessionColumns:
+    # Read-only view of a session snapshot: one memoryview per column over
+    # an mmapped file, rows sorted by start time. Only the rows recorded in
+    # meta.json are mapped; a builder may be appending past them.
+    
+    def __init__(self, directory, meta):
+        import mmap
+        
+        self.meta = meta
+        self.rows = meta['rows']
+        self.projects = meta['projects']
+        self.pending = 0
+        self._maps = []
+        self.columns = {}
+        try:
+            for name, code in SNAPSHOT_COLUMNS:
+                if not self.rows:
+                    self.columns[name] = memoryview(b'').cast(code)
+                    continue
+                with open(_snapshot_file(directory, name, meta['build']), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), self.rows * struct.calcsize(code), access=mmap.ACCESS_READ)
+                self._maps.append(mapped)
+                self.columns[name] = memoryview(mapped).cast(code)
+        except BaseException:
+            self.close()
+            raise
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        # Views must be released before their maps can be closed
+        for view in self.columns.values():
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self.columns = {}
+        self._maps = []
+
+class TagFilter:
+    # Restricts analytics to sessions carrying all (mode 'all') or any of
+    # `tags` and none of `without`. Each part is a semi-join on the
+    # session_tags primary key, so only tagged sessions are visited.
+    
+    def __init__(self, tags=(), without=(), mode='all'):
+        self.tags = sorted(set(tags or ()))
+        self.without = sorted(set(without or ()))
+        self.mode = mode
+    
+    def __bool__(self):
+        return bool(self.tags or self.without)
+    
+    def __str__(self):
+        parts = [(' or ' if self.mode == 'any' else ' and ').join(self.tags)] if self.tags else []
+        parts += [f'not {tag}' for tag in self.without]
+        return ', '.join(parts)
+    
+    def clause(self, column):
+        # SQL condition on a session id column, and its parameters
+        conditions = []
+        params = []
+        if self.tags:
+            query = f'''SELECT st.session_id FROM session_tags st JOIN tag_names n ON n.id = st.tag_id
+                        WHERE n.name IN ({', '.join('?' * len(self.tags))})'''
+            if self.mode == 'all' and len(self.tags) > 1:
+                query += f' GROUP BY st.session_id HAVING COUNT(*) = {len(self.tags)}'
+            conditions.append(f'{column} IN ({query})')
+            params += self.tags
+        if self.without:
+            conditions.append(
+                f'''{column} NOT IN (SELECT st.session_id FROM session_tags st JOIN tag_names n ON n.id = st.tag_id
+                                     WHERE n.name IN ({', '.join('?' * len(self.without))}))'''
+            )
+            params += self.without
+        return ' AND '.join(conditions) or '1', params
+
+class DevFlowDB:
+    
+    def __init__(self, db_path=None, read_only=False):
+        from pathlib import Path
+        
+        if db_path is None:
+            db_path = _default_db_path()
+        
+        self.db_path = Path(db_path)
+        self.read_only = read_only
+        if not read_only:
+            self.db_path.parent.mkdir(exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.init_database()
+    
+    def connect(self):
+        # One long-lived connection per thread; autocommit mode so that
+        # explicit transactions are only opened by transaction().
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            import sqlite3
+            # check_same_thread is off only so close() can close every
+            # thread's connection; each is still used by one thread
+            factory = _PROFILER.connection_class() if _PROFILER else sqlite3.Connection
+            if self.read_only:
+                # Someone else's database: mode=ro guarantees it is never
+                # written, so not even the journal mode is touched
+                conn = sqlite3.connect(f'{self.db_path.resolve().as_uri()}?mode=ro', uri=True,
+                                       timeout=BUSY_TIMEOUT, isolation_level=None,
+                                       check_same_thread=False, factory=factory)
+            else:
+                conn = sqlite3.connect(str(self.db_path), timeout=BUSY_TIMEOUT, isolation_level=None,
+                                       check_same_thread=False, factory=factory)
+                # WAL lets readers and a writer proceed concurrently across
+                # processes; NORMAL sync is durable enough for WAL
+                _retry_locked(conn.execute, 'PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        if self._local.depth:
+            # Nested transactions join the outermost one
+            self._local.depth += 1
+            try:
+                yield cursor
+            finally:
+                self._local.depth -= 1
+            return
+        
+        _retry_locked(cursor.execute, 'BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            yield cursor
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.depth = 0
+    
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+    
+    def init_database(self):
+        cursor = self.connect().cursor()
+        if cursor.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return
+        if self.read_only:
+            # Older read-only files are migrated in a private in-memory copy
+            self._copy_to_memory()
+        
+        with self.transaction() as cursor:
+            # Re-read under the write lock in case another process migrated first
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            for number in range(version + 1, SCHEMA_VERSION + 1):
+                MIGRATIONS[number - 1](cursor)
+                cursor.execute(f'PRAGMA user_version = {number}')
+    
+    def _copy_to_memory(self):
+        # The copy belongs to this thread's connection; read-only databases
+        # are only used from the thread that opened them
+        import sqlite3
+        
+        source = self.connect()
+        factory = _PROFILER.connection_class() if _PROFILER else sqlite3.Connection
+        memory = sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False, factory=factory)
+        with _traced('io', f'copy {self.db_path.name} to memory'):
+            source.backup(memory)
+        self.close()
+        self._local.conn = memory
+        self._local.depth = 0
+        self._connections.append(memory)
+    
+    def execute_query(self, query, params=None, fetch=False, fetch_one=False):
+        cursor = self.connect().cursor()
+        
+        if params:
+            _retry_locked(cursor.execute, query, params)
+        else:
+            _retry_locked(cursor.execute, query)
+        
+        result = None
+        if fetch_one:
+            result = cursor.fetchone()
+        elif fetch:
+            result = cursor.fetchall()
+        else:
+            result = cursor.lastrowid
+        
+        cursor.close()
+        return result
+
+    def update_streak(self, project_name, date_str=None):
+        # Only the active run of the global and the project streak is read
+        # (through a unique partial index), so a stop costs O(1)
+        date_str = date_str or datetime.date.today().strftime('%Y-%m-%d')
+        day = datetime.date.fromisoformat(date_str)
+        
+        with self.transaction() as cursor:
+            for scope in (GLOBAL_STREAK, project_name):
+                cursor.execute(
+                    'SELECT id, start_date, end_date FROM streaks WHERE project_name = ? AND active = 1', (scope,)
+                )
+                current = cursor.fetchone()
+                if current is None:
+                    cursor.execute(
+                        'INSERT INTO streaks (project_name, start_date, end_date, length) VALUES (?, ?, ?, 1)',
+                        (scope, date_str, date_str)
+                    )
+                    continue
+                
+                streak_id, start_date, end_date = current
+                gap = (day - datetime.date.fromisoformat(end_date)).days
+                if gap == 1:
+                    cursor.execute('UPDATE streaks SET end_date = ?, length = length + 1 WHERE id = ?', (date_str, streak_id))
+                elif gap > 1:
+                    cursor.execute('UPDATE streaks SET active = 0 WHERE id = ?', (streak_id,))
+                    cursor.execute(
+                        'INSERT INTO streaks (project_name, start_date, end_date, length) VALUES (?, ?, ?, 1)',
+                        (scope, date_str, date_str)
+                    )
+                elif date_str < start_date:
+                    # A backdated day can join or split older runs
+                    _rebuild_streaks(cursor, scope)
+
+    def check_achievements(self, project_name, session_id, minutes, start_dt, end_dt):
+        # Called inside the stop transaction, after the session is closed
+        # and its activity and streak are recorded
+        query, names = _achievement_facts_query()
+        date_str = start_dt.strftime('%Y-%m-%d')
+        
+        with self.transaction() as cursor:
+            row = cursor.execute(query, {'project': project_name, 'session_id': session_id, 'date': date_str}).fetchone()
+            earned = set(row[0].split('\x1f')) if row[0] else set()
+            facts = dict(zip(names, row[1:]), minutes=minutes, start_hour=start_dt.hour, end_hour=end_dt.hour)
+            
+            awarded = [rule for rule in ACHIEVEMENTS if rule['name'] not in earned and rule['check'](facts)]
+            cursor.executemany(
+                'INSERT OR IGNORE INTO achievements (name, description, earned_date, project_name) VALUES (?, ?, ?, ?)',
+                [(rule['name'], rule['description'], date_str, project_name) for rule in awarded]
+            )
+        for rule in awarded:
+            print(f"Achievement unlocked: {rule['name']} - {rule['description']}")
+
+    def add_note(self, session_id, content):
+        with self.transaction() as cursor:
+            cursor.execute('INSERT INTO notes (session_id, content) VALUES (?, ?)', (session_id, content))
+
+    def get_notes(self, session_id=None):
+        cursor = self.connect().cursor()
+        
+        if session_id:
+            cursor.execute('SELECT * FROM notes WHERE session_id = ? ORDER BY created_at', (session_id,))
+        else:
+            cursor.execute('SELECT * FROM notes ORDER BY created_at DESC LIMIT 20')
+        
+        notes = cursor.fetchall()
+        return notes
+
+    def has_notes_index(self):
+        cursor = self.connect().cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'")
+        return cursor.fetchone() is not None
+    
+    def search_notes(self, text, project_name=None, since=None, until=None, tags=(), limit=20,
+                     highlight=('[', ']')):
+        # Returns (note id, session id, project, created_at, snippet), best
+        # match first; dates are inclusive YYYY-MM-DD bounds on created_at
+        filters = []
+        params = []
+        if project_name:
+            filters.append('s.project_name = ?')
+            params.append(project_name)
+        if since:
+            filters.append('n.created_at >= ?')
+            params.append(since)
+        if until:
+            filters.append("n.created_at < DATE(?, '+1 day')")
+            params.append(until)
+        for tag in tags:
+            filters.append('''EXISTS (SELECT 1 FROM session_tags st JOIN tag_names tn ON tn.id = st.tag_id
+                                      WHERE st.session_id = n.session_id AND tn.name = ?)''')
+            params.append(tag)
+        
+        cursor = self.connect().cursor()
+        if self.has_notes_index():
+            match = _fts_query(text)
+            if not match:
+                return []
+            cursor.execute(
+                f'''SELECT n.id, n.session_id, s.project_name, n.created_at,
+                           snippet(notes_fts, 0, ?, ?, '…', 12)
+                    FROM notes_fts
+                    JOIN notes n ON n.id = notes_fts.rowid
+                    LEFT JOIN sessions s ON s.id = n.session_id
+                    WHERE notes_fts MATCH ? {''.join(' AND ' + f for f in filters)}
+                    ORDER BY rank LIMIT ?''',
+                [*highlight, match, *params, limit]
+            )
+            return cursor.fetchall()
+        
+        # Without FTS5: every word must appear, newest first
+        words = [word.rstrip('*') for word in text.split() if word.rstrip('*')]
+        if not words:
+            return []
+        for word in words:
+            filters.append("n.content LIKE ? ESCAPE '\\'")
+            params.append('%' + word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        cursor.execute(
+            f'''SELECT n.id, n.session_id, s.project_name, n.created_at, n.content
+                FROM notes n LEFT JOIN sessions s ON s.id = n.session_id
+                WHERE {' AND '.join(filters)}
+                ORDER BY n.created_at DESC LIMIT ?''',
+            [*params, limit]
+        )
+        return [row[:4] + (_like_snippet(row[4], words, *highlight),) for row in cursor.fetchall()]
+    
+    def get_achievements(self, project_name=None):
+        cursor = self.connect().cursor()
+        
+        if project_name:
+            cursor.execute('SELECT * FROM achievements WHERE project_name = ? ORDER BY earned_date DESC', (project_name,))
+        else:
+            cursor.execute('SELECT * FROM achievements ORDER BY earned_date DESC')
+        
+        achievements = cursor.fetchall()
+        return achievements
+
+    def get_current_streak(self, project_name=None):
+        # The latest run only counts while it reaches yesterday or today
+        yesterday = (datetime.date.today() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+        cursor = self.connect().cursor()
+        cursor.execute(
+            'SELECT length FROM streaks WHERE project_name = ? AND active = 1 AND end_date >= ?',
+            (project_name or GLOBAL_STREAK, yesterday)
+        )
+        result = cursor.fetchone()
+        return result[0] if result else 0
+    
+    def get_longest_streak(self, project_name=None):
+        cursor = self.connect().cursor()
+        cursor.execute('SELECT MAX(length) FROM streaks WHERE project_name = ?', (project_name or GLOBAL_STREAK,))
+        return cursor.fetchone()[0] or 0
+
+    def get_productivity_score(self, project_name, days=7):
+        cursor = self.connect().cursor()
+        cursor.execute(
+            'SELECT SUM(seconds) FROM rollup_daily WHERE project_name = ? AND date >= ?',
+            (project_name, _cutoff_date(days))
+        )
+        return _productivity_score(cursor.fetchone()[0] or 0, days)
+
+    def get_weekly_summary(self, project_name, tag_filter=None):
+        if tag_filter:
+            rows = self.get_tagged_totals(7, tag_filter, project_name)
+            _, seconds, sessions, files, added, removed = rows[0] if rows else (None, 0, 0, 0, 0, 0)
+            result = (sessions, seconds, files, added, removed)
+            score = _productivity_score(seconds, 7)
+        else:
+            cursor = self.connect().cursor()
+            cursor.execute(
+                '''SELECT SUM(sessions), SUM(seconds), SUM(files_changed), SUM(lines_added), SUM(lines_removed)
+                   FROM rollup_daily WHERE project_name = ? AND date >= ?''',
+                (project_name, _cutoff_date(7))
+            )
+            result = cursor.fetchone()
+            score = self.get_productivity_score(project_name, 7)
+        session_count = result[0] or 0
+        total_seconds = result[1] or 0
+        
+        return {
+            'session_count': session_count,
+            'total_time': total_seconds // 60,
+            'avg_session': total_seconds // session_count // 60 if session_count else 0,
+            'files_changed': result[2] or 0,
+            'lines_added': result[3] or 0,
+            'lines_removed': result[4] or 0,
+            'productivity_score': score,
+            'current_streak': self.get_current_streak()
+        }
+
+    def add_session_tag(self, session_id, tag_name):
+        with self.transaction() as cursor:
+            cursor.execute('INSERT OR IGNORE INTO tag_names (name) VALUES (?)', (tag_name,))
+            cursor.execute(
+                'INSERT OR IGNORE INTO session_tags (tag_id, session_id) SELECT id, ? FROM tag_names WHERE name = ?',
+                (session_id, tag_name)
+            )
+
+    def get_tag_totals(self, days=None):
+        # (tag, sessions, seconds) for every tag, optionally over recent days
+        query = '''SELECT n.name, COUNT(*), COALESCE(SUM(s.duration), 0)
+                   FROM tag_names n
+                   JOIN session_tags st ON st.tag_id = n.id
+                   JOIN sessions s ON s.id = st.session_id
+                   WHERE s.end_ts IS NOT NULL'''
+        params = []
+        if days:
+            query += ' AND s.start_ts >= ?'
+            params.append(_cutoff_epoch(days))
+        cursor = self.connect().cursor()
+        cursor.execute(query + ' GROUP BY n.id ORDER BY 3 DESC', params)
+        return cursor.fetchall()
+    
+    def get_session_tags(self, session_id):
+        cursor = self.connect().cursor()
+        cursor.execute(
+            '''SELECT n.name FROM session_tags st JOIN tag_names n ON n.id = st.tag_id
+               WHERE st.session_id = ? ORDER BY n.name''',
+            (session_id,)
+        )
+        tags = [row[0] for row in cursor.fetchall()]
+        return tags
+
+    def add_session_rollups(self, project_name, start_ts, duration, files_changed=0, lines_added=0, lines_removed=0):
+        with self.transaction() as cursor:
+            _apply_rollups(cursor, project_name, start_ts, duration, files_changed, lines_added, lines_removed)
+
+    def rebuild_rollups(self):
+        with self.transaction() as cursor:
+            _rebuild_rollups(cursor)
+
+    def has_blob(self, sha256):
+        cursor = self.connect().cursor()
+        cursor.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (sha256,))
+        return cursor.fetchone() is not None
+
+    def prepare_blob(self, file_path):
+        # Hash by streaming first so files already in the store are never
+        # loaded; new content is re-hashed as read in case it changed.
+        # Safe to call from worker threads.
+        with _traced('io', 'blob hash'):
+            sha256 = _hash_file(file_path)
+        if self.has_blob(sha256):
+            return sha256, None
+        
+        import hashlib
+        
+        with _traced('io', 'blob read+compress'):
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            sha256 = hashlib.sha256(data).hexdigest()
+            compressed, payload = _encode_blob(data)
+        return sha256, (len(data), compressed, payload)
+
+    def put_blob(self, sha256, size, compressed, payload):
+        with self.transaction() as cursor:
+            cursor.execute(
+                'INSERT OR IGNORE INTO blobs (sha256, size, compressed, data) VALUES (?, ?, ?, ?)',
+                (sha256, size, compressed, payload)
+            )
+
+    def store_blob(self, file_path):
+        sha256, blob = self.prepare_blob(file_path)
+        if blob is not None:
+            self.put_blob(sha256, *blob)
+        return sha256
+
+    def read_blob(self, sha256):
+        cursor = self.connect().cursor()
+        cursor.execute('SELECT compressed, data FROM blobs WHERE sha256 = ?', (sha256,))
+        result = cursor.fetchone()
+        if result is None:
+            return None
+        compressed, data = result
+        return zlib.decompress(data) if compressed else bytes(data)
+
+    def get_git_range(self, base_sha, head_sha):
+        cursor = self.connect().cursor()
+        cursor.execute('SELECT id FROM git_ranges WHERE base_sha = ? AND head_sha = ?', (base_sha, head_sha))
+        result = cursor.fetchone()
+        if result is None:
+            return None
+        cursor.execute('SELECT path, lines_added, lines_removed FROM git_range_files WHERE range_id = ?', (result[0],))
+        return {path: (added, removed) for path, added, removed in cursor}
+
+    def save_git_range(self, base_sha, head_sha, stats):
+        with self.transaction() as cursor:
+            cursor.execute('INSERT OR IGNORE INTO git_ranges (base_sha, head_sha) VALUES (?, ?)', (base_sha, head_sha))
+            cursor.execute('SELECT id FROM git_ranges WHERE base_sha = ? AND head_sha = ?', (base_sha, head_sha))
+            range_id = cursor.fetchone()[0]
+            cursor.executemany(
+                'INSERT OR REPLACE INTO git_range_files (range_id, path, lines_added, lines_removed) VALUES (?, ?, ?, ?)',
+                [(range_id, path, added, removed) for path, (added, removed) in stats.items()]
+            )
+
+    def save_session_file_stats(self, session_id, stats):
+        with self.transaction() as cursor:
+            cursor.executemany(
+                'INSERT OR REPLACE INTO session_file_stats (session_id, path, lines_added, lines_removed) VALUES (?, ?, ?, ?)',
+                [(session_id, path, added, removed) for path, (added, removed) in stats.items()]
+            )
+    
+    def get_sessions_missing_git_stats(self, project_name=None):
+        # Finished sessions without git stats as (id, project_name, path,
+        # start_ts, end_ts). Sessions started without a path use the latest
+        # path recorded for their project.
+        cursor = self.connect().cursor()
+        query = '''SELECT id, project_name, project_path, start_ts, end_ts FROM sessions
+                   WHERE end_ts IS NOT NULL AND start_ts IS NOT NULL AND active = 0
+                     AND COALESCE(files_changed, 0) = 0 AND COALESCE(lines_added, 0) = 0
+                     AND COALESCE(lines_removed, 0) = 0'''
+        params = []
+        if project_name:
+            query += ' AND project_name = ?'
+            params.append(project_name)
+        sessions = cursor.execute(query, params).fetchall()
+        
+        paths = {}
+        if any(path is None for _, _, path, _, _ in sessions):
+            # SQLite takes the bare project_path from the MAX(id) row
+            paths = {name: path for name, path, _ in cursor.execute(
+                '''SELECT project_name, project_path, MAX(id) FROM sessions
+                   WHERE project_path IS NOT NULL GROUP BY project_name'''
+            )}
+        return [
+            (session_id, name, path or paths[name], start_ts, end_ts)
+            for session_id, name, path, start_ts, end_ts in sessions
+            if path or name in paths
+        ]
+    
+    def save_enriched_git_stats(self, sessions):
+        # (session id, project_name, start_ts, stats) for sessions that had
+        # no git stats. One transaction of batched statements; rollups gain
+        # the counts on the day each session started.
+        session_updates = []
+        rollup_updates = []
+        files = []
+        for session_id, project_name, start_ts, stats in sessions:
+            totals = (len(stats), sum(added for added, _ in stats.values()),
+                      sum(removed for _, removed in stats.values()))
+            session_updates.append(totals + (session_id,))
+            rollup_updates.append(totals + (_local_date(start_ts), project_name))
+            files.extend((session_id, path, added, removed) for path, (added, removed) in stats.items())
+        
+        with self.transaction() as cursor:
+            cursor.executemany(
+                'UPDATE sessions SET files_changed = ?, lines_added = ?, lines_removed = ? WHERE id = ?',
+                session_updates
+            )
+            cursor.executemany(
+                'INSERT OR REPLACE INTO session_file_stats (session_id, path, lines_added, lines_removed) VALUES (?, ?, ?, ?)',
+                files
+            )
+            cursor.executemany(
+                '''UPDATE rollup_daily
+                   SET files_changed = files_changed + ?, lines_added = lines_added + ?, lines_removed = lines_removed + ?
+                   WHERE date = ? AND project_name = ?''',
+                rollup_updates
+            )
+
+    def iter_table(self, table, tag_filter=None):
+        # Rows are pulled from the cursor in fixed-size chunks so exports
+        # never hold a whole table in memory
+        cursor = self.connect().cursor()
+        if tag_filter and table in EXPORT_SESSION_COLUMNS:
+            clause, params = tag_filter.clause(f'exported.{EXPORT_SESSION_COLUMNS[table]}')
+            cursor.execute(f'SELECT * FROM ({EXPORT_TABLES[table]}) AS exported WHERE {clause}', params)
+        else:
+            cursor.execute(EXPORT_TABLES[table])
+        columns = [column[0] for column in cursor.description]
+        
+        def rows():
+            while True:
+                chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield from chunk
+        
+        return columns, rows()
+
+    def import_records(self, records):
+        # Records are staged in temp tables with executemany, then merged
+        # with set-based statements; derived tables are rebuilt once at the end
+        counts = Counter()
+        with self.transaction() as cursor:
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS import_sessions (
+                    source_id INTEGER, project_name TEXT, project_path TEXT,
+                    start_time TEXT, end_time TEXT, duration INTEGER,
+                    files_changed INTEGER, lines_added INTEGER, lines_removed INTEGER,
+                    start_ts INTEGER, end_ts INTEGER, start_date TEXT
+                )
+            ''')
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS import_notes (source_session_id INTEGER, content TEXT, created_at TEXT)')
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS import_tags (source_session_id INTEGER, tag_name TEXT)')
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS import_goals (goal_type TEXT, target_value INTEGER, date TEXT)')
+            for table in ('import_sessions', 'import_notes', 'import_tags', 'import_goals'):
+                cursor.execute(f'DELETE FROM temp.{table}')
+            
+            staged = {'sessions': [], 'notes': [], 'tags': [], 'goals': []}
+            statements = {
+                'sessions': 'INSERT INTO import_sessions (source_id, project_name, project_path, start_time, end_time, '
+                            'duration, files_changed, lines_added, lines_removed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                'notes': 'INSERT INTO import_notes VALUES (?, ?, ?)',
+                'tags': 'INSERT INTO import_tags VALUES (?, ?)',
+                'goals': 'INSERT INTO import_goals VALUES (?, ?, ?)',
+            }
+            
+            for table, record in records:
+                if table == 'sessions':
+                    if not record.get('project_name') or not record.get('start_time') or not record.get('end_time'):
+                        counts['invalid'] += 1
+                        continue
+                    row = tuple(record.get(column) for column in SESSION_IMPORT_COLUMNS)
+                elif table == 'notes':
+                    row = (record.get('session_id'), record.get('content'), record.get('created_at'))
+                elif table == 'tags':
+                    row = (record.get('session_id'), record.get('tag_name'))
+                elif table == 'goals':
+                    row = (record.get('goal_type'), record.get('target_value'), record.get('date'))
+                else:
+                    # Derived or blob-backed tables are not imported
+                    counts[f'skipped_{table}'] += 1
+                    continue
+                
+                staged[table].append(row)
+                counts[f'read_{table}'] += 1
+                if len(staged[table]) >= IMPORT_BATCH_SIZE:
+                    cursor.executemany(statements[table], staged[table])
+                    staged[table] = []
+            
+            for table, rows in staged.items():
+                if rows:
+                    cursor.executemany(statements[table], rows)
+            
+            cursor.execute('''
+                UPDATE import_sessions
+                SET start_ts = CAST(strftime('%s', start_time, 'utc') AS INTEGER),
+                    end_ts = CAST(strftime('%s', end_time, 'utc') AS INTEGER),
+                    start_date = DATE(start_time),
+                    duration = COALESCE(duration, CAST(strftime('%s', end_time) AS INTEGER) - CAST(strftime('%s', start_time) AS INTEGER))
+            ''')
+            
+            # Deduplicate on (project_name, start_time), both within the
+            # file (MIN(rowid) keeps the first copy) and against the database
+            cursor.execute('''
+                INSERT INTO sessions (project_name, project_path, start_time, end_time, duration,
+                                      files_changed, lines_added, lines_removed, active,
+                                      start_ts, end_ts, start_date)
+                SELECT project_name, project_path, start_time, end_time, duration,
+                       COALESCE(files_changed, 0), COALESCE(lines_added, 0), COALESCE(lines_removed, 0), 0,
+                       start_ts, end_ts, start_date
+                FROM (SELECT MIN(rowid), * FROM import_sessions
+                      WHERE start_ts IS NOT NULL GROUP BY project_name, start_time) i
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM sessions s
+                    WHERE s.project_name = i.project_name AND s.start_ts = i.start_ts AND s.start_time = i.start_time
+                )
+            ''')
+            counts['sessions'] = cursor.rowcount
+            unparseable = cursor.execute('SELECT COUNT(*) FROM import_sessions WHERE start_ts IS NULL').fetchone()[0]
+            counts['invalid'] += unparseable
+            counts['duplicates'] = counts['read_sessions'] - counts['sessions'] - unparseable
+            
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS import_session_map (source_id INTEGER PRIMARY KEY, session_id INTEGER)')
+            cursor.execute('DELETE FROM temp.import_session_map')
+            cursor.execute('''
+                INSERT INTO import_session_map (source_id, session_id)
+                SELECT i.source_id, s.id FROM import_sessions i
+                JOIN sessions s ON s.project_name = i.project_name AND s.start_ts = i.start_ts AND s.start_time = i.start_time
+                WHERE i.source_id IS NOT NULL
+                GROUP BY i.source_id
+            ''')
+            
+            cursor.execute('''
+                INSERT INTO notes (session_id, content, created_at)
+                SELECT m.session_id, n.content, COALESCE(n.created_at, CURRENT_TIMESTAMP)
+                FROM import_notes n JOIN import_session_map m ON m.source_id = n.source_session_id
+                WHERE n.content IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM notes x
+                    WHERE x.session_id = m.session_id AND x.created_at IS n.created_at AND x.content = n.content
+                )
+            ''')
+            counts['notes'] = cursor.rowcount
+            # Notes and tags only name their session by its id in the export,
+            # so they need that session in the same import
+            counts['unmatched_notes'] = cursor.execute('''
+                SELECT COUNT(*) FROM import_notes
+                WHERE source_session_id IS NULL OR source_session_id NOT IN (SELECT source_id FROM import_session_map)
+            ''').fetchone()[0]
+            
+            cursor.execute('INSERT OR IGNORE INTO tag_names (name) SELECT DISTINCT tag_name FROM import_tags WHERE tag_name IS NOT NULL')
+            cursor.execute('''
+                INSERT OR IGNORE INTO session_tags (tag_id, session_id)
+                SELECT n.id, m.session_id
+                FROM import_tags t
+                JOIN import_session_map m ON m.source_id = t.source_session_id
+                JOIN tag_names n ON n.name = t.tag_name
+            ''')
+            counts['tags'] = cursor.rowcount
+            counts['unmatched_tags'] = cursor.execute('''
+                SELECT COUNT(*) FROM import_tags
+                WHERE source_session_id IS NULL OR source_session_id NOT IN (SELECT source_id FROM import_session_map)
+            ''').fetchone()[0]
+            
+            cursor.execute('''
+                INSERT OR IGNORE INTO goals (goal_type, target_value, date)
+                SELECT goal_type, target_value, date FROM import_goals g
+                WHERE goal_type IS NOT NULL AND date IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM goals x WHERE x.goal_type = g.goal_type AND x.date = g.date
+                )
+            ''')
+            counts['goals'] = cursor.rowcount
+            
+            if counts['sessions']:
+                self.rebuild_derived()
+        return counts
+
+    def rebuild_activity(self):
+        with self.transaction() as cursor:
+            cursor.execute('DELETE FROM activity')
+            cursor.execute('''
+                INSERT INTO activity (date, project_name, minutes_coded)
+                SELECT start_date, project_name, SUM(duration / 60)
+                FROM sessions WHERE end_ts IS NOT NULL AND start_date IS NOT NULL
+                GROUP BY start_date, project_name
+            ''')
+
+    def rebuild_streaks(self):
+        with self.transaction() as cursor:
+            return _rebuild_streaks(cursor)
+
+    def backfill_achievements(self, recompute=False):
+        # A single grouped scan over sessions finds, per project, the first
+        # date each rule was met; recompute drops existing awards first
+        columns = ', '.join(f"MIN(CASE WHEN {rule['when']} THEN {rule['earned']} END)" for rule in ACHIEVEMENTS)
+        with self.transaction() as cursor:
+            if recompute:
+                cursor.execute('DELETE FROM achievements')
+            rows = cursor.connection.execute(
+                f'SELECT project_name, {columns} FROM sessions WHERE end_ts IS NOT NULL GROUP BY project_name'
+            ).fetchall()
+            cursor.executemany(
+                'INSERT OR IGNORE INTO achievements (name, description, earned_date, project_name) VALUES (?, ?, ?, ?)',
+                [(rule['name'], rule['description'], earned_date, project_name)
+                 for project_name, *dates in rows
+                 for rule, earned_date in zip(ACHIEVEMENTS, dates) if earned_date]
+            )
+            return cursor.rowcount
+
+    def rebuild_derived(self):
+        with self.transaction():
+            self.rebuild_activity()
+            self.rebuild_rollups()
+            self.rebuild_streaks()
+            self.backfill_achievements()
+
+    def record_file_activity(self, rows):
+        with self.transaction() as cursor:
+            cursor.executemany(
+                'INSERT OR IGNORE INTO file_activity (project_name, bucket_ts) VALUES (?, ?)',
+                [(project_name, bucket_ts) for project_name, bucket_ts, _ in rows]
+            )
+            cursor.executemany(
+                'UPDATE file_activity SET events = events + ? WHERE project_name = ? AND bucket_ts = ?',
+                [(events, project_name, bucket_ts) for project_name, bucket_ts, events in rows]
+            )
+
+    @property
+    def blob_cache_dir(self):
+        return self.db_path.parent / 'blobs'
+
+    def materialize_blob(self, sha256, mode=None):
+        # Write a blob once into the on-disk cache so templates can be
+        # applied by linking instead of rewriting bytes. Entries are kept
+        # per mode, without write bits, since links share the cache inode.
+        cache_mode = (0o444 if mode is None else mode) & 0o555
+        cache_path = self.blob_cache_dir / sha256[:2] / f"{sha256}-{cache_mode:03o}"
+        if not cache_path.exists():
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temp_path, 'wb') as f:
+                f.write(self.read_blob(sha256))
+            os.chmod(temp_path, cache_mode)
+            os.replace(temp_path, cache_path)
+        return cache_path
+
+    def get_template_id(self, name):
+        cursor = self.connect().cursor()
+        cursor.execute('SELECT id FROM templates WHERE name = ?', (name,))
+        result = cursor.fetchone()
+        return result[0] if result else None
+
+    def add_template(self, name, description=None):
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO templates (name, description, files) VALUES (?, ?, '')",
+                (name, description)
+            )
+            return cursor.lastrowid
+
+    def add_template_file(self, template_id, path, sha256, mode=None):
+        with self.transaction() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO template_files (template_id, path, sha256, mode) VALUES (?, ?, ?, ?)',
+                (template_id, path, sha256, mode)
+            )
+
+    def iter_template_files(self, template_id):
+        cursor = self.connect().cursor()
+        cursor.execute(
+            'SELECT path, sha256, mode FROM template_files WHERE template_id = ? ORDER BY path',
+            (template_id,)
+        )
+        return cursor
+
+    @property
+    def snapshot_dir(self):
+        return self.db_path.parent / SNAPSHOT_DIR
+    
+    def build_session_columns(self, full=False):
+        # Appends sessions finished since the last build to the snapshot.
+        # It is rewritten instead when covered sessions changed, or when new
+        # ones start before its last row (imports), since rows stay sorted.
+        # Returns (rows, rows written, rewritten).
+        import json
+        from array import array
+        
+        directory = str(self.snapshot_dir)
+        os.makedirs(directory, exist_ok=True)
+        # The write lock also keeps concurrent builders apart
+        with self.transaction() as cursor:
+            covered_id, generation = cursor.execute('SELECT covered_id, generation FROM session_snapshot').fetchone()
+            meta = None if full else _read_snapshot_meta(directory)
+            if meta and (meta.get('database'), meta['covered_id'], meta['generation']) != (
+                    self.db_path.name, covered_id, generation):
+                meta = None
+            # An active session is still changing; stop just before it
+            active_id, last_id = cursor.execute(
+                'SELECT (SELECT MIN(id) FROM sessions WHERE active = 1), (SELECT MAX(id) FROM sessions)'
+            ).fetchone()
+            new_covered_id = active_id - 1 if active_id else last_id or 0
+            if meta and meta['rows']:
+                earliest = cursor.execute(
+                    'SELECT MIN(start_ts) FROM sessions WHERE id > ? AND id <= ? AND end_ts IS NOT NULL',
+                    (meta['covered_id'], new_covered_id)
+                ).fetchone()[0]
+                if earliest is not None and earliest < meta['last_start']:
+                    meta = None
+            
+            rewrite = meta is None
+            if rewrite:
+                previous = _read_snapshot_meta(directory)
+                meta = {
+                    'format': SNAPSHOT_FORMAT, 'byteorder': sys.byteorder, 'database': self.db_path.name,
+                    'columns': [[name, code, struct.calcsize(code)] for name, code in SNAPSHOT_COLUMNS],
+                    'build': previous['build'] + 1 if previous else 1,
+                    'rows': 0, 'projects': [], 'last_start': None, 'max_duration': 0,
+                }
+            project_ids = {name: index for index, name in enumerate(meta['projects'])}
+            
+            files = []
+            for name, code in SNAPSHOT_COLUMNS:
+                f = open(_snapshot_file(directory, name, meta['build']), 'wb' if rewrite else 'r+b')
+                # Drops anything a failed build appended past the last good row
+                f.truncate(meta['rows'] * struct.calcsize(code))
+                f.seek(0, os.SEEK_END)
+                files.append(f)
+            try:
+                rows = cursor.execute(
+                    """SELECT start_ts, COALESCE(duration, 0), project_name, COALESCE(files_changed, 0),
+                              COALESCE(lines_added, 0), COALESCE(lines_removed, 0)
+                       FROM sessions WHERE id > ? AND id <= ? AND end_ts IS NOT NULL AND start_ts IS NOT NULL
+                       ORDER BY start_ts, id""",
+                    (0 if rewrite else meta['covered_id'], new_covered_id)
+                )
+                written = 0
+                while True:
+                    batch = rows.fetchmany(SNAPSHOT_BATCH_SIZE)
+                    if not batch:
+                        break
+                    columns = [array(code) for _, code in SNAPSHOT_COLUMNS]
+                    for start_ts, duration, project_name, files_changed, lines_added, lines_removed in batch:
+                        project_id = project_ids.get(project_name)
+                        if project_id is None:
+                            project_id = project_ids[project_name] = len(meta['projects'])
+                            meta['projects'].append(project_name)
+                        for column, value in zip(columns, (start_ts, duration, project_id, files_changed,
+                                                           lines_added, lines_removed)):
+                            column.append(value)
+                    for column, f in zip(columns, files):
+                        column.tofile(f)
+                    meta['last_start'] = batch[-1][0]
+                    meta['max_duration'] = max(meta['max_duration'], max(columns[1]))
+                    written += len(batch)
+            finally:
+                for f in files:
+                    f.close()
+            
+            meta.update(rows=meta['rows'] + written, covered_id=new_covered_id, generation=generation)
+            cursor.execute('UPDATE session_snapshot SET covered_id = ?', (new_covered_id,))
+            temp_path = os.path.join(directory, f'meta.json.{os.getpid()}.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(temp_path, os.path.join(directory, 'meta.json'))
+        
+        if rewrite:
+            # Readers of an older build keep their maps; new readers follow meta.json
+            current = {os.path.basename(_snapshot_file(directory, name, meta['build'])) for name, _ in SNAPSHOT_COLUMNS}
+            for name in os.listdir(directory):
+                if name.endswith('.col') and name not in current:
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except OSError:
+                        pass
+        return meta['rows'], written, rewrite
+    
+    def clear_session_columns(self):
+        import shutil
+        
+        with self.transaction() as cursor:
+            cursor.execute('UPDATE session_snapshot SET covered_id = 0')
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+    
+    def session_columns(self):
+        # The snapshot when it still matches the database, else None.
+        # `pending` counts sessions newer than it, which readers add from SQL.
+        meta = _read_snapshot_meta(str(self.snapshot_dir))
+        if meta is None:
+            return None
+        covered_id, generation, last_id = self.connect().execute(
+            'SELECT covered_id, generation, (SELECT MAX(id) FROM sessions) FROM session_snapshot'
+        ).fetchone()
+        # Databases sharing a directory (team mode) must not share a snapshot
+        if (meta.get('database'), meta['covered_id'], meta['generation']) != (self.db_path.name, covered_id, generation):
+            return None
+        try:
+            columns = SessionColumns(str(self.snapshot_dir), meta)
+        except (OSError, ValueError):
+            return None
+        columns.pending = max(0, (last_id or 0) - covered_id)
+        return columns
+    
+    def _column_totals(self, days):
+        # get_project_totals from the snapshot, matching the rollups: time
+        # from the cutoff on (sessions that started before it add the part
+        # past it), sessions and git stats by start. None when there is no
+        # snapshot or the range is long enough that rollups are cheaper.
+        from bisect import bisect_left
+        
+        columns = self.session_columns()
+        if columns is None:
+            return None
+        with columns:
+            cutoff = _cutoff_epoch(days)
+            start = columns.columns['start_ts']
+            first = bisect_left(start, cutoff)
+            lookback = bisect_left(start, cutoff - columns.meta['max_duration'], 0, first)
+            if columns.rows - lookback + columns.pending > SNAPSHOT_SCAN_ROWS:
+                return None
+            
+            names = list(columns.projects)
+            seconds = [0] * len(names)
+            sessions = [0] * len(names)
+            files = [0] * len(names)
+            added = [0] * len(names)
+            removed = [0] * len(names)
+            duration = columns.columns['duration']
+            project = columns.columns['project']
+            for index in range(lookback, first):
+                if start[index] + duration[index] > cutoff:
+                    seconds[project[index]] += start[index] + duration[index] - cutoff
+            for project_id, length, changed, lines_added, lines_removed in zip(
+                project[first:], duration[first:], columns.columns['files_changed'][first:],
+                columns.columns['lines_added'][first:], columns.columns['lines_removed'][first:]
+            ):
+                seconds[project_id] += length
+                sessions[project_id] += 1
+                files[project_id] += changed
+                added[project_id] += lines_added
+                removed[project_id] += lines_removed
+            
+            if columns.pending:
+                project_ids = {name: index for index, name in enumerate(names)}
+                rows = self.connect().execute(
+                    """SELECT start_ts, COALESCE(duration, 0), project_name, COALESCE(files_changed, 0),
+                              COALESCE(lines_added, 0), COALESCE(lines_removed, 0)
+                       FROM sessions WHERE id > ? AND end_ts IS NOT NULL AND start_ts IS NOT NULL""",
+                    (columns.meta['covered_id'],)
+                )
+                for start_ts, length, project_name, changed, lines_added, lines_removed in rows:
+                    project_id = project_ids.get(project_name)
+                    if project_id is None:
+                        project_id = project_ids[project_name] = len(names)
+                        names.append(project_name)
+                        for totals in (seconds, sessions, files, added, removed):
+                            totals.append(0)
+                    if start_ts >= cutoff:
+                        seconds[project_id] += length
+                        sessions[project_id] += 1
+                        files[project_id] += changed
+                        added[project_id] += lines_added
+                        removed[project_id] += lines_removed
+                    elif start_ts + length > cutoff:
+                        seconds[project_id] += start_ts + length - cutoff
+        
+        rows = [row for row in zip(names, seconds, sessions, files, added, removed) if row[1] or row[2]]
+        rows.sort(key=lambda row: (-row[1], row[0]))
+        return rows
+    
+    def get_tagged_totals(self, days, tag_filter, project_name=None):
+        # Rollups are not kept per tag, so tag-filtered totals are summed
+        # from the matching sessions, by start time. Same columns as
+        # get_project_totals.
+        clause, params = tag_filter.clause('s.id')
+        query = f'''SELECT project_name, SUM(duration), COUNT(*), SUM(files_changed),
+                           SUM(lines_added), SUM(lines_removed)
+                    FROM sessions s
+                    WHERE s.end_ts IS NOT NULL AND s.start_ts >= ? AND {clause}'''
+        params = [_cutoff_epoch(days)] + params
+        if project_name:
+            query += ' AND s.project_name = ?'
+            params.append(project_name)
+        cursor = self.connect().cursor()
+        cursor.execute(query + ' GROUP BY project_name ORDER BY SUM(duration) DESC', params)
+        return cursor.fetchall()
+    
+    def get_project_totals(self, days=7, tag_filter=None):
+        if tag_filter:
+            return self.get_tagged_totals(days, tag_filter)
+        totals = self._column_totals(days)
+        if totals is not None:
+            return totals
+        cursor = self.connect().cursor()
+        cursor.execute(
+            '''SELECT project_name, SUM(seconds), SUM(sessions), SUM(files_changed),
+                      SUM(lines_added), SUM(lines_removed)
+               FROM rollup_daily
+               WHERE date >= ?
+               GROUP BY project_name
+               ORDER BY SUM(seconds) DESC''',
+            (_cutoff_date(days),)
+        )
+        return cursor.fetchall()
+
+    def get_project_leaderboard(self, days=30, tag_filter=None):
+        totals = self.get_tagged_totals(days, tag_filter) if tag_filter else self._column_totals(days)
+        if totals is not None:
+            return [
+                (project_name, sessions, seconds // 60, seconds // max(sessions, 1) // 60, files, added)
+                for project_name, seconds, sessions, files, added, _ in totals[:10]
+            ]
+        cursor = self.connect().cursor()
+        cursor.execute(
+            '''SELECT project_name, 
+                      SUM(sessions) as session_count,
+                      SUM(seconds) / 60 as total_minutes,
+                      SUM(seconds) / MAX(SUM(sessions), 1) / 60 as avg_session,
+                      SUM(files_changed) as total_files,
+                      SUM(lines_added) as total_lines_added
+               FROM rollup_daily 
+               WHERE date >= ?
+               GROUP BY project_name 
+               ORDER BY total_minutes DESC
+               LIMIT 10''',
+            (_cutoff_date(days),)
+        )
+        results = cursor.fetchall()
+        return results
+
+    def get_daily_minutes(self, start_date, project_name=None):
+        cursor = self.connect().cursor()
+        if project_name:
+            cursor.execute(
+                "SELECT date, SUM(minutes_coded) FROM activity WHERE date >= ? AND project_name = ? GROUP BY date",
+                (start_date, project_name)
+            )
+        else:
+            cursor.execute(
+                "SELECT date, SUM(minutes_coded) FROM activity WHERE date >= ? GROUP BY date",
+                (start_date,)
+            )
+        return dict(cursor.fetchall())
+    
+    def get_daily_series(self, first_day, days, project_name=None, tag_filter=None):
+        # Dense per-day minutes for `days` days from first_day, indexed by
+        # day offset; SQLite computes the offsets so no dates are parsed
+        last_day = first_day + datetime.timedelta(days=days)
+        start = first_day.strftime('%Y-%m-%d')
+        if tag_filter:
+            clause, params = tag_filter.clause('s.id')
+            query = f"""SELECT CAST(julianday(start_date) - julianday(?) AS INTEGER), SUM(duration / 60)
+                        FROM sessions s
+                        WHERE s.end_ts IS NOT NULL AND s.start_ts >= ? AND s.start_ts < ? AND {clause}"""
+            params = [start, _epoch(datetime.datetime.combine(first_day, datetime.time())),
+                      _epoch(datetime.datetime.combine(last_day, datetime.time()))] + params
+            group = " GROUP BY start_date"
+        else:
+            query = """SELECT CAST(julianday(date) - julianday(?) AS INTEGER), SUM(minutes_coded)
+                       FROM activity WHERE date >= ? AND date < ?"""
+            params = [start, start, last_day.strftime('%Y-%m-%d')]
+            group = " GROUP BY date"
+        if project_name:
+            query += " AND project_name = ?"
+            params.append(project_name)
+        
+        series = [0] * days
+        cursor = self.connect().cursor()
+        for offset, minutes in cursor.execute(query + group, params):
+            series[offset] = minutes
+        return series
+
+    def get_time_distribution(self, project_name, days=7):
+        cursor = self.connect().cursor()
+        cursor.execute(
+            '''SELECT hour, SUM(seconds)
+               FROM rollup_hourly 
+               WHERE project_name = ? AND date >= ?
+               GROUP BY hour
+               ORDER BY hour''',
+            (project_name, _cutoff_date(days))
+        )
+        results = cursor.fetchall()
+        
+        hour_data = {}
+        for hour, seconds in results:
+            if seconds >= 60:
+                hour_data[hour] = seconds // 60
+        
+        return hour_data
+
+def _default_db_path():
+    return os.path.join(os.path.expanduser('~'), '.devflow', 'devflow.db')
+
+SESSION_STATE_FILE = 'session'
+SESSION_STATE_FIELDS = ('id', 'project_name', 'project_path', 'start_time', 'start_commit')
+PROMPT_STATE_FILE = 'prompt'
+
+def _state_path(db_path, name):
+    return os.path.join(os.path.dirname(str(db_path)), name)
+
+def _state_fresh(db_path, name):
+    # A cache file is only trusted while it is at least as new as the
+    # database (and its WAL), so writes from older versions or other
+    # tools invalidate it
+    try:
+        state_mtime = os.stat(_state_path(db_path, name)).st_mtime_ns
+    except OSError:
+        return False
+    for path in (str(db_path), f"{db_path}-wal"):
+        try:
+            if os.stat(path).st_mtime_ns > state_mtime:
+                return False
+        except FileNotFoundError:
+            pass
+    return True
+
+def _read_state(db_path, name):
+    # Returns the cached lines, or False when SQLite has to be consulted
+    if not _state_fresh(db_path, name):
+        return False
+    try:
+        with open(_state_path(db_path, name), encoding='utf-8') as f:
+            return f.read().splitlines()
+    except OSError:
+        return False
+
+def _write_state(db_path, name, lines):
+    # One field per line so the files are trivial to read from Python or
+    # a shell without json or sqlite3
+    path = _state_path(db_path, name)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(f"{line}\n" for line in lines))
+        os.replace(temp_path, path)
+    except OSError:
+        # Only a cache; a stale file is ignored because the database is newer
+        pass
+
+def _session_state_fresh(db_path):
+    return _state_fresh(db_path, SESSION_STATE_FILE)
+
+def _read_session_state(db_path):
+    # Returns the cached active session, None when idle, or False when
+    # SQLite has to be consulted
+    lines = _read_state(db_path, SESSION_STATE_FILE)
+    if lines is False:
+        return False
+    if not lines:
+        return None
+    if len(lines) != len(SESSION_STATE_FIELDS) or not lines[0].isdigit():
+        return False
+    session = {field: value or None for field, value in zip(SESSION_STATE_FIELDS, lines)}
+    session['id'] = int(session['id'])
+    return session
+
+def _write_session_state(db_path, session):
+    lines = [] if session is None else [str(session.get(field) or '') for field in SESSION_STATE_FIELDS]
+    _write_state(db_path, SESSION_STATE_FILE, lines)
+
+PROMPT_STATE_FIELDS = ('project_name', 'start_ts', 'date', 'today_seconds', 'goal_seconds')
+
+def _clock(seconds):
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}"
+
+def _format_prompt(lines, now=None):
+    # "<project> <elapsed> <today>/<goal>", leaving out parts with no data.
+    # PROMPT_SNIPPETS reproduce this in shell code.
+    project, start_ts, date, today_seconds, goal_seconds = lines
+    now = int(now or time.time())
+    if date != time.strftime('%Y-%m-%d', time.localtime(now)):
+        today_seconds = goal_seconds = 0
+    
+    parts = []
+    elapsed = 0
+    if project:
+        elapsed = max(0, now - int(start_ts))
+        parts += [project, _clock(elapsed)]
+    if int(goal_seconds or 0) > 0:
+        parts.append(f"{_clock(int(today_seconds or 0) + elapsed)}/{_clock(int(goal_seconds))}")
+    return ' '.join(parts)
+
+# Shell integrations that format ~/.devflow/prompt without starting
+# Python; they fall back to `devflow prompt` when the file is stale.
+PROMPT_SNIPPETS = {
+    'bash': r"""# devflow prompt segment. In ~/.bashrc:
+#   eval "$(devflow prompt --shell bash)"
+#   PS1='${DEVFLOW_PROMPT:+[$DEVFLOW_PROMPT] }'"$PS1"
+__devflow_prompt() {
+    local dir="$HOME/.devflow" project start date spent goal now today elapsed=0 segment
+    DEVFLOW_PROMPT=
+    if [[ ! -f $dir/prompt || $dir/devflow.db -nt $dir/prompt || $dir/devflow.db-wal -nt $dir/prompt ]]; then
+        DEVFLOW_PROMPT=$(devflow prompt 2>/dev/null)
+        return
+    fi
+    { read -r project; read -r start; read -r date; read -r spent; read -r goal; } < "$dir/prompt"
+    now=${EPOCHSECONDS:-$(date +%s)}
+    printf -v today '%(%Y-%m-%d)T' "$now"
+    [[ $date == "$today" ]] || { spent=0; goal=0; }
+    if [[ -n $project ]]; then
+        elapsed=$(( now > start ? now - start : 0 ))
+        printf -v DEVFLOW_PROMPT '%s %d:%02d' "$project" $(( elapsed / 3600 )) $(( elapsed % 3600 / 60 ))
+    fi
+    if (( goal > 0 )); then
+        spent=$(( spent + elapsed ))
+        printf -v segment '%d:%02d/%d:%02d' $(( spent / 3600 )) $(( spent % 3600 / 60 )) $(( goal / 3600 )) $(( goal % 3600 / 60 ))
+        DEVFLOW_PROMPT="${DEVFLOW_PROMPT:+$DEVFLOW_PROMPT }$segment"
+    fi
+}
+PROMPT_COMMAND="__devflow_prompt${PROMPT_COMMAND:+;$PROMPT_COMMAND}"
+""",
+    'zsh': r"""# devflow prompt segment. In ~/.zshrc:
+#   eval "$(devflow prompt --shell zsh)"
+#   setopt prompt_subst; PROMPT='${DEVFLOW_PROMPT:+[$DEVFLOW_PROMPT] }'"$PROMPT"
+zmodload zsh/datetime
+__devflow_prompt() {
+    local dir=$HOME/.devflow project start date spent goal today elapsed=0 segment
+    DEVFLOW_PROMPT=
+    if [[ ! -f $dir/prompt || $dir/devflow.db -nt $dir/prompt || $dir/devflow.db-wal -nt $dir/prompt ]]; then
+        DEVFLOW_PROMPT=$(devflow prompt 2>/dev/null)
+        return
+    fi
+    { read -r project; read -r start; read -r date; read -r spent; read -r goal; } < $dir/prompt
+    strftime -s today %Y-%m-%d $EPOCHSECONDS
+    [[ $date == $today ]] || { spent=0; goal=0; }
+    if [[ -n $project ]]; then
+        (( elapsed = EPOCHSECONDS > start ? EPOCHSECONDS - start : 0 ))
+        printf -v DEVFLOW_PROMPT '%s %d:%02d' $project $(( elapsed / 3600 )) $(( elapsed % 3600 / 60 ))
+    fi
+    if (( goal > 0 )); then
+        (( spent += elapsed ))
+        printf -v segment '%d:%02d/%d:%02d' $(( spent / 3600 )) $(( spent % 3600 / 60 )) $(( goal / 3600 )) $(( goal % 3600 / 60 ))
+        DEVFLOW_PROMPT="${DEVFLOW_PROMPT:+$DEVFLOW_PROMPT }$segment"
+    fi
+}
+autoload -Uz add-zsh-hook
+add-zsh-hook precmd __devflow_prompt
+""",
+    'fish': r"""# devflow prompt segment. In ~/.config/fish/config.fish:
+#   devflow prompt --shell fish | source
+# then call __devflow_prompt from fish_prompt or fish_right_prompt
+function __devflow_prompt
+    set -l dir $HOME/.devflow
+    set -l stamp (path mtime $dir/prompt 2>/dev/null)
+    if test -z "$stamp"
+        devflow prompt 2>/dev/null
+        return
+    end
+    for mtime in (path mtime $dir/devflow.db $dir/devflow.db-wal 2>/dev/null)
+        if test $mtime -gt $stamp
+            devflow prompt 2>/dev/null
+            return
+        end
+    end
+    set -l lines
+    while read -l line
+        set -a lines $line
+    end < $dir/prompt
+    set -l clock (date '+%s %Y-%m-%d' | string split ' ')
+    set -l spent $lines[4]
+    set -l goal $lines[5]
+    if test "$lines[3]" != "$clock[2]"
+        set spent 0
+        set goal 0
+    end
+    set -l parts
+    set -l elapsed 0
+    if test -n "$lines[1]"
+        set elapsed (math "$clock[1] - $lines[2]")
+        test $elapsed -lt 0; and set elapsed 0
+        set -a parts $lines[1] (printf '%d:%02d' (math "floor($elapsed / 3600)") (math "floor($elapsed % 3600 / 60)"))
+    end
+    if test "$goal" -gt 0
+        set spent (math "$spent + $elapsed")
+        set -a parts (printf '%d:%02d/%d:%02d' (math "floor($spent / 3600)") (math "floor($spent % 3600 / 60)") \
+            (math "floor($goal / 3600)") (math "floor($goal % 3600 / 60)"))
+    end
+    string join ' ' -- $parts
+end
+""",
+}
+
+def _format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds}s"
+    elif seconds < 3600:
+        return f"{seconds//60}m {seconds%60}s"
+    else:
+        hours = seconds // 3600
+        minutes = (seconds % 3600) // 60
+        return f"{hours}h {minutes}m"
+
+HEATMAP_CHARS = '░▒▓█'
+INTENSITY_THRESHOLDS = (60, 180)
+HEATMAP_DAY_LABELS = ('   ', 'Mon', '   ', 'Wed', '   ', 'Fri', '   ')
+HEATMAP_BAND_WEEKS = 52
+
+def _intensity_level(minutes, thresholds=INTENSITY_THRESHOLDS):
+    from bisect import bisect_right
+    
+    if minutes <= 0:
+        return 0
+    return 1 + bisect_right(thresholds, minutes)
+
+def _quantile_thresholds(minutes, levels=len(HEATMAP_CHARS) - 1):
+    # Cut points that split the active days into equal groups, so every
+    # shade is used whatever the range or how long a typical day is
+    active = sorted(value for value in minutes if value > 0)
+    if not active:
+        return INTENSITY_THRESHOLDS
+    thresholds = tuple(active[len(active) * step // levels] for step in range(1, levels))
+    # Sparse or uniform days give equal cut points: one shade would go
+    # unused and the legend would repeat itself
+    if any(low >= high for low, high in zip(thresholds, thresholds[1:])):
+        return INTENSITY_THRESHOLDS
+    return thresholds
+
+def render_heatmap(minutes, first_day, thresholds, band_weeks=HEATMAP_BAND_WEEKS):
+    # minutes[i] is the total for first_day + i days. Columns are weeks
+    # starting on Sunday; long ranges wrap into bands of band_weeks.
+    from bisect import bisect_right
+    
+    lead = (first_day.weekday() + 1) % 7
+    grid_start = first_day - datetime.timedelta(days=lead)
+    total_weeks = (lead + len(minutes) + 6) // 7
+    cell = ' {} ' if total_weeks <= 26 else ' {}'
+    width = len(cell.format(' '))
+    
+    shades = [cell.format(char) for char in HEATMAP_CHARS]
+    blank = ' ' * width
+    cells = [blank] * lead
+    cells.extend(shades[1 + bisect_right(thresholds, value)] if value > 0 else shades[0] for value in minutes)
+    cells.extend([blank] * (total_weeks * 7 - len(cells)))
+    
+    lines = []
+    for band_start in range(0, total_weeks, band_weeks):
+        band_end = min(total_weeks, band_start + band_weeks)
+        if total_weeks > band_weeks:
+            band_first = max(first_day, grid_start + datetime.timedelta(weeks=band_start))
+            band_last = min(first_day + datetime.timedelta(days=len(minutes) - 1),
+                            grid_start + datetime.timedelta(weeks=band_end, days=-1))
+            lines.append(f"{band_first:%b %d, %Y} - {band_last:%b %d, %Y}")
+        
+        # Month names go over the first week starting in that month; a
+        # name that would run into the next one is left out
+        labels = []
+        previous_month = None
+        for column, week in enumerate(range(band_start, band_end)):
+            week_start = grid_start + datetime.timedelta(weeks=week)
+            if week_start.month != previous_month:
+                previous_month = week_start.month
+                labels.append((4 + column * width, week_start.strftime('%b')))
+        header = [' '] * (4 + (band_end - band_start) * width + 3)
+        for index, (position, name) in enumerate(labels):
+            if index + 1 == len(labels) or labels[index + 1][0] >= position + 4:
+                header[position:position + 3] = name
+        lines.append(''.join(header).rstrip())
+        
+        for row, label in enumerate(HEATMAP_DAY_LABELS):
+            lines.append((label + ''.join(cells[band_start * 7 + row:band_end * 7:7])).rstrip())
+        lines.append('')
+    return '\n'.join(lines)
+
+def _print_status(session):
+    if not session:
+        print("No active session")
+        return
+    
+    start_dt = datetime.datetime.fromisoformat(session['start_time'])
+    current_duration = int((datetime.datetime.now() - start_dt).total_seconds())
+    
+    print(f"Active Session: {session['project_name']}")
+    print(f"   Started: {start_dt.strftime('%H:%M:%S')}")
+    print(f"   Duration: {_format_duration(current_duration)}")
+    if session.get('project_path'):
+        print(f"   Path: {session['project_path']}")
+
+TEAM_CACHE_FILE = 'team-cache.json'
+
+def _team_databases(directory):
+    # (developer, path) for every *.db below `directory`; the developer is
+    # the path relative to it without the suffix
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.db'):
+                path = os.path.join(root, name)
+                found.append((os.path.relpath(path, directory)[:-3], os.path.abspath(path)))
+    return found
+
+def _database_stamp(path):
+    # Any write changes the size or mtime of the file or of a non-empty
+    # WAL; read-only opens leave an empty WAL behind, which is ignored
+    stat = os.stat(path)
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    try:
+        wal = os.stat(f"{path}-wal")
+        if wal.st_size:
+            stamp += [wal.st_mtime_ns, wal.st_size]
+    except FileNotFoundError:
+        pass
+    return stamp
+
+def _team_partial(path, days, first_day, series_days):
+    # Runs in a worker process: the usual aggregates against one
+    # database, opened read-only. Plain lists so results pickle and cache
+    # as JSON.
+    import sqlite3
+    
+    try:
+        db = DevFlowDB(path, read_only=True)
+        try:
+            return {
+                'projects': [list(row) for row in db.get_project_totals(days)],
+                'daily': db.get_daily_series(first_day, series_days),
+                'streak': db.get_current_streak(),
+                'longest_streak': db.get_longest_streak(),
+            }
+        finally:
+            db.close()
+    except sqlite3.DatabaseError as e:
+        return {'error': str(e)}
+
+def _read_team_cache(path):
+    import json
+    
+    try:
+        with open(path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Entries written by another schema version may hold other aggregates
+    return cache.get('entries', {}) if cache.get('schema') == SCHEMA_VERSION else {}
+
+def _write_team_cache(path, entries):
+    import json
+    
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'schema': SCHEMA_VERSION, 'entries': entries}, f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+def collect_team_stats(directory, days=7, weeks=12, jobs=None, cache_path=None):
+    # Aggregates every database below `directory` in a process pool and
+    # merges the results. Per-database results are cached by file stamp
+    # and query, so only databases that changed are read again.
+    from itertools import repeat
+    from concurrent.futures import ProcessPoolExecutor
+    
+    first_day = datetime.date.today() - datetime.timedelta(weeks=weeks)
+    series_days = weeks * 7 + 1
+    query = [days, first_day.isoformat(), series_days]
+    
+    cache = _read_team_cache(cache_path) if cache_path else {}
+    partials = {}
+    todo = []
+    for developer, path in _team_databases(directory):
+        try:
+            stamp = _database_stamp(path)
+        except OSError:
+            continue
+        entry = cache.get(path)
+        if entry and entry['stamp'] == stamp and entry['query'] == query:
+            partials[developer] = entry['result']
+        else:
+            todo.append((developer, path, stamp))
+    
+    if len(todo) > 1:
+        workers = min(jobs or os.cpu_count() or 1, len(todo))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_team_partial, [path for _, path, _ in todo],
+                                        repeat(days), repeat(first_day), repeat(series_days)))
+    else:
+        results = [_team_partial(path, days, first_day, series_days) for _, path, _ in todo]
+    
+    for (developer, path, stamp), result in zip(todo, results):
+        partials[developer] = result
+        if 'error' not in result:
+            cache[path] = {'stamp': stamp, 'query': query, 'result': result}
+    if cache_path and todo:
+        _write_team_cache(cache_path, {path: entry for path, entry in cache.items() if os.path.exists(path)})
+    
+    stats = merge_team_partials(partials, series_days)
+    stats.update(first_day=first_day, read=len(todo))
+    return stats
+
+def merge_team_partials(partials, series_days):
+    # Project totals are summed by name across developers, the daily
+    # series element-wise
+    projects = {}
+    developers = []
+    errors = []
+    daily = [0] * series_days
+    for developer in sorted(partials):
+        partial = partials[developer]
+        if 'error' in partial:
+            errors.append((developer, partial['error']))
+            continue
+        seconds = sessions = 0
+        for project_name, *values in partial['projects']:
+            totals = projects.setdefault(project_name, [0, 0, 0, 0, 0, 0])
+            for index, value in enumerate(values):
+                totals[index] += value or 0
+            totals[5] += 1
+            seconds += values[0] or 0
+            sessions += values[1] or 0
+        for index, minutes in enumerate(partial['daily']):
+            daily[index] += minutes
+        developers.append((developer, seconds, sessions, partial['streak'], partial['longest_streak']))
+    
+    # (project, seconds, sessions, files, added, removed, developers)
+    leaderboard = sorted(((name, *totals) for name, totals in projects.items()), key=lambda row: (-row[1], row[0]))
+    developers.sort(key=lambda row: (-row[1], row[0]))
+    return {'projects': leaderboard, 'developers': developers, 'daily': daily, 'errors': errors}
+
+class DevFlowCLI:
+    
+    def __init__(self):
+        self.db = DevFlowDB()
+        self.current_session = None
+        self.load_current_session()
+    
+    def close(self):
+        # Closing checkpoints the WAL into devflow.db, which would make
+        # state files written by this process look stale; re-stamp the
+        # ones that were current
+        fresh = [name for name in (SESSION_STATE_FILE, PROMPT_STATE_FILE)
+                 if _state_fresh(self.db.db_path, name)]
+        self.db.close()
+        for name in fresh:
+            try:
+                os.utime(_state_path(self.db.db_path, name))
+            except OSError:
+                pass
+    
+    def load_current_session(self):
+        sessions = self.db.execute_query(
+            """SELECT id, project_name, project_path, start_time, start_commit
+               FROM sessions WHERE active = 1 ORDER BY id DESC LIMIT 1""",
+            fetch=True
+        )
+        
+        if sessions:
+            session = sessions[0]
+            self.current_session = {
+                'id': session[0],
+                'project_name': session[1],
+                'project_path': session[2],
+                'start_time': session[3],
+                'start_commit': session[4]
+            }
+        
+        if not _session_state_fresh(self.db.db_path):
+            _write_session_state(self.db.db_path, self.current_session)
+    
+    def start_session(self, project_name=None, project_path=None, start_dt=None):
+        import sqlite3
+        
+        if self.current_session:
+            print(f"WARNING: Session already active for '{self.current_session['project_name']}'")
+            print(f"   Started: {self.current_session['start_time']}")
+            return
+        
+        if not project_name:
+            current_dir = os.getcwd()
+            project_name = os.path.basename(current_dir)
+            project_path = current_dir
+        
+        start_dt = start_dt or datetime.datetime.now()
+        start_time = start_dt.isoformat()
+        # Recording HEAD lets stop diff exactly what changed during the session
+        start_commit = _git_head(project_path) if project_path else None
+        
+        try:
+            session_id = self.db.execute_query(
+                """INSERT INTO sessions (project_name, project_path, start_time, start_ts, start_date, start_commit)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (project_name, project_path, start_time, _epoch(start_dt), start_dt.strftime('%Y-%m-%d'), start_commit)
+            )
+        except sqlite3.IntegrityError:
+            # Another process started a session since ours was loaded; the
+            # unique index on active sessions makes the insert the check
+            self.load_current_session()
+            if not self.current_session:
+                raise
+            return self.start_session(project_name, project_path, start_dt)
+        
+        self.current_session = {
+            'id': session_id,
+            'project_name': project_name,
+            'project_path': project_path,
+            'start_time': start_time,
+            'start_commit': start_commit
+        }
+        _write_session_state(self.db.db_path, self.current_session)
+        self.save_prompt_state()
+        
+        print(f"Started session for '{project_name}'")
+        print(f"   Time: {start_dt.strftime('%H:%M:%S')}")
+        if project_path:
+            print(f"   Path: {project_path}")
+    
+    def stop_session(self, include_worktree=True, end_dt=None):
+        if not self.current_session:
+            print("No active session found")
+            return
+        
+        start_dt = datetime.datetime.fromisoformat(self.current_session['start_time'])
+        end_dt = max(end_dt or datetime.datetime.now(), start_dt)
+        end_time = end_dt.isoformat()
+        duration = int((end_dt - start_dt).total_seconds())
+        
+        file_stats = self.collect_git_stats(include_worktree)
+        files_changed = len(file_stats)
+        lines_added = sum(added for added, _ in file_stats.values())
+        lines_removed = sum(removed for _, removed in file_stats.values())
+        
+        date_str = start_dt.strftime('%Y-%m-%d')
+        minutes = duration // 60
+        
+        # Session close, activity, streak and achievements commit atomically,
+        # and only for the stop that actually closes the session
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                """UPDATE sessions 
+                   SET end_time = ?, end_ts = ?, duration = ?, active = 0, 
+                       files_changed = ?, lines_added = ?, lines_removed = ?
+                   WHERE id = ? AND active = 1""",
+                (end_time, _epoch(end_dt), duration, files_changed, lines_added, lines_removed, self.current_session['id'])
+            )
+            closed = cursor.rowcount == 1
+            if closed:
+                self.db.save_session_file_stats(self.current_session['id'], file_stats)
+                
+                cursor.execute(
+                    """INSERT OR REPLACE INTO activity (date, project_name, minutes_coded)
+                       VALUES (?, ?, COALESCE((SELECT minutes_coded FROM activity WHERE date = ? AND project_name = ?), 0) + ?)""",
+                    (date_str, self.current_session['project_name'], date_str, self.current_session['project_name'], minutes)
+                )
+                
+                self.db.add_session_rollups(
+                    self.current_session['project_name'], _epoch(start_dt), duration,
+                    files_changed, lines_added, lines_removed
+                )
+                self.db.update_streak(self.current_session['project_name'], date_str)
+                self.db.check_achievements(self.current_session['project_name'], self.current_session['id'],
+                                           minutes, start_dt, end_dt)
+        
+        if not closed:
+            # Another stop closed it first
+            self.current_session = None
+            print("No active session found")
+            return
+        
+        print(f"Stopped session for '{self.current_session['project_name']}'")
+        print(f"   Duration: {self.format_duration(duration)}")
+        print(f"   Current streak: {self.db.get_current_streak()} days")
+        if files_changed > 0:
+            print(f"   Files changed: {files_changed}")
+            print(f"   Lines: +{lines_added} -{lines_removed}")
+        
+        self.current_session = None
+        _write_session_state(self.db.db_path, None)
+        self.save_prompt_state()
+    
+    def collect_git_stats(self, include_worktree=True):
+        session = self.current_session
+        if not session or not session.get('project_path'):
+            return {}
+        
+        repo_path = session['project_path']
+        head = _git_head(repo_path)
+        if head is None:
+            return {}
+        
+        stats = {}
+        start_commit = session.get('start_commit')
+        if start_commit and start_commit != head:
+            committed = self.db.get_git_range(start_commit, head)
+            if committed is None:
+                output = _run_git(repo_path, 'diff', '--numstat', '--no-renames', f'{start_commit}..{head}')
+                if output is not None:
+                    committed = _parse_numstat(output)
+                    self.db.save_git_range(start_commit, head, committed)
+            _merge_file_stats(stats, committed or {})
+        
+        # Uncommitted (staged and unstaged) changes relative to HEAD
+        if include_worktree:
+            output = _run_git(repo_path, 'diff', '--numstat', '--no-renames', 'HEAD')
+            if output is not None:
+                _merge_file_stats(stats, _parse_numstat(output))
+        
+        return stats
+    
+    def enrich_sessions(self, project_name=None, jobs=ENRICH_JOBS, timeout=ENRICH_TIMEOUT):
+        # Backfills git stats for finished sessions that have none: one
+        # `git log` per repository over all its sessions, run concurrently
+        started = time.perf_counter()
+        by_repo = defaultdict(list)
+        for session in self.db.get_sessions_missing_git_stats(project_name):
+            by_repo[session[2]].append(session)
+        if not by_repo:
+            print("No sessions are missing git stats")
+            return
+        
+        windows = {
+            repo_path: (min(session[3] for session in sessions), max(session[4] for session in sessions))
+            for repo_path, sessions in by_repo.items()
+        }
+        logs = _git_logs(windows, jobs, timeout)
+        
+        enriched = []
+        failed = []
+        for repo_path, sessions in by_repo.items():
+            if logs[repo_path] is None:
+                failed.append(repo_path)
+                continue
+            attributed = _attribute_commits([(session[0], session[3], session[4]) for session in sessions],
+                                            logs[repo_path])
+            enriched.extend((session[0], session[1], session[3], attributed[session[0]])
+                            for session in sessions if session[0] in attributed)
+        if enriched:
+            self.db.save_enriched_git_stats(enriched)
+        
+        checked = sum(len(sessions) for sessions in by_repo.values())
+        print(f"Enriched {len(enriched)} of {checked} sessions from {len(by_repo) - len(failed)} repositories "
+              f"in {time.perf_counter() - started:.1f}s")
+        for repo_path in sorted(failed):
+            print(f"   Skipped {repo_path}: not a git repository, no user.email configured, or git failed or timed out")
+    
+    def get_git_stats(self):
+        stats = self.collect_git_stats()
+        return (
+            len(stats),
+            sum(added for added, _ in stats.values()),
+            sum(removed for _, removed in stats.values())
+        )
+    
+    def show_status(self):
+        _print_status(self.current_session)
+    
+    def save_prompt_state(self):
+        today = datetime.datetime.now().strftime('%Y-%m-%d')
+        today_seconds = self.db.execute_query(
+            "SELECT SUM(seconds) FROM rollup_daily WHERE date = ?", (today,), fetch_one=True
+        )[0] or 0
+        goal = self.db.execute_query(
+            "SELECT target_value FROM goals WHERE goal_type = 'daily' AND date = ?", (today,), fetch_one=True
+        )
+        
+        session = self.current_session
+        start_ts = _epoch(datetime.datetime.fromisoformat(session['start_time'])) if session else ''
+        lines = [
+            session['project_name'] if session else '', str(start_ts), today,
+            str(today_seconds), str(goal[0] * 60 if goal else 0)
+        ]
+        _write_state(self.db.db_path, PROMPT_STATE_FILE, lines)
+        return lines
+    
+    def show_prompt(self):
+        lines = _read_state(self.db.db_path, PROMPT_STATE_FILE)
+        if not lines or len(lines) != len(PROMPT_STATE_FIELDS):
+            lines = self.save_prompt_state()
+        print(_format_prompt(lines))
+    
+    def show_stats(self, days=7, tag_filter=None):
+        print(f"Productivity Stats (Last {days} days)" + (f" [{tag_filter}]" if tag_filter else ""))
+        print("=" * 50)
+        
+        sessions = self.db.get_project_totals(days, tag_filter)
+        
+        total_time = 0
+        total_sessions = 0
+        
+        print("\nTop Projects:")
+        for i, (project, duration, count, files, added, removed) in enumerate(sessions[:5], 1):
+            total_time += duration or 0
+            total_sessions += count or 0
+            print(f"  {i}. {project}")
+            print(f"     Time: {self.format_duration(duration or 0)} ({count} sessions)")
+            if files:
+                print(f"     Changes: {files} files, +{added or 0}/-{removed or 0} lines")
+        
+        print(f"\nTotal Coding Time: {self.format_duration(total_time)}")
+        print(f"Total Sessions: {total_sessions}")
+        
+        if total_sessions > 0:
+            avg_session = total_time // total_sessions
+            print(f"Average Session: {self.format_duration(avg_session)}")
+        
+        today_minutes, target_minutes = self.get_today_progress()
+        if target_minutes:
+            progress = min(100, (today_minutes / target_minutes) * 100)
+            print(f"\nToday's Goal: {today_minutes//60}h {today_minutes%60}m / {target_minutes//60}h {target_minutes%60}m ({progress:.1f}%)")
+            print(f"   {'█' * int(progress//5)}{'░' * (20-int(progress//5))} {progress:.1f}%")
+    
+    def get_today_progress(self):
+        today = datetime.datetime.now().strftime('%Y-%m-%d')
+        today_minutes = self.db.execute_query(
+            "SELECT SUM(minutes_coded) FROM activity WHERE date = ?",
+            (today,), fetch=True
+        )[0][0] or 0
+        
+        goals = self.db.execute_query(
+            "SELECT target_value FROM goals WHERE goal_type = 'daily' AND date = ?",
+            (today,), fetch=True
+        )
+        return today_minutes, goals[0][0] if goals else None
+    
+    def create_template(self, name, description="", use_gitignore=False, jobs=None):
+        import sqlite3
+        from pathlib import Path
+        from concurrent.futures import ThreadPoolExecutor
+        
+        current_dir = Path.cwd()
+        
+        if self.db.get_template_id(name) is not None:
+            print(f"Template '{name}' already exists")
+            return
+        
+        ignore_files = IGNORE_FILES + (('.gitignore',) if use_gitignore else ())
+        files = _traced_iter('io', 'template walk', walk_project_files(current_dir, ignore_files=ignore_files))
+        
+        def prepare(item):
+            file_path, relative_path = item
+            try:
+                mode = os.stat(file_path).st_mode & 0o777
+                return relative_path, mode, self.db.prepare_blob(file_path)
+            except OSError:
+                # Deleted or unreadable since the walk
+                return relative_path, None, None
+        
+        workers = jobs or min(32, (os.cpu_count() or 1) + 4)
+        file_count = 0
+        skipped = []
+        try:
+            # Worker threads hash and compress; this thread owns the write
+            # transaction. Memory stays bounded by the in-flight window.
+            with ThreadPoolExecutor(max_workers=workers) as executor, self.db.transaction():
+                template_id = self.db.add_template(name, description)
+                for relative_path, mode, prepared in _bounded_map(executor, prepare, files, workers * 2):
+                    if prepared is None:
+                        skipped.append(relative_path)
+                        continue
+                    sha256, blob = prepared
+                    if blob is not None:
+                        self.db.put_blob(sha256, *blob)
+                    self.db.add_template_file(template_id, relative_path, sha256, mode)
+                    file_count += 1
+        except sqlite3.IntegrityError:
+            print(f"Template '{name}' already exists")
+            return
+        
+        print(f"Template '{name}' created successfully!")
+        print(f"   Files included: {file_count}")
+        if skipped:
+            print(f"   Skipped {len(skipped)} unreadable files, e.g. {skipped[0]}")
+    
+    def use_template(self, name, target_path, link=False, jobs=None):
+        from pathlib import Path
+        from concurrent.futures import ThreadPoolExecutor
+        
+        template_id = self.db.get_template_id(name)
+        
+        if template_id is None:
+            print(f"Template '{name}' not found")
+            return
+        
+        target_dir = Path(target_path)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        
+        def write(entry):
+            full_path, sha256, mode = entry
+            if link:
+                cached = self.db.materialize_blob(sha256, mode)
+                with _traced('io', 'template link'):
+                    if _link_file(cached, full_path):
+                        return True
+            else:
+                data = self.db.read_blob(sha256)
+                with _traced('io', 'template write'):
+                    _unlink_target(full_path)
+                    with open(full_path, 'wb') as f:
+                        f.write(data)
+            if mode is not None:
+                os.chmod(full_path, mode)
+            return False
+        
+        def entries():
+            # Manifest rows are streamed in path order, so each directory
+            # is created once before its files are handed to the writers
+            created_dirs = {target_dir}
+            for file_path, sha256, mode in self.db.iter_template_files(template_id):
+                full_path = target_dir / file_path
+                if full_path.parent not in created_dirs:
+                    with _traced('io', 'template mkdir'):
+                        full_path.parent.mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(full_path.parent)
+                yield full_path, sha256, mode
+        
+        workers = jobs or min(32, (os.cpu_count() or 1) + 4)
+        created_count = 0
+        linked_count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for linked in _bounded_map(executor, write, entries(), workers * 2):
+                created_count += 1
+                linked_count += linked
+        
+        print(f"Template '{name}' applied to {target_path}")
+        print(f"   Created {created_count} files")
+        if linked_count:
+            print(f"   Linked {linked_count} read-only files from blob cache: {self.db.blob_cache_dir}")
+        if link and linked_count < created_count:
+            print(f"   Copied {created_count - linked_count} files that could not be hard-linked")
+    
+    def set_goal(self, goal_type, target_value):
+        today = datetime.datetime.now().strftime('%Y-%m-%d')
+        
+        if goal_type == 'daily':
+            target_minutes = int(float(target_value) * 60)
+        else:
+            target_minutes = target_value
+        
+        self.db.execute_query(
+            "INSERT OR REPLACE INTO goals (goal_type, target_value, date) VALUES (?, ?, ?)",
+            (goal_type, target_minutes, today)
+        )
+        self.save_prompt_state()
+        
+        print(f"{goal_type.title()} goal set: {target_value}{'h' if goal_type == 'daily' else ''}")
+    
+    def show_heatmap(self, weeks=12, project_name=None, tag_filter=None):
+        # The range is the last `weeks` weeks through today, inclusive
+        today = datetime.date.today()
+        first_day = today - datetime.timedelta(weeks=weeks)
+        minutes = self.db.get_daily_series(first_day, weeks * 7 + 1, project_name, tag_filter)
+        thresholds = _quantile_thresholds(minutes)
+        
+        title = f"Activity Heatmap (Last {weeks} weeks)"
+        if project_name:
+            title += f" - {project_name}"
+        if tag_filter:
+            title += f" [{tag_filter}]"
+        low, high = (_format_duration(value * 60) for value in thresholds)
+        sys.stdout.write(
+            f"{title}\n{'=' * 60}\n"
+            + render_heatmap(minutes, first_day, thresholds)
+            + f"\nLegend: ░ No activity  ▒ Under {low}  ▓ Under {high}  █ {high} or more\n"
+        )
+    
+    def get_intensity_char(self, minutes, thresholds=None):
+        return HEATMAP_CHARS[_intensity_level(minutes, thresholds or INTENSITY_THRESHOLDS)]
+    
+    def should_ignore_file(self, file_path):
+        from pathlib import Path
+        
+        parts = Path(file_path).parts
+        return any(_default_ignore_rules().ignored(part, index < len(parts) - 1)
+                   for index, part in enumerate(parts))
+    
+    def format_duration(self, seconds):
+        return _format_duration(seconds)
+    
+    def export_data(self, format_type='json', output=None, compress=False, tables=None, tag_filter=None):
+        # A tag filter limits sessions, notes and tags; other tables are
+        # exported whole
+        if not tables:
+            # CSV holds one table per file, so it defaults to sessions only
+            tables = ['sessions'] if format_type == 'csv' else list(EXPORT_TABLES)
+        unknown = [table for table in tables if table not in EXPORT_TABLES]
+        if unknown:
+            print(f"Unknown table(s): {', '.join(unknown)}. Choose from: {', '.join(EXPORT_TABLES)}")
+            return
+        
+        suffix = '.gz' if compress else ''
+        if output is None:
+            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+            output = f"devflow_export_{timestamp}.{format_type}{suffix}"
+        
+        if format_type == 'csv' and len(tables) > 1:
+            if output == '-':
+                print("CSV output to stdout supports a single table; use --tables")
+                return
+            stem = output[:-3] if output.endswith('.gz') else output
+            stem = stem[:-4] if stem.endswith('.csv') else stem
+            filenames = []
+            for table in tables:
+                filename = f"{stem}_{table}.csv{suffix}"
+                with _open_export(filename, compress) as f:
+                    self._write_csv(f, table, tag_filter)
+                filenames.append(filename)
+            print(f"Data exported to {', '.join(filenames)}")
+            return
+        
+        with _open_export(output, compress) as f:
+            if format_type == 'json':
+                self._write_json(f, tables, tag_filter)
+            elif format_type == 'ndjson':
+                self._write_ndjson(f, tables, tag_filter)
+            elif format_type == 'csv':
+                self._write_csv(f, tables[0], tag_filter)
+        
+        if output != '-':
+            print(f"Data exported to {output}")
+    
+    def _write_csv(self, f, table, tag_filter=None):
+        import csv
+        
+        columns, rows = self.db.iter_table(table, tag_filter)
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    
+    def _write_json(self, f, tables, tag_filter=None):
+        import json
+        
+        f.write('{')
+        for table_index, table in enumerate(tables):
+            columns, rows = self.db.iter_table(table, tag_filter)
+            f.write(f'{"," if table_index else ""}\n  {json.dumps(table)}: [')
+            for row_index, row in enumerate(rows):
+                f.write(f'{"," if row_index else ""}\n    {json.dumps(dict(zip(columns, row)))}')
+            f.write('\n  ]')
+        f.write('\n}\n')
+    
+    def _write_ndjson(self, f, tables, tag_filter=None):
+        import json
+        
+        for table in tables:
+            columns, rows = self.db.iter_table(table, tag_filter)
+            for row in rows:
+                record = {'table': table}
+                record.update(zip(columns, row))
+                f.write(json.dumps(record))
+                f.write('\n')
+
+    def import_data(self, *paths, format_type=None, table=None):
+        # Several files (e.g. one CSV per table) are imported together so
+        # notes and tags can find the sessions they belong to
+        import itertools
+        
+        formats = []
+        for path in paths:
+            formats.append(format_type or _detect_import_format(path))
+            if formats[-1] is None:
+                print(f"Cannot tell the format of '{path}'; pass --format json|csv|ndjson")
+                return
+            if not os.path.exists(path):
+                print(f"File not found: {path}")
+                return
+        
+        counts = self.db.import_records(itertools.chain.from_iterable(
+            _read_import_file(path, file_format, table) for path, file_format in zip(paths, formats)
+        ))
+        
+        print(f"Imported from {', '.join(paths)}")
+        if counts['read_sessions'] or counts['invalid']:
+            print(f"   Sessions: {counts['sessions']} new, {counts['duplicates']} duplicates skipped")
+        for name in ('notes', 'tags', 'goals'):
+            if counts[f'read_{name}']:
+                print(f"   {name.title()}: {counts[name]} new")
+        for name in ('notes', 'tags'):
+            if counts[f'unmatched_{name}']:
+                print(f"   Skipped {counts[f'unmatched_{name}']} {name} whose session is not in this import "
+                      f"(import the sessions file together with it)")
+        if counts['invalid']:
+            print(f"   Skipped {counts['invalid']} incomplete or invalid session rows")
+        if counts['sessions']:
+            print("   Rebuilt activity, rollups, streaks and achievements")
+    
+    def get_current_project_name(self):
+        if self.current_session:
+            return self.current_session['project_name']
+        else:
+            current_dir = os.getcwd()
+            return os.path.basename(current_dir)
+
+    def show_achievements(self, recompute=False):
+        if recompute:
+            awarded = self.db.backfill_achievements(recompute=True)
+            print(f"Recomputed achievements from history: {awarded} awarded")
+        
+        achievements = self.db.get_achievements()
+        
+        print(f"\nAll Achievements:")
+        print("=" * 40)
+        
+        if not achievements:
+            print("No achievements earned yet. Keep coding!")
+            return
+        
+        current_project = None
+        for achievement in achievements:
+            if achievement[4] != current_project:
+                current_project = achievement[4]
+                print(f"\n{current_project}:")
+                print("-" * len(current_project))
+            
+            print(f"🏆 {achievement[1]} - {achievement[2]}")
+            print(f"   Earned: {achievement[3]}")
+            print()
+
+    def add_session_note(self, content):
+        if not self.current_session:
+            print("No active session. Start a session first with 'devflow start'")
+            return
+        
+        self.db.add_note(self.current_session['id'], content)
+        print(f"Note added to current session: {content}")
+
+    def list_notes(self):
+        notes = self.db.get_notes()
+        
+        print("\nRecent Session Notes:")
+        print("=" * 30)
+        
+        if not notes:
+            print("No notes found.")
+            return
+        
+        for note in notes:
+            print(f"Session {note[1]}: {note[2]}")
+            print(f"  Created: {note[3]}")
+            print()
+
+    def search_notes(self, text, project_name=None, since=None, until=None, tags=(), limit=20):
+        highlight = ('\033[1m', '\033[0m') if sys.stdout.isatty() else ('[', ']')
+        results = self.db.search_notes(text, project_name, since, until, tags or (), limit, highlight)
+        
+        print(f"\nNotes matching '{text}':")
+        print("=" * 30)
+        
+        if not results:
+            print("No notes found.")
+            return
+        
+        for note_id, session_id, project, created_at, snippet in results:
+            print(f"Session {session_id} ({project or 'unknown'}), {created_at}:")
+            print(f"  {snippet}")
+            print()
+    
+    def show_weekly_summary(self, project_name=None, tag_filter=None):
+        if not project_name:
+            project_name = self.get_current_project_name()
+        
+        summary = self.db.get_weekly_summary(project_name, tag_filter)
+        
+        print(f"\nWeekly Summary for '{project_name}'" + (f" [{tag_filter}]" if tag_filter else "") + ":")
+        print("=" * 40)
+        print(f"Sessions completed: {summary['session_count']}")
+        print(f"Total time coded: {self.format_duration(summary['total_time'] * 60) if summary['total_time'] else '0m'}")
+        if summary['avg_session']:
+            print(f"Average session: {self.format_duration(summary['avg_session'] * 60)}")
+        print(f"Files changed: {summary['files_changed']}")
+        print(f"Lines added: {summary['lines_added']}")
+        print(f"Lines removed: {summary['lines_removed']}")
+        print(f"Productivity score: {summary['productivity_score']}%")
+        print(f"Current streak: {summary['current_streak']} days")
+
+    def show_streak(self, rebuild=False):
+        if rebuild:
+            runs = self.db.rebuild_streaks()
+            print(f"Rebuilt {len(runs)} streaks from activity history")
+        
+        streak = self.db.get_current_streak()
+        project_name = self.get_current_project_name()
+        project_streak = self.db.get_current_streak(project_name)
+        
+        print(f"\nCoding Streak for '{project_name}':")
+        print("=" * 30)
+        if streak > 0:
+            print(f"🔥 Current streak: {streak} days")
+            print(f"   On this project: {project_streak} days")
+            if streak >= 7:
+                print("Amazing! You're on a roll!")
+            elif streak >= 3:
+                print("Great job! Keep it up!")
+        else:
+            print("No active streak. Start coding to begin a new streak!")
+        print(f"Longest streak: {self.db.get_longest_streak()} days "
+              f"({self.db.get_longest_streak(project_name)} on this project)")
+    
+    def show_productivity_score(self, days=7):
+        project_name = self.get_current_project_name()
+        score = self.db.get_productivity_score(project_name, days)
+        
+        print(f"\nProductivity Score ({days} days):")
+        print("=" * 30)
+        print(f"Project: {project_name}")
+        print(f"Score: {score}%")
+        
+        if score >= 80:
+            print("🌟 Excellent productivity!")
+        elif score >= 60:
+            print("👍 Good productivity!")
+        elif score >= 40:
+            print("📈 Room for improvement!")
+        else:
+            print("💪 Let's get coding!")
+
+    def show_leaderboard(self, tag_filter=None):
+        leaderboard = self.db.get_project_leaderboard(30, tag_filter)
+        
+        print("\nProject Leaderboard (Last 30 days)" + (f" [{tag_filter}]" if tag_filter else "") + ":")
+        print("=" * 45)
+        
+        if not leaderboard:
+            print("No projects found. Start coding to see your projects here!")
+            return
+        
+        for i, (project, sessions, total_min, avg_min, files, lines) in enumerate(leaderboard, 1):
+            print(f"{i}. {project}")
+            print(f"   Time: {self.format_duration(total_min * 60)} ({sessions} sessions)")
+            print(f"   Avg: {self.format_duration(avg_min * 60)} | Files: {files} | Lines: +{lines}")
+            print()
+
+    def add_tag(self, tag_name):
+        if not self.current_session:
+            print("No active session. Start a session first with 'devflow start'")
+            return
+        
+        self.db.add_session_tag(self.current_session['id'], tag_name)
+        print(f"Added tag '{tag_name}' to current session")
+    
+    def list_tags(self, days=None):
+        totals = self.db.get_tag_totals(days)
+        
+        print("\nTags" + (f" (Last {days} days)" if days else "") + ":")
+        print("=" * 30)
+        
+        if not totals:
+            print("No tagged sessions found.")
+            return
+        
+        for tag_name, sessions, seconds in totals:
+            print(f"  {tag_name}: {self.format_duration(seconds)} ({sessions} sessions)")
+    
+    def build_cache(self, full=False):
+        started = time.perf_counter()
+        rows, written, rewritten = self.db.build_session_columns(full)
+        action = 'Rebuilt' if rewritten else 'Updated'
+        print(f"{action} session snapshot in {self.db.snapshot_dir}: {rows} sessions "
+              f"({written} written, {time.perf_counter() - started:.2f}s)")
+    
+    def clear_cache(self):
+        self.db.clear_session_columns()
+        print("Removed session snapshot")
+    
+    def show_team_stats(self, directory, days=7, weeks=12, jobs=None, use_cache=True):
+        cache_path = _state_path(self.db.db_path, TEAM_CACHE_FILE) if use_cache else None
+        stats = collect_team_stats(directory, days, weeks, jobs, cache_path)
+        developers = stats['developers']
+        
+        print(f"Team Stats (Last {days} days, {len(developers)} developers)")
+        print("=" * 50)
+        for developer, error in stats['errors']:
+            print(f"Skipped {developer}: {error}")
+        if not developers:
+            print("No devflow databases found.")
+            return
+        
+        print("\nDevelopers:")
+        for developer, seconds, sessions, streak, longest in developers:
+            print(f"  {developer}: {self.format_duration(seconds)} ({sessions} sessions), "
+                  f"streak {streak} days (longest {longest})")
+        
+        print("\nProject Leaderboard:")
+        for i, (project, seconds, sessions, files, added, removed, people) in enumerate(stats['projects'][:10], 1):
+            print(f"  {i}. {project}")
+            print(f"     Time: {self.format_duration(seconds)} ({sessions} sessions, {people} developers)")
+            if files:
+                print(f"     Changes: {files} files, +{added}/-{removed} lines")
+        
+        total_time = sum(row[1] for row in developers)
+        total_sessions = sum(row[2] for row in developers)
+        print(f"\nTotal Coding Time: {self.format_duration(total_time)}")
+        print(f"Total Sessions: {total_sessions}")
+        
+        minutes = stats['daily']
+        thresholds = _quantile_thresholds(minutes)
+        low, high = (_format_duration(value * 60) for value in thresholds)
+        sys.stdout.write(
+            f"\nTeam Activity (Last {weeks} weeks)\n{'=' * 60}\n"
+            + render_heatmap(minutes, stats['first_day'], thresholds)
+            + f"\nLegend: ░ No activity  ▒ Under {low}  ▓ Under {high}  █ {high} or more\n"
+        )
+        print(f"\nRead {stats['read']} of {len(developers) + len(stats['errors'])} databases; the rest were cached")
+
+    def show_insights(self):
+        project_name = self.get_current_project_name()
+        time_dist = self.db.get_time_distribution(project_name, 7)
+        
+        print(f"\nAdvanced Insights for '{project_name}':")
+        print("=" * 50)
+        
+        # Time distribution analysis
+        if time_dist:
+            print("\nHourly Coding Distribution (Last 7 days):")
+            print("-" * 40)
+            
+            # Find peak hours
+            peak_hour = max(time_dist.items(), key=lambda x: x[1])
+            total_minutes = sum(time_dist.values())
+            
+            for hour in range(24):
+                minutes = time_dist.get(hour, 0)
+                if minutes > 0:
+                    percentage = (minutes / total_minutes) * 100
+                    bar_length = int(percentage / 5)
+                    bar = "█" * bar_length
+                    print(f"{hour:2d}:00 │{bar:<20} {self.format_duration(minutes * 60)} ({percentage:.1f}%)")
+            
+            print(f"\n🔥 Peak productivity: {peak_hour[0]}:00 with {self.format_duration(peak_hour[1] * 60)}")
+            
+            # Productivity insights
+            morning_time = sum(time_dist.get(h, 0) for h in range(6, 12))
+            afternoon_time = sum(time_dist.get(h, 0) for h in range(12, 18))
+            evening_time = sum(time_dist.get(h, 0) for h in range(18, 24))
+            
+            best_period = max([
+                ("Morning", morning_time),
+                ("Afternoon", afternoon_time), 
+                ("Evening", evening_time)
+            ], key=lambda x: x[1])
+            
+            print(f"🌟 Best period: {best_period[0]} ({self.format_duration(best_period[1] * 60)})")
+        else:
+            print("No coding activity in the last 7 days. Start a session to see insights!")
+
+class InotifyWatcher:
+    
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    EVENT = struct.Struct('iIII')
+    
+    def __init__(self, roots):
+        import ctypes
+        import ctypes.util
+        
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        
+        self.mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM |
+                     self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE)
+        self.watches = {}
+        self.rules = {}
+        try:
+            for root in roots:
+                self.rules[root] = _default_ignore_rules().copy()
+                self._watch_tree(root, '')
+        except OSError:
+            self.close()
+            raise
+    
+    def _watch_tree(self, root, relative_dir):
+        self._watch(root, os.path.join(root, relative_dir) if relative_dir else root, relative_dir)
+        for entry, relative_path, is_dir in _scan_project(root, self.rules[root], base=relative_dir):
+            if is_dir:
+                self._watch(root, entry.path, relative_path)
+    
+    def _watch(self, root, path, relative_dir):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.mask)
+        if wd < 0:
+            error = self._ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        self.watches[wd] = (root, relative_dir)
+    
+    def _read_events(self):
+        data = b''
+        while True:
+            try:
+                chunk = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return data
+            if not chunk:
+                return data
+            data += chunk
+    
+    def poll(self, timeout):
+        activity = Counter()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return activity
+        
+        data = self._read_events()
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b'\0'))
+            offset += self.EVENT.size + length
+            
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were dropped; count it as activity everywhere
+                activity.update(self.rules.keys())
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches:
+                continue
+            
+            root, relative_dir = self.watches[wd]
+            relative_path = f"{relative_dir}/{name}" if relative_dir else name
+            is_dir = bool(mask & self.IN_ISDIR)
+            if name and self.rules[root].ignored(relative_path, is_dir):
+                continue
+            if is_dir and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                try:
+                    self._watch_tree(root, relative_path)
+                except OSError:
+                    pass
+            activity[root] += 1
+        return activity
+    
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    
+    def __init__(self, roots):
+        self.roots = list(roots)
+        now = time.time()
+        self.last_scan = {root: now for root in self.roots}
+    
+    def poll(self, timeout):
+        time.sleep(timeout)
+        activity = Counter()
+        for root in self.roots:
+            since = self.last_scan[root]
+            self.last_scan[root] = time.time()
+            # One changed file is enough to mark the project active, so the
+            # walk stops at the first hit instead of stat-ing the whole tree
+            for entry, _, is_dir in _scan_project(root, _default_ignore_rules().copy()):
+                try:
+                    if not is_dir and entry.stat().st_mtime > since:
+                        activity[root] += 1
+                        break
+                except OSError:
+                    continue
+        return activity
+    
+    def close(self):
+        pass
+
+class DevFlowDaemon:
+    
+    def __init__(self, cli, roots, watcher, idle_timeout=15 * 60, flush_interval=60):
+        self.cli = cli
+        self.roots = list(roots)
+        self.watcher = watcher
+        self.idle_timeout = idle_timeout
+        self.flush_interval = flush_interval
+        self.last_activity = {}
+        self.pending = Counter()
+        self.last_flush = None
+        self.auto_root = None
+        self.auto_session_id = None
+    
+    def refresh_session(self):
+        # Another process may have started or stopped a session meanwhile
+        self.cli.current_session = None
+        self.cli.load_current_session()
+        return self.cli.current_session
+    
+    def step(self, activity, now):
+        for root, count in activity.items():
+            self.last_activity[root] = now
+            self.pending[(root, int(now // 60) * 60)] += count
+        
+        if activity:
+            busiest = max(activity, key=activity.get)
+            if busiest != self.auto_root:
+                self.switch_to(busiest, now)
+        elif self.auto_root and now - self.last_activity.get(self.auto_root, now) >= self.idle_timeout:
+            self.stop_auto_session()
+        
+        if self.last_flush is None:
+            self.last_flush = now
+        elif now - self.last_flush >= self.flush_interval:
+            self.flush(now)
+    
+    def switch_to(self, root, now):
+        current = self.refresh_session()
+        if current and current['id'] != self.auto_session_id:
+            # Sessions started by hand are left alone
+            return
+        if current:
+            self.stop_auto_session()
+        
+        self.cli.start_session(os.path.basename(root.rstrip(os.sep)) or root, root,
+                               datetime.datetime.fromtimestamp(now))
+        self.auto_root = root
+        self.auto_session_id = self.cli.current_session['id']
+    
+    def stop_auto_session(self):
+        current = self.refresh_session()
+        if current and current['id'] == self.auto_session_id:
+            last_seen = self.last_activity.get(self.auto_root)
+            self.cli.stop_session(end_dt=datetime.datetime.fromtimestamp(last_seen) if last_seen else None)
+        self.auto_root = None
+        self.auto_session_id = None
+    
+    def flush(self, now=None):
+        if self.pending:
+            rows = [(os.path.basename(root.rstrip(os.sep)) or root, bucket, events)
+                    for (root, bucket), events in self.pending.items()]
+            self.cli.db.record_file_activity(rows)
+            self.pending.clear()
+        self.last_flush = now or time.time()
+    
+    def run(self, poll_interval):
+        try:
+            while True:
+                activity = self.watcher.poll(poll_interval)
+                self.step(activity, time.time())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.flush()
+            if self.auto_root:
+                self.stop_auto_session()
+            self.watcher.close()
+
+def run_daemon(cli, roots, idle_minutes=15, interval=None, use_inotify=True):
+    roots = [os.path.abspath(root) for root in (roots or [os.getcwd()])]
+    watcher = None
+    if use_inotify and sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(roots)
+        except OSError as e:
+            print(f"inotify unavailable ({e}); falling back to polling")
+    if watcher is None:
+        watcher = PollingWatcher(roots)
+        interval = interval or 10
+    
+    print(f"Watching {len(roots)} project(s) with {type(watcher).__name__}; idle timeout {idle_minutes}m")
+    for root in roots:
+        print(f"   {root}")
+    
+    import signal
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    daemon = DevFlowDaemon(cli, roots, watcher, idle_timeout=idle_minutes * 60)
+    daemon.run(interval or 1)
+
+SERVER_FILE = 'server.json'
+
+# Commands the CLI hands to a running `devflow serve` instead of opening
+# SQLite itself. Anything that reads or writes files relative to the
+# caller's working directory stays local.
+SERVER_COMMANDS = {
+    'start', 'stop', 'status', 'stats', 'goals', 'heatmap', 'achievements',
+    'notes', 'streak', 'score', 'leaderboard', 'tags', 'insights'
+}
+# Read-only analytics whose forwarded output the server caches
+SERVER_CACHED_COMMANDS = {'stats', 'heatmap', 'leaderboard'}
+
+class DevFlowServer:
+    
+    def __init__(self, cli, token):
+        self.cli = cli
+        self.token = token
+        self.cache = {}
+        self.data_version = None
+    
+    def sync(self):
+        # data_version changes when another connection (CLI, daemon)
+        # commits, so cached analytics and the session are reloaded
+        connection = self.cli.db.connect()
+        version = connection.execute('PRAGMA data_version').fetchone()[0]
+        if version != self.data_version:
+            self.data_version = version
+            self.cache.clear()
+            self.cli.current_session = None
+            self.cli.load_current_session()
+    
+    def cached(self, key, compute):
+        # Day windows and today's totals move at midnight without a write
+        key = (datetime.date.today(),) + key
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+    
+    def capture(self, func, *args):
+        # Runs a CLI method and returns what it printed; our own writes do
+        # not bump data_version, so total_changes decides invalidation
+        import io
+        from contextlib import redirect_stdout, redirect_stderr
+        
+        connection = self.cli.db.connect()
+        changes = connection.total_changes
+        output = io.StringIO()
+        status = 0
+        with redirect_stdout(output), redirect_stderr(output):
+            try:
+                func(*args)
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 1
+        if connection.total_changes != changes:
+            self.cache.clear()
+        return {'output': output.getvalue(), 'status': status}
+    
+    def handle(self, method, path, body=None, token=None):
+        import hmac
+        from urllib.parse import urlsplit, parse_qs
+        
+        if not token or not hmac.compare_digest(token, self.token):
+            return 401, {'error': 'unauthorized'}
+        
+        url = urlsplit(path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = body or {}
+        self.sync()
+        
+        try:
+            if method == 'GET' and url.path == '/status':
+                return 200, self.status()
+            if method == 'GET' and url.path == '/stats':
+                days = int(params.get('days', 7))
+                return 200, self.cached(('stats', days), lambda: self.stats(days))
+            if method == 'GET' and url.path == '/heatmap':
+                weeks = int(params.get('weeks', 12))
+                project = params.get('project')
+                return 200, self.cached(('heatmap', weeks, project), lambda: self.heatmap(weeks, project))
+            if method == 'GET' and url.path == '/leaderboard':
+                days = int(params.get('days', 30))
+                return 200, self.cached(('leaderboard', days), lambda: self.leaderboard(days))
+            if method == 'POST' and url.path == '/start':
+                result = self.capture(self.cli.start_session, body.get('project'), body.get('path'))
+                return 200, dict(result, session=self.status()['session'])
+            if method == 'POST' and url.path == '/stop':
+                result = self.capture(self.cli.stop_session, not body.get('skip_worktree'))
+                return 200, dict(result, session=self.status()['session'])
+            if method == 'POST' and url.path == '/cli':
+                args = build_parser(body['argv'][0] if body.get('argv') else None).parse_args(body.get('argv', []))
+                if args.command not in SERVER_COMMANDS:
+                    return 400, {'error': f"'{args.command}' must run locally"}
+                if args.command in SERVER_CACHED_COMMANDS:
+                    return 200, self.cached(('cli',) + tuple(body['argv']), lambda: self.capture(run_command, self.cli, args))
+                return 200, self.capture(run_command, self.cli, args)
+        except (KeyError, ValueError, SystemExit) as e:
+            return 400, {'error': str(e) or 'invalid request'}
+        return 404, {'error': 'not found'}
+    
+    def status(self):
+        session = self.cli.current_session
+        if not session:
+            return {'session': None}
+        start_dt = datetime.datetime.fromisoformat(session['start_time'])
+        elapsed = int((datetime.datetime.now() - start_dt).total_seconds())
+        return {'session': dict(session, elapsed=elapsed)}
+    
+    def stats(self, days):
+        columns = ('project_name', 'seconds', 'sessions', 'files_changed', 'lines_added', 'lines_removed')
+        today_minutes, target_minutes = self.cli.get_today_progress()
+        return {
+            'days': days,
+            'projects': [dict(zip(columns, row)) for row in self.cli.db.get_project_totals(days)],
+            'today_minutes': today_minutes,
+            'goal_minutes': target_minutes
+        }
+    
+    def heatmap(self, weeks, project_name=None):
+        start_date = datetime.datetime.now() - datetime.timedelta(weeks=weeks)
+        minutes = self.cli.db.get_daily_minutes(start_date.strftime('%Y-%m-%d'), project_name)
+        return {'weeks': weeks, 'project': project_name, 'minutes': minutes}
+    
+    def leaderboard(self, days):
+        columns = ('project_name', 'sessions', 'total_minutes', 'avg_session_minutes', 'files_changed', 'lines_added')
+        return {'days': days, 'projects': [dict(zip(columns, row)) for row in self.cli.db.get_project_leaderboard(days)]}
+
+def _server_file_path(db_path):
+    return os.path.join(os.path.dirname(str(db_path)), SERVER_FILE)
+
+def run_server(cli, port=0):
+    # A single-threaded server keeps one warm SQLite connection and lets
+    # requests share the cache without locking
+    import json
+    import secrets
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    
+    app = DevFlowServer(cli, secrets.token_hex(16))
+    
+    class RequestHandler(BaseHTTPRequestHandler):
+        
+        def respond(self, method):
+            body = None
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    body = None
+            authorization = self.headers.get('Authorization', '')
+            token = authorization[7:] if authorization.startswith('Bearer ') else None
+            try:
+                status, payload = app.handle(method, self.path, body, token)
+            except Exception as e:
+                # Keep serving; the client gets the error instead of a reset
+                status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+            
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            self.respond('GET')
+        
+        def do_POST(self):
+            self.respond('POST')
+        
+        def log_message(self, format, *args):
+            pass
+    
+    httpd = HTTPServer(('127.0.0.1', port), RequestHandler)
+    server_file = _server_file_path(cli.db.db_path)
+    # The token lets local clients in; keep it readable by this user only
+    fd = os.open(server_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'pid': os.getpid(), 'port': httpd.server_port, 'token': app.token}, f)
+    
+    import signal
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"DevFlow server listening on http://127.0.0.1:{httpd.server_port}")
+    print(f"   Token: {server_file}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        try:
+            os.unlink(server_file)
+        except OSError:
+            pass
+        cli.db.close()
+
+def _forward_to_server(args, argv, db_path=None):
+    # Returns False when no server is reachable so the caller runs the
+    # command itself. Once the request is sent it never falls back: the
+    # server may have applied it, and start, stop, notes and tags are not
+    # safe to repeat.
+    if os.environ.get('DEVFLOW_NO_SERVER'):
+        return False
+    server_file = _server_file_path(db_path or _default_db_path())
+    if not os.path.exists(server_file):
+        return False
+    
+    import json
+    import http.client
+    
+    try:
+        with open(server_file, encoding='utf-8') as f:
+            server = json.load(f)
+        connection = http.client.HTTPConnection('127.0.0.1', server['port'], timeout=GIT_TIMEOUT * 2 + 30)
+        connection.connect()
+    except (OSError, ValueError, KeyError):
+        return False
+    
+    if args.command == 'start' and not args.project:
+        # The server has a different working directory
+        argv = ['start', os.path.basename(os.getcwd()), '--path', os.getcwd()]
+    body = json.dumps({'argv': argv}).encode('utf-8')
+    try:
+        connection.request('POST', '/cli', body, {
+            'Authorization': f"Bearer {server['token']}",
+            'Content-Type': 'application/json'
+        })
+        response = connection.getresponse()
+        result = json.loads(response.read())
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        print(f"DevFlow server error: {type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        connection.close()
+    
+    if response.status != 200:
+        print(f"DevFlow server error: {result.get('error')}", file=sys.stderr)
+        sys.exit(1)
+    print(result['output'], end='')
+    return True
+
+def _add_serve_arguments(parser):
+    parser.add_argument('--port', type=int, default=0, help='Port on 127.0.0.1 (default: any free port)')
+
+def _add_start_arguments(parser):
+    parser.add_argument('project', nargs='?', help='Project name')
+    parser.add_argument('--path', help='Project path')
+
+def _add_stop_arguments(parser):
+    parser.add_argument('--skip-worktree', action='store_true',
+                        help='Only count committed changes (faster on huge repositories)')
+
+def _add_prompt_arguments(parser):
+    parser.add_argument('--shell', choices=list(PROMPT_SNIPPETS),
+                        help='Print a snippet that renders the segment from the shell itself')
+
+def _add_stats_arguments(parser):
+    parser.add_argument('--days', type=int, default=7, help='Number of days to include')
+    _add_tag_filter_arguments(parser)
+
+def _add_template_arguments(parser):
+    template_subparsers = parser.add_subparsers(dest='template_action')
+    
+    create_template_parser = template_subparsers.add_parser('create', help='Create template')
+    create_template_parser.add_argument('name', help='Template name')
+    create_template_parser.add_argument('--description', help='Template description')
+    create_template_parser.add_argument('--gitignore', action='store_true', help='Also honor .gitignore files')
+    create_template_parser.add_argument('--jobs', type=int, help='Number of reader threads')
+    
+    use_template_parser = template_subparsers.add_parser('use', help='Use template')
+    use_template_parser.add_argument('name', help='Template name')
+    use_template_parser.add_argument('path', help='Target path')
+    use_template_parser.add_argument('--link', action='store_true',
+                                     help='Hardlink files from the local blob cache instead of writing them '
+                                          '(linked files are shared, read-only inodes)')
+    use_template_parser.add_argument('--jobs', type=int, help='Number of writer threads')
+
+def _add_goals_arguments(parser):
+    goals_subparsers = parser.add_subparsers(dest='goals_action')
+    
+    set_goal_parser = goals_subparsers.add_parser('set', help='Set goal')
+    set_goal_parser.add_argument('hours', type=float, help='Daily goal in hours')
+
+def _add_tag_filter_arguments(parser):
+    parser.add_argument('--tag', action='append', default=[], help='Only sessions with this tag (repeatable)')
+    parser.add_argument('--without-tag', action='append', default=[], help='Skip sessions with this tag (repeatable)')
+    parser.add_argument('--tag-mode', choices=['all', 'any'], default='all',
+                        help='Whether sessions need all (default) or any of the --tag tags')
+
+def _tag_filter(args):
+    tag_filter = TagFilter(args.tag, args.without_tag, args.tag_mode)
+    return tag_filter if tag_filter else None
+
+def _add_heatmap_arguments(parser):
+    parser.add_argument('--weeks', type=int, default=12, help='Number of weeks to show (e.g. 520 for ten years)')
+    parser.add_argument('--project', help='Only count time on this project')
+    _add_tag_filter_arguments(parser)
+
+def _add_export_arguments(parser):
+    parser.add_argument('format', choices=['json', 'csv', 'ndjson'], default='json', nargs='?')
+    parser.add_argument('--output', '-o', help="Output file, or '-' for stdout")
+    parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+    parser.add_argument('--tables', help=f"Comma-separated tables to export ({', '.join(EXPORT_TABLES)})")
+    _add_tag_filter_arguments(parser)
+
+def _add_import_arguments(parser):
+    parser.add_argument('files', nargs='+', metavar='file',
+                        help='Files to import together (.json, .csv, .ndjson, optionally .gz)')
+    parser.add_argument('--format', choices=['json', 'csv', 'ndjson'], help='Input format (default: from extension)')
+    parser.add_argument('--table', choices=list(EXPORT_TABLES), help='Table a CSV file holds (default: from file name)')
+
+def _add_achievements_arguments(parser):
+    parser.add_argument('--recompute', action='store_true', help='Re-award achievements from the full history')
+
+def _add_notes_arguments(parser):
+    notes_subparsers = parser.add_subparsers(dest='notes_action')
+    add_note_parser = notes_subparsers.add_parser('add', help='Add note to current session')
+    add_note_parser.add_argument('content', help='Note content')
+    notes_subparsers.add_parser('list', help='List recent notes')
+    search_parser = notes_subparsers.add_parser('search', help='Full-text search over notes')
+    search_parser.add_argument('query', nargs='+', help='Words to find (word* matches a prefix)')
+    search_parser.add_argument('--project', help='Only notes from this project')
+    search_parser.add_argument('--since', help='Only notes created on or after YYYY-MM-DD')
+    search_parser.add_argument('--until', help='Only notes created on or before YYYY-MM-DD')
+    search_parser.add_argument('--tag', action='append', help='Only sessions with this tag (repeatable)')
+    search_parser.add_argument('--limit', type=int, default=20)
+
+def _add_summary_arguments(parser):
+    parser.add_argument('--project', help='Project name (default: current project)')
+    _add_tag_filter_arguments(parser)
+
+def _add_leaderboard_arguments(parser):
+    _add_tag_filter_arguments(parser)
+
+def _add_streak_arguments(parser):
+    parser.add_argument('--rebuild', action='store_true', help='Recompute all streaks from activity history')
+
+def _add_score_arguments(parser):
+    parser.add_argument('--days', type=int, default=7, help='Number of days to calculate score for')
+
+def _add_tags_arguments(parser):
+    tags_subparsers = parser.add_subparsers(dest='tags_action')
+    add_tag_parser = tags_subparsers.add_parser('add', help='Add tag to current session')
+    add_tag_parser.add_argument('tag', help='Tag name')
+    list_parser = tags_subparsers.add_parser('list', help='Time and sessions per tag')
+    list_parser.add_argument('--days', type=int, help='Only sessions from the last N days')
+
+def _add_cache_arguments(parser):
+    cache_subparsers = parser.add_subparsers(dest='cache_action')
+    build_cache_parser = cache_subparsers.add_parser('build', help='Create or extend the columnar session snapshot')
+    build_cache_parser.add_argument('--full', action='store_true', help='Rewrite it from scratch')
+    cache_subparsers.add_parser('clear', help='Remove the snapshot')
+
+def _add_enrich_arguments(parser):
+    parser.add_argument('--project', help='Only sessions of this project')
+    parser.add_argument('--jobs', type=int, default=ENRICH_JOBS, help='Git processes to run at once')
+    parser.add_argument('--timeout', type=float, default=ENRICH_TIMEOUT, help='Seconds allowed per repository')
+
+def _add_team_arguments(parser):
+    team_subparsers = parser.add_subparsers(dest='team_action')
+    stats_parser = team_subparsers.add_parser('stats', help="Merge stats from a directory of developers' databases")
+    stats_parser.add_argument('directory', help='Directory searched for *.db files')
+    stats_parser.add_argument('--days', type=int, default=7, help='Number of days to include')
+    stats_parser.add_argument('--weeks', type=int, default=12, help='Weeks shown in the team heatmap')
+    stats_parser.add_argument('--jobs', type=int, help='Number of worker processes')
+    stats_parser.add_argument('--no-cache', action='store_true', help='Re-read every database')
+
+def _add_daemon_arguments(parser):
+    parser.add_argument('roots', nargs='*', help='Project roots to watch (default: current directory)')
+    parser.add_argument('--idle', type=float, default=15, help='Minutes without file activity before stopping')
+    parser.add_argument('--interval', type=float, help='Seconds between polls')
+    parser.add_argument('--poll', action='store_true', help='Use mtime polling instead of inotify')
+
+# command -> (help, function adding its arguments). Only the invoked
+# command's parser is built; the full tree is only needed for --help.
+COMMANDS = {
+    'start': ('Start coding session', _add_start_arguments),
+    'stop': ('Stop coding session', _add_stop_arguments),
+    'status': ('Show session status', None),
+    'prompt': ('Print a compact status segment for shell prompts', _add_prompt_arguments),
+    'stats': ('Show productivity statistics', _add_stats_arguments),
+    'template': ('Template management', _add_template_arguments),
+    'goals': ('Goal management', _add_goals_arguments),
+    'heatmap': ('Show activity heatmap', _add_heatmap_arguments),
+    'export': ('Export data', _add_export_arguments),
+    'import': ('Import data exported by devflow export', _add_import_arguments),
+    'achievements': ('Show earned achievements', _add_achievements_arguments),
+    'notes': ('Session notes management', _add_notes_arguments),
+    'summary': ('Show weekly summary', _add_summary_arguments),
+    'streak': ('Show current coding streak', _add_streak_arguments),
+    'score': ('Show productivity score', _add_score_arguments),
+    'leaderboard': ('Show project leaderboard', _add_leaderboard_arguments),
+    'tags': ('Session tagging', _add_tags_arguments),
+    'insights': ('Show advanced analytics and insights', None),
+    'enrich': ('Backfill git stats for past sessions', _add_enrich_arguments),
+    'cache': ('Columnar session snapshot used by analytics', _add_cache_arguments),
+    'team': ("Aggregate stats across many developers' databases", _add_team_arguments),
+    'daemon': ('Watch project roots and track sessions automatically', _add_daemon_arguments),
+    'serve': ('Serve sessions and analytics over a local HTTP API', _add_serve_arguments),
+}
+
+def build_parser(command=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description='DevFlow CLI - Comprehensive development workflow manager',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  devflow start                    # Start session for current directory
+  devflow start "My Project"       # Start named session
+  devflow stop                     # Stop current session
+  devflow status                   # Show session status
+  devflow stats                    # Show productivity stats
+  devflow template create webapp   # Create template from current dir
+  devflow template use webapp ./new-project  # Use template
+  devflow goals set 4              # Set 4-hour daily goal
+  devflow heatmap                  # Show activity heatmap
+  devflow export json              # Export data to JSON
+  devflow export ndjson -o - | jq  # Stream all tables as NDJSON
+        """
+    )
+    
+    parser.add_argument('--profile', nargs='?', const='text', choices=PROFILE_MODES,
+                        help='Print SQL, git and file I/O timings to stderr at exit (or set DEVFLOW_TRACE)')
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    names = [command] if command in COMMANDS else list(COMMANDS)
+    for name in names:
+        help_text, add_arguments = COMMANDS[name]
+        command_parser = subparsers.add_parser(name, help=help_text)
+        if add_arguments:
+            add_arguments(command_parser)
+    return parser
+
+def run_command(cli, args):
+    if args.command == 'start':
+        cli.start_session(args.project, getattr(args, 'path', None))
+    elif args.command == 'stop':
+        cli.stop_session(not args.skip_worktree)
+    elif args.command == 'status':
+        cli.show_status()
+    elif args.command == 'prompt':
+        cli.show_prompt()
+    elif args.command == 'stats':
+        cli.show_stats(args.days, _tag_filter(args))
+    elif args.command == 'template':
+        if args.template_action == 'create':
+            cli.create_template(args.name, getattr(args, 'description', ''), args.gitignore, args.jobs)
+        elif args.template_action == 'use':
+            cli.use_template(args.name, args.path, args.link, args.jobs)
+    elif args.command == 'goals':
+        if args.goals_action == 'set':
+            cli.set_goal('daily', args.hours)
+    elif args.command == 'heatmap':
+        cli.show_heatmap(args.weeks, args.project, _tag_filter(args))
+    elif args.command == 'export':
+        tables = [table.strip() for table in args.tables.split(',')] if args.tables else None
+        cli.export_data(args.format, args.output, args.gzip, tables, _tag_filter(args))
+    elif args.command == 'import':
+        cli.import_data(*args.files, format_type=args.format, table=args.table)
+    elif args.command == 'achievements':
+        cli.show_achievements(args.recompute)
+    elif args.command == 'notes':
+        if args.notes_action == 'add':
+            cli.add_session_note(args.content)
+        elif args.notes_action == 'list':
+            cli.list_notes()
+        elif args.notes_action == 'search':
+            cli.search_notes(' '.join(args.query), args.project, args.since, args.until, args.tag, args.limit)
+    elif args.command == 'summary':
+        cli.show_weekly_summary(args.project, _tag_filter(args))
+    elif args.command == 'streak':
+        cli.show_streak(args.rebuild)
+    elif args.command == 'score':
+        cli.show_productivity_score(args.days)
+    elif args.command == 'leaderboard':
+        cli.show_leaderboard(_tag_filter(args))
+    elif args.command == 'tags':
+        if args.tags_action == 'add':
+            cli.add_tag(args.tag)
+        elif args.tags_action == 'list':
+            cli.list_tags(args.days)
+    elif args.command == 'insights':
+        cli.show_insights()
+    elif args.command == 'enrich':
+        cli.enrich_sessions(args.project, args.jobs, args.timeout)
+    elif args.command == 'cache':
+        if args.cache_action == 'build':
+            cli.build_cache(args.full)
+        elif args.cache_action == 'clear':
+            cli.clear_cache()
+    elif args.command == 'team':
+        if args.team_action == 'stats':
+            cli.show_team_stats(args.directory, args.days, args.weeks, args.jobs, not args.no_cache)
+    elif args.command == 'daemon':
+        run_daemon(cli, args.roots, args.idle, args.interval, not args.poll)
+    elif args.command == 'serve':
+        run_server(cli, args.port)
+
+def _profile_options(argv):
+    # `--profile [mode]` may appear anywhere on the command line; it is
+    # removed before parsing so every command accepts it
+    mode = os.environ.get('DEVFLOW_TRACE') or None
+    if mode == '0':
+        mode = None
+    elif mode and mode not in PROFILE_MODES:
+        mode = 'text'
+    
+    remaining = []
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        if arg == '--profile':
+            mode = 'text'
+            if index + 1 < len(argv) and argv[index + 1] in PROFILE_MODES:
+                index += 1
+                mode = argv[index]
+        elif arg.startswith('--profile='):
+            mode = arg.split('=', 1)[1]
+            if mode not in PROFILE_MODES:
+                sys.exit(f"devflow: --profile must be one of {', '.join(PROFILE_MODES)}")
+        else:
+            remaining.append(arg)
+        index += 1
+    return remaining, mode
+
+def main(argv=None):
+    global _PROFILER
+    argv = sys.argv[1:] if argv is None else argv
+    argv, mode = _profile_options(argv)
+    if mode is None:
+        return _main(argv)
+    
+    _PROFILER = Profiler(mode)
+    profile = None
+    if mode == 'cprofile':
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+    try:
+        _main(argv, profiling=True)
+    finally:
+        if profile:
+            profile.disable()
+        _PROFILER.write_report()
+        if profile:
+            import pstats
+            print(file=sys.stderr)
+            pstats.Stats(profile, stream=sys.stderr).sort_stats('cumulative').print_stats(30)
+        _PROFILER = None
+
+def _main(argv, profiling=False):
+    if not argv:
+        print("DevFlow CLI - Development Workflow Manager")
+        print("=" * 50)
+        print("Available commands:")
+        print("  start [project]     - Start coding session")
+        print("  stop               - Stop current session")
+        print("  status             - Show session status")
+        print("  prompt [--shell]   - Status segment for shell prompts")
+        print("  stats              - Show productivity stats")
+        print("  template create    - Create project template")
+        print("  template use       - Use project template")
+        print("  goals set <hours>  - Set daily goal")
+        print("  heatmap            - Show activity heatmap")
+        print("  export [format]    - Export data")
+        print("  import <file>      - Import exported data")
+        print("  achievements       - Show earned achievements")
+        print("  notes add <text>   - Add note to session")
+        print("  notes list         - List recent notes")
+        print("  notes search <q>   - Full-text search over notes")
+        print("  summary [project]  - Show weekly summary")
+        print("  streak [--rebuild] - Show coding streak")
+        print("  score [days]       - Show productivity score")
+        print("  leaderboard        - Show project leaderboard")
+        print("  tags add <tag>     - Add tag to current session")
+        print("  tags list          - Time and sessions per tag")
+        print("  insights           - Show advanced analytics")
+        print("  team stats <dir>   - Merge stats from many databases")
+        print("  cache build        - Columnar snapshot for faster analytics")
+        print("  enrich             - Backfill git stats for past sessions")
+        print("  daemon [roots]     - Track sessions from file activity")
+        print("  serve              - Local HTTP API; the CLI uses it when running")
+        print("\n  --profile [text|json|cprofile] - Time SQL, git and file I/O for any command")
+        print("\nUse 'devflow <command> --help' for detailed help")
+        return
+    
+    if argv == ['status']:
+        # Answered from the cached session file when it is current, without
+        # opening SQLite
+        session = _read_session_state(_default_db_path())
+        if session is not False:
+            _print_status(session)
+            return
+    
+    if argv == ['prompt']:
+        lines = _read_state(_default_db_path(), PROMPT_STATE_FILE)
+        if lines and len(lines) == len(PROMPT_STATE_FIELDS):
+            print(_format_prompt(lines))
+            return
+    
+    command = next((arg for arg in argv if not arg.startswith('-')), None)
+    args = build_parser(command).parse_args(argv)
+    if args.command == 'prompt' and args.shell:
+        print(PROMPT_SNIPPETS[args.shell], end='')
+        return
+    
+    # A profiled command runs here rather than in the server process
+    if args.command in SERVER_COMMANDS and not profiling and _forward_to_server(args, argv):
+        return
+    
+    cli = DevFlowCLI()
+    try:
+        run_command(cli, args)
+    finally:
+        cli.close()
+
+if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,72 +1,1087 @@
-# DevFlow CLI Test Suite
-
-import unittest
-import tempfile
-import shutil
-import os
-import sys
-from pathlib import Path
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from devflow import DevFlowDB, DevFlowCLI
-
-class TestDevFlowDB(unittest.TestCase):
-    
-    def setUp(self):
-        self.temp_dir = tempfile.mkdtemp()
-        self.db_path = Path(self.temp_dir) / 'test.db'
-        self.db = DevFlowDB(self.db_path)
-    
-    def tearDown(self):
-        shutil.rmtree(self.temp_dir)
-    
-    def test_database_initialization(self):
-        tables = self.db.execute_query(
-            "SELECT name FROM sqlite_master WHERE type='table'",
-            fetch=True
-        )
-        table_names = [table[0] for table in tables]
-        
-        expected_tables = ['sessions', 'templates', 'goals', 'activity']
-        for table in expected_tables:
-            self.assertIn(table, table_names)
-    
-    def test_session_crud(self):
-        self.db.execute_query(
-            "INSERT INTO sessions (project_name, project_path, start_time) VALUES (?, ?, ?)",
-            ('test-project', '/test/path', '2025-01-01T10:00:00')
-        )
-        
-        sessions = self.db.execute_query(
-            "SELECT project_name FROM sessions WHERE project_name = ?",
-            ('test-project',), fetch=True
-        )
-        
-        self.assertEqual(len(sessions), 1)
-        self.assertEqual(sessions[0][0], 'test-project')
-
-class TestDevFlowCLI(unittest.TestCase):
-    
-    def setUp(self):
-        self.temp_dir = tempfile.mkdtemp()
-        self.db_path = Path(self.temp_dir) / 'test.db'
-        self.cli = DevFlowCLI()
-        self.cli.db = DevFlowDB(self.db_path)
-    
-    def tearDown(self):
-        shutil.rmtree(self.temp_dir)
-    
-    def test_format_duration(self):
-        self.assertEqual(self.cli.format_duration(30), "30s")
-        self.assertEqual(self.cli.format_duration(90), "1m 30s")
-        self.assertEqual(self.cli.format_duration(3661), "1h 1m")
-    
-    def test_intensity_character(self):
-        self.assertEqual(self.cli.get_intensity_char(0), '░')
-        self.assertEqual(self.cli.get_intensity_char(30), '▒')
-        self.assertEqual(self.cli.get_intensity_char(120), '▓')
-        self.assertEqual(self.cli.get_intensity_char(300), '█')
-
-if __name__ == '__main__':
-    unittest.main()
+# DevFlow CLI Test Suite
+
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+import datetime
+import json
+import subprocess
+import time
+import threading
+import csv
+import gzip
+import io
+from contextlib import redirect_stdout
+from unittest import mock
+
+import devflow
+from devflow import (DevFlowDB, DevFlowCLI, DevFlowDaemon, DevFlowServer, IgnoreRules, InotifyWatcher,
+                     PollingWatcher, walk_project_files, SCHEMA_VERSION)
+
+class TestDevFlowDB(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = Path(self.temp_dir) / 'test.db'
+        self.db = DevFlowDB(self.db_path)
+    
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_database_initialization(self):
+        tables = self.db.execute_query(
+            "SELECT name FROM sqlite_master WHERE type='table'",
+            fetch=True
+        )
+        table_names = [table[0] for table in tables]
+        
+        expected_tables = ['sessions', 'templates', 'goals', 'activity']
+        for table in expected_tables:
+            self.assertIn(table, table_names)
+    
+    def test_session_crud(self):
+        self.db.execute_query(
+            "INSERT INTO sessions (project_name, project_path, start_time) VALUES (?, ?, ?)",
+            ('test-project', '/test/path', '2025-01-01T10:00:00')
+        )
+        
+        sessions = self.db.execute_query(
+            "SELECT project_name FROM sessions WHERE project_name = ?",
+            ('test-project',), fetch=True
+        )
+        
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0][0], 'test-project')
+    
+    def test_schema_version_recorded(self):
+        version = self.db.execute_query("PRAGMA user_version", fetch_one=True)[0]
+        self.assertEqual(version, SCHEMA_VERSION)
+    
+    def test_current_schema_skips_ddl(self):
+        self.db.close()
+        statements = []
+        db = DevFlowDB(self.db_path)
+        db.connect().set_trace_callback(statements.append)
+        db.init_database()
+        db.close()
+        self.assertFalse([sql for sql in statements if 'CREATE' in sql.upper()])
+    
+    def test_legacy_database_is_migrated(self):
+        legacy_path = Path(self.temp_dir) / 'legacy.db'
+        conn = sqlite3.connect(str(legacy_path))
+        conn.execute(
+            "CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT NOT NULL, "
+            "project_path TEXT, start_time TIMESTAMP NOT NULL, end_time TIMESTAMP, duration INTEGER, "
+            "files_changed INTEGER DEFAULT 0, lines_added INTEGER DEFAULT 0, lines_removed INTEGER DEFAULT 0, "
+            "active BOOLEAN DEFAULT 1)"
+        )
+        conn.execute(
+            "INSERT INTO sessions (project_name, start_time, end_time, duration, active) VALUES (?, ?, ?, ?, 0)",
+            ('legacy', '2025-01-01T10:00:00', '2025-01-01T11:00:00', 3600)
+        )
+        # Racing starts could leave more than one session active
+        conn.executemany(
+            "INSERT INTO sessions (project_name, start_time) VALUES (?, ?)",
+            [('raced', '2025-01-02T09:00:00'), ('raced', '2025-01-02T09:00:01')]
+        )
+        conn.commit()
+        conn.close()
+        
+        db = DevFlowDB(legacy_path)
+        try:
+            self.assertEqual(db.execute_query("PRAGMA user_version", fetch_one=True)[0], SCHEMA_VERSION)
+            rows = db.execute_query(
+                "SELECT project_name, start_date, end_ts - start_ts FROM sessions WHERE project_name = 'legacy'",
+                fetch=True
+            )
+            self.assertEqual(rows, [('legacy', '2025-01-01', 3600)])
+            active = db.execute_query("SELECT id FROM sessions WHERE active = 1", fetch=True)
+            self.assertEqual(active, [(3,)])
+        finally:
+            db.close()
+    
+    def test_range_queries_use_indexes(self):
+        plan = self.db.execute_query(
+            "EXPLAIN QUERY PLAN SELECT duration FROM sessions WHERE project_name = ? AND start_ts >= ?",
+            ('test-project', 0), fetch=True
+        )
+        self.assertIn('idx_sessions_project_start', ' '.join(row[-1] for row in plan))
+    
+    def test_rollups_split_across_midnight(self):
+        start = datetime.datetime.combine(datetime.date.today(), datetime.time(23, 30)) - datetime.timedelta(days=1)
+        self.db.add_session_rollups('night', int(start.timestamp()), 3600, 2, 10, 1)
+        
+        daily = self.db.execute_query(
+            "SELECT date, seconds, sessions, lines_added FROM rollup_daily ORDER BY date", fetch=True
+        )
+        self.assertEqual(daily, [
+            (start.strftime('%Y-%m-%d'), 1800, 1, 10),
+            (datetime.date.today().strftime('%Y-%m-%d'), 1800, 0, 0),
+        ])
+        self.assertEqual(self.db.get_time_distribution('night', 7), {0: 30, 23: 30})
+    
+    def test_rebuild_rollups_matches_incremental(self):
+        start = datetime.datetime.combine(datetime.date.today(), datetime.time(9, 45))
+        start_ts = int(start.timestamp())
+        self.db.execute_query(
+            "INSERT INTO sessions (project_name, start_time, start_ts, end_ts, duration, lines_added, active) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0)",
+            ('alpha', start.isoformat(), start_ts, start_ts + 5400, 5400, 7)
+        )
+        self.db.add_session_rollups('alpha', start_ts, 5400, 0, 7, 0)
+        incremental = self.db.execute_query("SELECT * FROM rollup_hourly ORDER BY hour", fetch=True)
+        
+        self.db.rebuild_rollups()
+        self.assertEqual(self.db.execute_query("SELECT * FROM rollup_hourly ORDER BY hour", fetch=True), incremental)
+        self.assertEqual(self.db.get_project_leaderboard(30), [('alpha', 1, 90, 90, 0, 7)])
+    
+    def test_legacy_json_templates_move_to_blob_store(self):
+        legacy_path = Path(self.temp_dir) / 'legacy_templates.db'
+        conn = sqlite3.connect(str(legacy_path))
+        conn.execute(
+            "CREATE TABLE templates (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, "
+            "description TEXT, files TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        files = {'README.md': '# hi', 'docs/README.md': '# hi', 'logo.png': 'BINARY_FILE:.png'}
+        conn.execute("INSERT INTO templates (name, files) VALUES (?, ?)", ('legacy', json.dumps(files)))
+        conn.commit()
+        conn.close()
+        
+        db = DevFlowDB(legacy_path)
+        try:
+            template_id = db.get_template_id('legacy')
+            manifest = [(path, db.read_blob(sha256)) for path, sha256, _ in db.iter_template_files(template_id)]
+            self.assertEqual(manifest, [('README.md', b'# hi'), ('docs/README.md', b'# hi')])
+            self.assertEqual(db.execute_query("SELECT COUNT(*) FROM blobs", fetch_one=True)[0], 1)
+        finally:
+            db.close()
+    
+    def test_connection_is_reused(self):
+        self.assertIs(self.db.connect(), self.db.connect())
+        self.assertEqual(self.db.execute_query("PRAGMA journal_mode", fetch_one=True)[0], 'wal')
+    
+    def test_transaction_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction() as cursor:
+                cursor.execute(
+                    "INSERT INTO sessions (project_name, start_time) VALUES (?, ?)",
+                    ('rolled-back', '2025-01-01T10:00:00')
+                )
+                raise RuntimeError('abort')
+        
+        count = self.db.execute_query("SELECT COUNT(*) FROM sessions", fetch_one=True)[0]
+        self.assertEqual(count, 0)
+    
+    def test_nested_transaction_joins_outer(self):
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO sessions (project_name, start_time) VALUES (?, ?)",
+                ('outer', '2025-01-01T10:00:00')
+            )
+            self.db.add_note(cursor.lastrowid, 'inside')
+            self.assertTrue(self.db.connect().in_transaction)
+        
+        self.assertFalse(self.db.connect().in_transaction)
+        self.assertEqual(len(self.db.get_notes()), 1)
+    
+    def test_streaks_are_global_and_per_project(self):
+        days = [('2025-01-01', 'a'), ('2025-01-02', 'b'), ('2025-01-03', 'a'), ('2025-01-05', 'a'),
+                ('2025-01-06', 'b'), ('2025-01-04', 'b')]
+        for date, project_name in days:
+            self.db.execute_query("INSERT INTO activity (date, project_name, minutes_coded) VALUES (?, ?, 30)",
+                                  (date, project_name))
+            self.db.update_streak(project_name, date)
+        
+        query = "SELECT project_name, start_date, end_date, length, active FROM streaks ORDER BY 1, 2"
+        incremental = self.db.execute_query(query, fetch=True)
+        # Switching projects keeps the global streak; the backdated
+        # 2025-01-04 joins the two global runs into one
+        self.assertIn(('', '2025-01-01', '2025-01-06', 6, 1), incremental)
+        self.assertIn(('a', '2025-01-05', '2025-01-05', 1, 1), incremental)
+        self.assertIn(('b', '2025-01-04', '2025-01-04', 1, 0), incremental)
+        self.assertIn(('b', '2025-01-06', '2025-01-06', 1, 1), incremental)
+        
+        self.db.rebuild_streaks()
+        self.assertEqual(self.db.execute_query(query, fetch=True), incremental)
+        self.assertEqual(self.db.get_longest_streak(), 6)
+        self.assertEqual(self.db.get_longest_streak('a'), 1)
+        # Runs that ended before yesterday are not current
+        self.assertEqual(self.db.get_current_streak(), 0)
+    
+    def test_notes_search_ranks_filters_and_falls_back(self):
+        sessions = [('alpha', '2025-01-01'), ('beta', '2025-02-01'), ('alpha', '2025-03-01')]
+        for project_name, date in sessions:
+            self.db.execute_query(
+                "INSERT INTO sessions (project_name, start_time, active) VALUES (?, ?, 0)", (project_name, date)
+            )
+        notes = [(1, 'Fixed the flaky parser test', '2025-01-01 10:00:00'),
+                 (2, 'Parser parser rewrite: 50% faster', '2025-02-01 10:00:00'),
+                 (3, 'Reviewed docs', '2025-03-01 10:00:00')]
+        self.db.execute_query("INSERT INTO notes (session_id, content, created_at) VALUES (?, ?, ?)", notes[0])
+        self.db.execute_query("INSERT INTO tags (session_id, tag_name) VALUES (2, 'perf')")
+        # Notes written before the index existed are backfilled by rebuild
+        self.db.execute_query("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+        for note in notes[1:]:
+            self.db.execute_query("INSERT INTO notes (session_id, content, created_at) VALUES (?, ?, ?)", note)
+        self.db.execute_query("UPDATE notes SET content = 'Reviewed parser docs' WHERE id = 3")
+        
+        results = self.db.search_notes('parser')
+        self.assertEqual([row[0] for row in results][0], 2)
+        self.assertEqual({row[0] for row in results}, {1, 2, 3})
+        self.assertIn('[Parser]', results[0][4])
+        self.assertEqual([row[0] for row in self.db.search_notes('pars*', project_name='alpha', until='2025-02-28')], [1])
+        self.assertEqual([row[0] for row in self.db.search_notes('parser', since='2025-02-01', tags=['perf'])], [2])
+        self.assertEqual([row[0] for row in self.db.search_notes('50%')], [2])
+        self.db.execute_query("DELETE FROM notes WHERE id = 1")
+        self.assertEqual({row[0] for row in self.db.search_notes('flaky')}, set())
+        
+        for name in ('notes_fts_insert', 'notes_fts_delete', 'notes_fts_update'):
+            self.db.execute_query(f"DROP TRIGGER {name}")
+        self.db.execute_query("DROP TABLE notes_fts")
+        results = self.db.search_notes('parser docs')
+        self.assertEqual([(row[0], row[4]) for row in results], [(3, 'Reviewed [parser] [docs]')])
+    
+    def test_tag_filters_use_the_tag_dimension(self):
+        now = devflow._epoch(datetime.datetime.now())
+        for project_name in ('a', 'a', 'b'):
+            self.db.execute_query(
+                "INSERT INTO sessions (project_name, start_time, duration, start_ts, end_ts, active) "
+                "VALUES (?, '2025-01-01T10:00:00', 600, ?, ?, 0)",
+                (project_name, now - 600, now)
+            )
+        self.db.execute_query("INSERT INTO tags (session_id, tag_name) VALUES (1, 'perf'), (1, 'bugfix'), (2, 'perf')")
+        self.db.add_session_tag(3, 'docs')
+        self.db.add_session_tag(3, 'docs')
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM tag_names", fetch_one=True)[0], 3)
+        self.assertEqual(self.db.get_session_tags(1), ['bugfix', 'perf'])
+        self.assertEqual(self.db.get_session_tags(3), ['docs'])
+        
+        def totals(*args, **kwargs):
+            return [(row[0], row[2]) for row in self.db.get_project_totals(7, devflow.TagFilter(*args, **kwargs))]
+        
+        self.assertEqual(totals(['perf']), [('a', 2)])
+        self.assertEqual(totals(['perf', 'bugfix']), [('a', 1)])
+        self.assertEqual(sorted(totals(['bugfix', 'docs'], mode='any')), [('a', 1), ('b', 1)])
+        self.assertEqual(totals(['perf'], without=['bugfix']), [('a', 1)])
+        self.assertEqual(str(devflow.TagFilter(['perf', 'bugfix'], ['docs'], 'any')), 'bugfix or perf, not docs')
+        self.assertEqual({row[0]: row[1] for row in self.db.get_tag_totals(7)}, {'perf': 2, 'bugfix': 1, 'docs': 1})
+        
+        columns, rows = self.db.iter_table('tags', devflow.TagFilter(without=['perf']))
+        self.assertEqual(list(rows), [(3, 'docs')])
+    
+    def test_session_snapshot_matches_rollups(self):
+        midnight = devflow._cutoff_epoch(7)
+        sessions = [('a', midnight - 1800, 3600, 3), ('b', midnight + 600, 600, 1), ('a', midnight + 7200, 60, 0),
+                    ('b', midnight - 86400 * 30, 600, 2)]
+        
+        def add(project_name, start_ts, duration, files):
+            self.db.execute_query(
+                "INSERT INTO sessions (project_name, start_time, start_ts, end_ts, duration, files_changed, "
+                "lines_added, active) VALUES (?, '2025-01-01T10:00:00', ?, ?, ?, ?, ?, 0)",
+                (project_name, start_ts, start_ts + duration, duration, files, files * 10)
+            )
+        
+        def rollup_totals(days):
+            self.db.rebuild_rollups()
+            with mock.patch.object(self.db, 'session_columns', return_value=None):
+                return self.db.get_project_totals(days)
+        
+        for session in sessions:
+            add(*session)
+        self.assertIsNone(self.db.session_columns())
+        self.assertEqual(self.db.build_session_columns(), (4, 4, True))
+        with self.db.session_columns() as columns:
+            self.assertEqual(list(columns.columns['start_ts']), sorted(session[1] for session in sessions))
+        for days in (7, 60):
+            self.assertEqual(self.db.get_project_totals(days), rollup_totals(days))
+        self.assertEqual(self.db.get_project_totals(7), [('a', 1860, 1, 0, 0, 0), ('b', 600, 1, 1, 10, 0)])
+        
+        # Newer sessions are read from SQL until the next build appends them
+        add('c', midnight + 9000, 120, 5)
+        self.assertEqual(self.db.get_project_totals(7), rollup_totals(7))
+        self.assertEqual(self.db.build_session_columns(), (5, 1, False))
+        self.assertEqual(self.db.get_project_leaderboard(7)[0], ('a', 1, 31, 31, 0, 0))
+        
+        # Changing a covered session makes the snapshot stale until rebuilt
+        self.db.execute_query("UPDATE sessions SET duration = 7200 WHERE id = 3")
+        self.assertIsNone(self.db.session_columns())
+        self.assertEqual(self.db.build_session_columns(), (5, 5, True))
+        self.assertEqual(self.db.get_project_totals(7), rollup_totals(7))
+        # Backdated sessions cannot be appended in start order
+        add('d', midnight - 86400 * 90, 60, 0)
+        self.assertEqual(self.db.build_session_columns(), (6, 6, True))
+        self.assertEqual(len([name for name in os.listdir(self.db.snapshot_dir) if name.endswith('.col')]), 6)
+    
+    def test_team_stats_merge_read_only_databases_and_cache_them(self):
+        team_dir = Path(self.temp_dir) / 'team'
+        (team_dir / 'sub').mkdir(parents=True)
+        start_ts = devflow._epoch(datetime.datetime.now()) - 7200
+        for developer, seconds in (('alice', 3600), ('bob', 1800)):
+            db = DevFlowDB(team_dir / f'{developer}.db')
+            db.add_session_rollups('shared', start_ts, seconds, 1, 10, 2)
+            db.close()
+        # An outdated schema is migrated in memory; the file is not changed
+        legacy_path = team_dir / 'sub' / 'carol.db'
+        conn = sqlite3.connect(str(legacy_path))
+        conn.execute(
+            "CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT NOT NULL, "
+            "project_path TEXT, start_time TIMESTAMP NOT NULL, end_time TIMESTAMP, duration INTEGER, "
+            "files_changed INTEGER DEFAULT 0, lines_added INTEGER DEFAULT 0, lines_removed INTEGER DEFAULT 0, "
+            "active BOOLEAN DEFAULT 1)"
+        )
+        start = datetime.datetime.now() - datetime.timedelta(hours=3)
+        conn.execute(
+            "INSERT INTO sessions (project_name, start_time, end_time, duration, active) VALUES (?, ?, ?, ?, 0)",
+            ('solo', start.isoformat(), (start + datetime.timedelta(minutes=10)).isoformat(), 600)
+        )
+        conn.commit()
+        conn.close()
+        (team_dir / 'notes.db').write_text('not a database')
+        
+        cache_path = Path(self.temp_dir) / 'team-cache.json'
+        stats = devflow.collect_team_stats(team_dir, jobs=2, cache_path=cache_path)
+        self.assertEqual(stats['read'], 4)
+        self.assertEqual(stats['projects'], [('shared', 5400, 2, 2, 20, 4, 2), ('solo', 600, 1, 0, 0, 0, 1)])
+        self.assertEqual([row[:3] for row in stats['developers']],
+                         [('alice', 3600, 1), ('bob', 1800, 1), ('sub/carol', 600, 1)])
+        self.assertEqual([name for name, _ in stats['errors']], ['notes'])
+        conn = sqlite3.connect(str(legacy_path))
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 0)
+        conn.close()
+        
+        # Unchanged databases come from the cache; broken ones are retried
+        self.assertEqual(devflow.collect_team_stats(team_dir, jobs=2, cache_path=cache_path)['read'], 1)
+        db = DevFlowDB(team_dir / 'bob.db')
+        db.add_session_rollups('other', start_ts, 60)
+        db.close()
+        stats = devflow.collect_team_stats(team_dir, jobs=2, cache_path=cache_path)
+        self.assertEqual(stats['read'], 2)
+        self.assertEqual(stats['projects'][-1][:3], ('other', 60, 1))
+    
+    def test_profiler_traces_queries_and_plans(self):
+        self.assertEqual(devflow._profile_options(['--profile', 'json', 'stats', '--days', '3']),
+                         (['stats', '--days', '3'], 'json'))
+        self.assertEqual(devflow._profile_options(['stats', '--profile']), (['stats'], 'text'))
+        
+        profiler = devflow.Profiler('json', slow_ms=0)
+        with mock.patch.object(devflow, '_PROFILER', profiler):
+            db = DevFlowDB(Path(self.temp_dir) / 'traced.db')
+            try:
+                for name in ('a', 'b', 'c'):
+                    db.execute_query("INSERT INTO sessions (project_name, start_time, active) VALUES (?, ?, 0)",
+                                     (name, '2025-01-01T10:00:00'))
+                rows = list(db.connect().execute("SELECT project_name FROM sessions WHERE project_name != ?", ('b',)))
+                with devflow._traced('git', 'git diff'):
+                    pass
+            finally:
+                db.close()
+        
+        self.assertEqual(len(rows), 2)
+        report = profiler.report()
+        queries = {entry['sql']: entry for entry in report['queries']}
+        select = queries["SELECT project_name FROM sessions WHERE project_name != ?"]
+        self.assertEqual((select['calls'], select['rows']), (1, 2))
+        self.assertTrue(any('sessions' in line for line in select['plan']))
+        insert = queries["INSERT INTO sessions (project_name, start_time, active) VALUES (?, ?, 0)"]
+        self.assertEqual((insert['calls'], insert['rows']), (3, 3))
+        self.assertEqual(report['spans'][0]['label'], 'git diff')
+        self.assertIn('git', report['categories'])
+
+class TestProjectWalker(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = Path(self.temp_dir)
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+    
+    def write(self, relative_path, content=''):
+        path = self.root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    
+    def test_ignore_rules_follow_gitignore_semantics(self):
+        rules = IgnoreRules(['*.log', '!keep.log', 'build/', '/dist', 'docs/**/*.tmp'])
+        self.assertTrue(rules.ignored('logs/debug.log'))
+        self.assertFalse(rules.ignored('logs/keep.log'))
+        self.assertTrue(rules.ignored('src/build', is_dir=True))
+        self.assertFalse(rules.ignored('src/build'))
+        self.assertTrue(rules.ignored('dist', is_dir=True))
+        self.assertFalse(rules.ignored('src/dist', is_dir=True))
+        self.assertTrue(rules.ignored('docs/a/b/c.tmp'))
+    
+    def test_walker_prunes_ignored_directories(self):
+        self.write('src/app.py')
+        self.write('node_modules/pkg/index.js')
+        self.write('env/pyvenv.cfg')
+        self.write('env/lib/site.py')
+        self.write('cache/data.bin')
+        self.write('src/.devflowignore', 'generated/\n')
+        self.write('src/generated/out.py')
+        self.write('.devflowignore', 'cache/\n')
+        
+        files = sorted(relative for _, relative in walk_project_files(self.root))
+        self.assertEqual(files, ['.devflowignore', 'src/.devflowignore', 'src/app.py'])
+
+class TestDevFlowDaemon(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, 'watched')
+        os.makedirs(os.path.join(self.root, 'node_modules'))
+        self.cli = DevFlowCLI()
+        self.cli.db = DevFlowDB(Path(self.temp_dir) / 'test.db')
+        self.cli.current_session = None
+    
+    def tearDown(self):
+        self.cli.db.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_sessions_follow_activity_and_idle_timeout(self):
+        daemon = DevFlowDaemon(self.cli, [self.root], watcher=None, idle_timeout=600, flush_interval=0)
+        start = datetime.datetime.now().timestamp() - 3600
+        
+        daemon.step({self.root: 3}, start)
+        daemon.step({self.root: 2}, start + 300)
+        self.assertIsNotNone(self.cli.current_session)
+        daemon.step({}, start + 1000)
+        
+        self.assertIsNone(self.cli.current_session)
+        session = self.cli.db.execute_query(
+            "SELECT project_name, active, end_ts FROM sessions", fetch_one=True
+        )
+        self.assertEqual(session, ('watched', 0, int(start + 300)))
+        events = self.cli.db.execute_query("SELECT SUM(events) FROM file_activity", fetch_one=True)[0]
+        self.assertEqual(events, 5)
+    
+    def test_manual_sessions_are_left_alone(self):
+        self.cli.start_session('manual')
+        daemon = DevFlowDaemon(self.cli, [self.root], watcher=None)
+        daemon.step({self.root: 1}, datetime.datetime.now().timestamp())
+        self.assertEqual(self.cli.current_session['project_name'], 'manual')
+    
+    def test_polling_watcher_detects_changes(self):
+        watcher = PollingWatcher([self.root])
+        Path(self.root, 'node_modules', 'ignored.js').write_text('x')
+        self.assertEqual(watcher.poll(0.01), {})
+        
+        Path(self.root, 'main.py').write_text('x')
+        os.utime(os.path.join(self.root, 'main.py'), (time.time() + 5, time.time() + 5))
+        self.assertEqual(watcher.poll(0.01), {self.root: 1})
+    
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is Linux only')
+    def test_inotify_watcher_reports_and_follows_new_directories(self):
+        watcher = InotifyWatcher([self.root])
+        try:
+            Path(self.root, 'node_modules', 'ignored.js').write_text('x')
+            self.assertEqual(watcher.poll(0.05), {})
+            
+            os.makedirs(os.path.join(self.root, 'pkg'))
+            self.assertEqual(watcher.poll(0.5), {self.root: 1})
+            Path(self.root, 'pkg', 'mod.py').write_text('x')
+            self.assertGreater(watcher.poll(0.5)[self.root], 0)
+        finally:
+            watcher.close()
+
+class TestDevFlowCLI(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = Path(self.temp_dir) / 'test.db'
+        self.cli = DevFlowCLI()
+        self.cli.db = DevFlowDB(self.db_path)
+        self.cli.current_session = None
+    
+    def tearDown(self):
+        self.cli.db.close()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_format_duration(self):
+        self.assertEqual(self.cli.format_duration(30), "30s")
+        self.assertEqual(self.cli.format_duration(90), "1m 30s")
+        self.assertEqual(self.cli.format_duration(3661), "1h 1m")
+    
+    def test_stop_session_updates_rollups(self):
+        self.cli.start_session('rollup-project')
+        self.cli.stop_session()
+        
+        row = self.cli.db.execute_query(
+            "SELECT project_name, sessions FROM rollup_daily", fetch_one=True
+        )
+        self.assertEqual(row, ('rollup-project', 1))
+        self.assertIsNone(self.cli.current_session)
+    
+    def test_achievements_follow_session_start_and_match_recompute(self):
+        start = datetime.datetime(2025, 1, 6, 7, 30)
+        with redirect_stdout(io.StringIO()) as output:
+            self.cli.start_session('early', start_dt=start)
+            self.cli.stop_session(end_dt=start + datetime.timedelta(hours=4, minutes=30))
+            self.cli.start_session('early', start_dt=start + datetime.timedelta(days=1, hours=6))
+            self.cli.stop_session(end_dt=start + datetime.timedelta(days=1, hours=7))
+            # Crosses midnight; awards are dated by the start
+            self.cli.start_session('late', start_dt=start + datetime.timedelta(days=2, hours=15, minutes=30))
+            self.cli.stop_session(end_dt=start + datetime.timedelta(days=2, hours=17))
+        
+        # Early Bird is judged by the start time even though it ended at noon
+        self.assertIn('Early Bird', output.getvalue())
+        query = "SELECT project_name, name, earned_date FROM achievements ORDER BY 1, 2"
+        awarded = self.cli.db.execute_query(query, fetch=True)
+        self.assertEqual(awarded, [
+            ('early', 'Early Bird', '2025-01-06'), ('early', 'First Steps', '2025-01-06'),
+            ('early', 'Marathon Coder', '2025-01-06'), ('late', 'First Steps', '2025-01-08'),
+        ])
+        
+        self.assertEqual(self.cli.db.backfill_achievements(recompute=True), 4)
+        self.assertEqual(self.cli.db.execute_query(query, fetch=True), awarded)
+    
+    def test_session_state_file_follows_start_and_stop(self):
+        state_path = Path(self.temp_dir) / 'session'
+        self.cli.start_session('cached-project')
+        self.assertEqual(state_path.read_text().splitlines()[1], 'cached-project')
+        
+        self.cli.stop_session()
+        self.assertEqual(state_path.read_text(), '')
+        
+        # A database written after the cache makes it stale; the next load
+        # from SQLite rewrites it
+        past = time.time() - 10
+        os.utime(state_path, (past, past))
+        self.assertFalse(devflow._session_state_fresh(self.db_path))
+        self.cli.load_current_session()
+        self.assertTrue(devflow._session_state_fresh(self.db_path))
+    
+    def test_status_fast_path_skips_database(self):
+        home = Path(self.temp_dir) / 'home'
+        home.mkdir()
+        with mock.patch.dict(os.environ, {'HOME': str(home)}):
+            self.cli.db.close()
+            self.cli.db = DevFlowDB(devflow._default_db_path())
+            self.cli.start_session('fast-project')
+            
+            output = io.StringIO()
+            with mock.patch('devflow.DevFlowCLI', side_effect=AssertionError), redirect_stdout(output):
+                devflow.main(['status'])
+        self.assertIn('Active Session: fast-project', output.getvalue())
+    
+    def test_prompt_state_tracks_goal_and_session(self):
+        self.cli.set_goal('daily', 2)
+        self.cli.start_session('prompt-project')
+        
+        lines = (Path(self.temp_dir) / 'prompt').read_text().splitlines()
+        self.assertEqual(lines[0], 'prompt-project')
+        self.assertEqual(lines[4], '7200')
+        
+        now = int(lines[1]) + 3725
+        self.assertEqual(devflow._format_prompt(lines, now), 'prompt-project 1:02 1:02/2:00')
+        # Yesterday's totals and goal do not carry over
+        lines[2] = '2000-01-01'
+        self.assertEqual(devflow._format_prompt(lines, now), 'prompt-project 1:02')
+        
+        self.cli.stop_session()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.cli.show_prompt()
+        self.assertTrue(output.getvalue().strip().endswith('/2:00'))
+        
+        # A second goal for today replaces the first
+        self.cli.set_goal('daily', 3)
+        self.assertEqual(self.cli.get_today_progress()[1], 180)
+        self.assertEqual((Path(self.temp_dir) / 'prompt').read_text().splitlines()[4], '10800')
+        self.assertEqual(self.cli.db.execute_query("SELECT COUNT(*) FROM goals", fetch_one=True)[0], 1)
+    
+    def test_server_caches_analytics_until_data_changes(self):
+        server = DevFlowServer(self.cli, 'secret')
+        self.assertEqual(server.handle('GET', '/stats', token='wrong')[0], 401)
+        status, stats = server.handle('GET', '/stats?days=7', token='secret')
+        self.assertEqual((status, stats['projects']), (200, []))
+        
+        # Commits from other connections are picked up via data_version
+        other = sqlite3.connect(self.db_path)
+        other.execute(
+            "INSERT INTO rollup_daily (date, project_name, seconds, sessions) VALUES (?, 'other', 60, 1)",
+            (datetime.datetime.now().strftime('%Y-%m-%d'),)
+        )
+        other.commit()
+        other.close()
+        stats = server.handle('GET', '/stats?days=7', token='secret')[1]
+        self.assertEqual(stats['projects'][0]['project_name'], 'other')
+        
+        result = server.handle('POST', '/cli', {'argv': ['start', 'served']}, token='secret')[1]
+        self.assertIn("Started session for 'served'", result['output'])
+        session = server.handle('GET', '/status', token='secret')[1]['session']
+        self.assertEqual(session['project_name'], 'served')
+        self.assertEqual(server.handle('POST', '/cli', {'argv': ['export']}, token='secret')[0], 400)
+        
+        # Forwarded analytics share the cache, keyed by day
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        
+        class Tomorrow(datetime.date):
+            today = classmethod(lambda cls: tomorrow)
+        
+        with mock.patch.object(self.cli.db, 'get_project_totals', wraps=self.cli.db.get_project_totals) as totals:
+            first = server.handle('POST', '/cli', {'argv': ['stats']}, token='secret')[1]
+            self.assertEqual(server.handle('POST', '/cli', {'argv': ['stats']}, token='secret')[1], first)
+            self.assertEqual(totals.call_count, 1)
+            with mock.patch('datetime.date', Tomorrow):
+                server.handle('POST', '/cli', {'argv': ['stats']}, token='secret')
+            self.assertEqual(totals.call_count, 2)
+    
+    def test_forward_reports_broken_reply_instead_of_running_locally(self):
+        import socket
+        
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        
+        def reply():
+            connection, _ = listener.accept()
+            connection.recv(65536)
+            connection.sendall(b'not http\r\n\r\n')
+            connection.close()
+        
+        thread = threading.Thread(target=reply)
+        thread.start()
+        server_file = Path(self.temp_dir) / devflow.SERVER_FILE
+        server_file.write_text(json.dumps({'pid': 0, 'port': listener.getsockname()[1], 'token': 'secret'}))
+        try:
+            # The server may have added the note already; it is not retried locally
+            argv = ['notes', 'add', 'once']
+            args = devflow.build_parser('notes').parse_args(argv)
+            with mock.patch.dict(os.environ, {'DEVFLOW_NO_SERVER': ''}), \
+                    mock.patch('sys.stderr', io.StringIO()) as stderr, \
+                    self.assertRaises(SystemExit) as exit:
+                devflow._forward_to_server(args, argv, self.db_path)
+        finally:
+            thread.join()
+            listener.close()
+        self.assertEqual(exit.exception.code, 1)
+        self.assertIn('DevFlow server error', stderr.getvalue())
+        
+        # Nothing listening: the command runs locally
+        args = devflow.build_parser('stats').parse_args(['stats'])
+        with mock.patch.dict(os.environ, {'DEVFLOW_NO_SERVER': ''}):
+            self.assertFalse(devflow._forward_to_server(args, ['stats'], self.db_path))
+    
+    def test_concurrent_starts_keep_one_active_session(self):
+        clis = [self.cli]
+        for _ in range(5):
+            cli = DevFlowCLI()
+            cli.db = DevFlowDB(self.db_path)
+            cli.current_session = None
+            clis.append(cli)
+        
+        threads = [threading.Thread(target=cli.start_session, args=(f'racer-{i}',)) for i, cli in enumerate(clis)]
+        with redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for cli in clis[1:]:
+            cli.db.close()
+        
+        active = self.cli.db.execute_query("SELECT id FROM sessions WHERE active = 1", fetch=True)
+        self.assertEqual(len(active), 1)
+        self.assertEqual({cli.current_session['id'] for cli in clis}, {active[0][0]})
+    
+    def test_concurrent_stops_close_the_session_once(self):
+        self.cli.start_session('stopper')
+        clis = []
+        for _ in range(6):
+            cli = DevFlowCLI()
+            cli.db = DevFlowDB(self.db_path)
+            cli.current_session = None
+            cli.load_current_session()
+            clis.append(cli)
+        
+        output = io.StringIO()
+        threads = [threading.Thread(target=cli.stop_session, args=(False,)) for cli in clis]
+        with redirect_stdout(output):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for cli in clis:
+            cli.db.close()
+        
+        self.assertEqual(output.getvalue().count('Stopped session'), 1)
+        self.assertEqual(output.getvalue().count('No active session found'), 5)
+        self.assertEqual(self.cli.db.execute_query("SELECT COUNT(*) FROM sessions WHERE active = 1", fetch_one=True)[0], 0)
+        self.assertEqual(self.cli.db.execute_query("SELECT SUM(sessions) FROM rollup_daily", fetch_one=True)[0], 1)
+    
+    def test_repeated_stops_keep_rollups_equal_to_a_rebuild(self):
+        for round in range(3):
+            self.cli.start_session(f'replayed-{round % 2}')
+            stale = DevFlowCLI()
+            stale.db = self.cli.db
+            stale.current_session = dict(self.cli.current_session)
+            with redirect_stdout(io.StringIO()):
+                self.cli.stop_session(False)
+                # A duplicate or replayed stop of the same session
+                stale.stop_session(False)
+        
+        query = "SELECT * FROM {} ORDER BY 1, 2"
+        incremental = [self.cli.db.execute_query(query.format(table), fetch=True) for table in ('rollup_daily', 'rollup_hourly')]
+        self.cli.db.rebuild_rollups()
+        rebuilt = [self.cli.db.execute_query(query.format(table), fetch=True) for table in ('rollup_daily', 'rollup_hourly')]
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(sum(row[3] for row in rebuilt[0]), 3)
+    
+    def test_template_round_trip_deduplicates_and_keeps_binaries(self):
+        source = Path(self.temp_dir) / 'source'
+        (source / 'a').mkdir(parents=True)
+        (source / 'a' / 'one.txt').write_text('same content\n' * 100)
+        (source / 'two.txt').write_text('same content\n' * 100)
+        (source / 'image.bin').write_bytes(bytes(range(256)))
+        
+        cwd = os.getcwd()
+        os.chdir(source)
+        try:
+            self.cli.create_template('starter')
+        finally:
+            os.chdir(cwd)
+        
+        self.assertEqual(self.cli.db.execute_query("SELECT COUNT(*) FROM blobs", fetch_one=True)[0], 2)
+        
+        target = Path(self.temp_dir) / 'target'
+        self.cli.use_template('starter', str(target))
+        self.assertEqual((target / 'a' / 'one.txt').read_text(), 'same content\n' * 100)
+        self.assertEqual((target / 'image.bin').read_bytes(), bytes(range(256)))
+    
+    def test_create_template_skips_files_that_vanish(self):
+        source = Path(self.temp_dir) / 'source'
+        source.mkdir()
+        (source / 'keep.txt').write_text('kept\n')
+        (source / 'gone.txt').write_text('gone\n')
+        prepare_blob = self.cli.db.prepare_blob
+        
+        def flaky(file_path):
+            if Path(file_path).name == 'gone.txt':
+                raise FileNotFoundError(file_path)
+            return prepare_blob(file_path)
+        
+        cwd = os.getcwd()
+        os.chdir(source)
+        try:
+            with mock.patch.object(self.cli.db, 'prepare_blob', side_effect=flaky), \
+                    redirect_stdout(io.StringIO()) as output:
+                self.cli.create_template('partial')
+        finally:
+            os.chdir(cwd)
+        
+        self.assertIn('Skipped 1 unreadable files', output.getvalue())
+        template_id = self.cli.db.get_template_id('partial')
+        self.assertEqual([row[0] for row in self.cli.db.iter_template_files(template_id)], ['keep.txt'])
+    
+    def test_use_template_link_mode_shares_cached_blobs(self):
+        source = Path(self.temp_dir) / 'source'
+        (source / 'pkg').mkdir(parents=True)
+        (source / 'pkg' / 'module.py').write_text('print("hi")\n')
+        (source / 'run.sh').write_text('#!/bin/sh\n')
+        os.chmod(source / 'run.sh', 0o755)
+        os.chmod(source / 'pkg' / 'module.py', 0o644)
+        
+        cwd = os.getcwd()
+        os.chdir(source)
+        try:
+            self.cli.create_template('linked')
+        finally:
+            os.chdir(cwd)
+        
+        first = Path(self.temp_dir) / 'first'
+        second = Path(self.temp_dir) / 'second'
+        self.cli.use_template('linked', str(first), link=True)
+        with redirect_stdout(io.StringIO()) as output:
+            self.cli.use_template('linked', str(second), link=True)
+        
+        self.assertIn('Linked 2 read-only files', output.getvalue())
+        module = os.stat(second / 'pkg' / 'module.py')
+        self.assertEqual((second / 'pkg' / 'module.py').read_text(), 'print("hi")\n')
+        self.assertGreater(module.st_nlink, 1)
+        self.assertEqual(os.stat(first / 'pkg' / 'module.py').st_ino, module.st_ino)
+        self.assertEqual(module.st_mode & 0o777, 0o444)
+        # Linked files keep their execute bits but not write access
+        self.assertEqual(os.stat(second / 'run.sh').st_mode & 0o777, 0o555)
+    
+    def test_plain_template_over_linked_tree_keeps_cached_blob(self):
+        for name, content in (('ta', 'AAA\n'), ('tb', 'BBB\n')):
+            source = Path(self.temp_dir) / name
+            source.mkdir()
+            (source / 'file.txt').write_text(content)
+            cwd = os.getcwd()
+            os.chdir(source)
+            try:
+                self.cli.create_template(name)
+            finally:
+                os.chdir(cwd)
+        
+        first = Path(self.temp_dir) / 'first'
+        second = Path(self.temp_dir) / 'second'
+        self.cli.use_template('ta', str(first), link=True)
+        self.cli.use_template('ta', str(second), link=True)
+        self.cli.use_template('tb', str(second))
+        
+        self.assertEqual((second / 'file.txt').read_text(), 'BBB\n')
+        self.assertEqual((first / 'file.txt').read_text(), 'AAA\n')
+        cached = [path for path in self.cli.db.blob_cache_dir.rglob('*') if path.is_file()]
+        self.assertEqual([path.read_text() for path in cached], ['AAA\n'])
+    
+    @unittest.skipUnless(shutil.which('git'), 'git is not installed')
+    def test_stop_session_records_git_stats(self):
+        repo = Path(self.temp_dir) / 'repo'
+        repo.mkdir()
+        env = dict(os.environ, GIT_AUTHOR_NAME='t', GIT_AUTHOR_EMAIL='t@t', GIT_COMMITTER_NAME='t', GIT_COMMITTER_EMAIL='t@t')
+        
+        def git(*args):
+            subprocess.run(['git', *args], cwd=repo, env=env, check=True, capture_output=True)
+        
+        git('init', '-q')
+        (repo / 'a.txt').write_text('one\n')
+        git('add', '.')
+        git('commit', '-q', '-m', 'initial')
+        
+        self.cli.start_session('repo', str(repo))
+        (repo / 'a.txt').write_text('one\ntwo\nthree\n')
+        git('commit', '-q', '-am', 'more')
+        (repo / 'b.txt').write_text('new\n')
+        git('add', 'b.txt')
+        (repo / 'a.txt').write_text('two\nthree\n')
+        session_id = self.cli.current_session['id']
+        self.cli.stop_session()
+        
+        row = self.cli.db.execute_query(
+            "SELECT files_changed, lines_added, lines_removed FROM sessions WHERE id = ?",
+            (session_id,), fetch_one=True
+        )
+        self.assertEqual(row, (2, 3, 1))
+        per_file = self.cli.db.execute_query(
+            "SELECT path, lines_added, lines_removed FROM session_file_stats WHERE session_id = ? ORDER BY path",
+            (session_id,), fetch=True
+        )
+        self.assertEqual(per_file, [('a.txt', 2, 1), ('b.txt', 1, 0)])
+        self.assertEqual(self.cli.db.execute_query("SELECT COUNT(*) FROM git_ranges", fetch_one=True)[0], 1)
+    
+    @unittest.skipUnless(shutil.which('git'), 'git is not installed')
+    def test_enrich_attributes_commits_to_past_sessions(self):
+        repo = Path(self.temp_dir) / 'repo'
+        repo.mkdir()
+        start = datetime.datetime(2025, 3, 3, 9, 0)
+        env = dict(os.environ, GIT_AUTHOR_NAME='t', GIT_AUTHOR_EMAIL='t@t', GIT_COMMITTER_NAME='t', GIT_COMMITTER_EMAIL='t@t')
+        
+        def git(*args):
+            subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True, env=env)
+        
+        def commit(minutes, path, content, email='t@t'):
+            (repo / path).write_text(content)
+            date = f'@{int(start.timestamp()) + minutes * 60} +0000'
+            for args in (['add', path], ['commit', '-q', '-m', path]):
+                subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True,
+                               env=dict(env, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date, GIT_AUTHOR_EMAIL=email))
+        
+        git('init', '-q')
+        git('config', 'user.email', 't@t')
+        commit(10, 'a.txt', 'one\ntwo\n')
+        # A teammate's commit and a fetched remote branch are not ours
+        commit(20, 'team.txt', 'theirs\n', email='other@t')
+        git('checkout', '-q', '-b', 'feature')
+        commit(30, 'remote.txt', 'fetched\n')
+        git('update-ref', 'refs/remotes/origin/feature', 'feature')
+        git('checkout', '-q', '-')
+        git('branch', '-q', '-D', 'feature')
+        commit(90, 'b.txt', 'outside\n')
+        commit(130, 'a.txt', 'one\n')
+        commit(140, 'c.txt', 'three\n')
+        
+        first = self.add_completed_session('repo', start.isoformat(), 3600)
+        # Started by name only; the project's recorded path is used
+        second = self.add_completed_session('repo', (start + datetime.timedelta(hours=2)).isoformat(), 3600)
+        gone = self.add_completed_session('gone', start.isoformat(), 3600)
+        self.cli.db.execute_query("UPDATE sessions SET project_path = ? WHERE id = ?", (str(repo), first))
+        self.cli.db.execute_query("UPDATE sessions SET project_path = ? WHERE id = ?",
+                                  (str(Path(self.temp_dir) / 'missing'), gone))
+        self.cli.db.rebuild_rollups()
+        
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.cli.enrich_sessions(jobs=2)
+        self.assertIn('Enriched 2 of 3 sessions from 1 repositories', output.getvalue())
+        self.assertIn('Skipped', output.getvalue())
+        rows = self.cli.db.execute_query(
+            "SELECT id, files_changed, lines_added, lines_removed FROM sessions ORDER BY id", fetch=True
+        )
+        self.assertEqual(rows, [(first, 1, 2, 0), (second, 2, 1, 1), (gone, 0, 0, 0)])
+        per_file = self.cli.db.execute_query(
+            "SELECT path, lines_added, lines_removed FROM session_file_stats WHERE session_id = ? ORDER BY path",
+            (second,), fetch=True
+        )
+        self.assertEqual(per_file, [('a.txt', 0, 1), ('c.txt', 1, 0)])
+        
+        # Rollups were adjusted in place to what a rebuild produces
+        rollups = self.cli.db.execute_query("SELECT * FROM rollup_daily ORDER BY date, project_name", fetch=True)
+        self.cli.db.rebuild_rollups()
+        self.assertEqual(self.cli.db.execute_query("SELECT * FROM rollup_daily ORDER BY date, project_name", fetch=True),
+                         rollups)
+        self.assertEqual([row[:3] for row in self.cli.db.get_sessions_missing_git_stats()],
+                         [(gone, 'gone', str(Path(self.temp_dir) / 'missing'))])
+    
+    def add_completed_session(self, project_name, start_time='2025-01-01T10:00:00', duration=600):
+        start = datetime.datetime.fromisoformat(start_time)
+        end = start + datetime.timedelta(seconds=duration)
+        return self.cli.db.execute_query(
+            """INSERT INTO sessions (project_name, start_time, end_time, start_ts, end_ts, start_date, duration, active)
+               VALUES (?, ?, ?, ?, ?, ?, ?, 0)""",
+            (project_name, start.isoformat(), end.isoformat(), int(start.timestamp()),
+             int(end.timestamp()), start.strftime('%Y-%m-%d'), duration)
+        )
+    
+    def test_csv_export_quotes_fields(self):
+        self.add_completed_session('acme, inc "web"')
+        output = Path(self.temp_dir) / 'sessions.csv'
+        self.cli.export_data('csv', str(output))
+        
+        with open(output, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row['project_name'] for row in rows], ['acme, inc "web"'])
+    
+    def test_ndjson_gzip_export_covers_all_tables(self):
+        session_id = self.add_completed_session('alpha')
+        self.cli.db.add_note(session_id, 'shipped it')
+        self.cli.db.add_session_tag(session_id, 'release')
+        output = Path(self.temp_dir) / 'all.ndjson.gz'
+        self.cli.export_data('ndjson', str(output), compress=True)
+        
+        with gzip.open(output, 'rt') as f:
+            records = [json.loads(line) for line in f]
+        by_table = {record['table']: record for record in records}
+        self.assertEqual(by_table['sessions']['project_name'], 'alpha')
+        self.assertEqual(by_table['notes']['content'], 'shipped it')
+        self.assertEqual(by_table['tags']['tag_name'], 'release')
+    
+    def test_json_export_is_valid(self):
+        self.add_completed_session('alpha')
+        self.add_completed_session('beta', '2025-01-02T10:00:00')
+        output = Path(self.temp_dir) / 'export.json'
+        self.cli.export_data('json', str(output))
+        
+        with open(output) as f:
+            data = json.load(f)
+        self.assertEqual([row['project_name'] for row in data['sessions']], ['beta', 'alpha'])
+        self.assertEqual(data['templates'], [])
+    
+    def test_import_round_trip_deduplicates_and_rebuilds(self):
+        first = self.add_completed_session('alpha', '2025-01-01T10:00:00', 3600)
+        self.add_completed_session('alpha', '2025-01-02T10:00:00', 1800)
+        self.add_completed_session('beta, inc', '2025-01-02T06:00:00', 600)
+        self.cli.db.add_note(first, 'first note')
+        self.cli.db.add_session_tag(first, 'release')
+        export_path = Path(self.temp_dir) / 'export.ndjson.gz'
+        self.cli.export_data('ndjson', str(export_path), compress=True)
+        
+        target = DevFlowDB(Path(self.temp_dir) / 'target.db')
+        try:
+            self.cli.db, source = target, self.cli.db
+            self.cli.import_data(str(export_path))
+            self.cli.import_data(str(export_path))
+            
+            self.assertEqual(target.execute_query("SELECT COUNT(*) FROM sessions", fetch_one=True)[0], 3)
+            note = target.execute_query(
+                "SELECT s.start_time, n.content FROM notes n JOIN sessions s ON s.id = n.session_id", fetch=True
+            )
+            self.assertEqual(note, [('2025-01-01T10:00:00', 'first note')])
+            self.assertEqual(target.execute_query("SELECT COUNT(*) FROM tags", fetch_one=True)[0], 1)
+            self.assertEqual(
+                target.execute_query("SELECT date, minutes_coded FROM activity WHERE project_name = 'alpha' ORDER BY date", fetch=True),
+                [('2025-01-01', 60), ('2025-01-02', 30)]
+            )
+            self.assertEqual(target.execute_query("SELECT SUM(seconds) FROM rollup_daily", fetch_one=True)[0], 6000)
+            self.assertEqual(target.execute_query("SELECT length FROM streaks WHERE active = 1 AND project_name = ''", fetch_one=True)[0], 2)
+            achievements = target.execute_query("SELECT project_name, name FROM achievements ORDER BY 1, 2", fetch=True)
+            self.assertIn(('beta, inc', 'Early Bird'), achievements)
+            self.assertIn(('alpha', 'First Steps'), achievements)
+        finally:
+            self.cli.db = source
+            target.close()
+    
+    def test_import_per_table_csv_export_keeps_notes_and_tags(self):
+        session_id = self.add_completed_session('alpha')
+        self.cli.db.add_note(session_id, 'kept note')
+        self.cli.db.add_session_tag(session_id, 'release')
+        with redirect_stdout(io.StringIO()):
+            self.cli.export_data('csv', str(Path(self.temp_dir) / 'backup.csv'), tables=['sessions', 'notes', 'tags'])
+        files = [str(Path(self.temp_dir) / f'backup_{table}.csv') for table in ('notes', 'tags', 'sessions')]
+        
+        target = DevFlowDB(Path(self.temp_dir) / 'target.db')
+        try:
+            self.cli.db, source = target, self.cli.db
+            # On its own a notes file cannot be matched, which is reported
+            with redirect_stdout(io.StringIO()) as output:
+                self.cli.import_data(files[0])
+            self.assertIn('Skipped 1 notes', output.getvalue())
+            self.assertNotIn('Sessions:', output.getvalue())
+            
+            with redirect_stdout(io.StringIO()) as output:
+                self.cli.import_data(*files)
+            self.assertIn('Notes: 1 new', output.getvalue())
+            self.assertIn('Tags: 1 new', output.getvalue())
+            self.assertEqual(target.get_notes()[0][2], 'kept note')
+            self.assertEqual(target.get_session_tags(1), ['release'])
+        finally:
+            self.cli.db = source
+            target.close()
+    
+    def test_import_csv_sessions(self):
+        path = Path(self.temp_dir) / 'team_sessions.csv'
+        path.write_text(
+            "project_name,start_time,end_time,duration\n"
+            "gamma,2025-03-01T09:00:00,2025-03-01T10:00:00,3600\n"
+            "gamma,2025-03-01T09:00:00,2025-03-01T10:00:00,3600\n"
+            "gamma,last tuesday,2025-03-01T10:00:00,3600\n"
+        )
+        with redirect_stdout(io.StringIO()) as output:
+            self.cli.import_data(str(path))
+        self.assertIn('Sessions: 1 new, 1 duplicates skipped', output.getvalue())
+        self.assertIn('Skipped 1 incomplete or invalid session rows', output.getvalue())
+        rows = self.cli.db.execute_query("SELECT project_name, start_date, end_ts - start_ts FROM sessions", fetch=True)
+        self.assertEqual(rows, [('gamma', '2025-03-01', 3600)])
+    
+    def test_intensity_character(self):
+        self.assertEqual(self.cli.get_intensity_char(0), '░')
+        self.assertEqual(self.cli.get_intensity_char(30), '▒')
+        self.assertEqual(self.cli.get_intensity_char(120), '▓')
+        self.assertEqual(self.cli.get_intensity_char(300), '█')
+        self.assertEqual(self.cli.get_intensity_char(300, (400, 500)), '▒')
+    
+    def test_heatmap_series_and_rendering(self):
+        self.cli.db.execute_query(
+            "INSERT INTO activity (date, project_name, minutes_coded) VALUES "
+            "('2025-03-02', 'a', 10), ('2025-03-02', 'b', 20), ('2025-03-04', 'a', 200), ('2025-03-20', 'a', 5)"
+        )
+        first_day = datetime.date(2025, 3, 1)
+        self.assertEqual(self.cli.db.get_daily_series(first_day, 7), [0, 30, 0, 200, 0, 0, 0])
+        self.assertEqual(self.cli.db.get_daily_series(first_day, 7, 'b'), [0, 20, 0, 0, 0, 0, 0])
+        
+        self.assertEqual(devflow._quantile_thresholds([0, 10, 20, 30, 40, 50, 60]), (30, 50))
+        self.assertEqual(devflow._quantile_thresholds([0, 0]), devflow.INTENSITY_THRESHOLDS)
+        self.assertEqual(devflow._quantile_thresholds([0, 45, 45, 45]), devflow.INTENSITY_THRESHOLDS)
+        
+        # 2025-03-01 is a Saturday, so it is the last cell of the first week
+        lines = devflow.render_heatmap([0, 30, 0, 200, 0, 0, 0, 0], first_day, (60, 180)).split('\n')
+        self.assertEqual(lines[0], '       Mar')
+        self.assertEqual(lines[1], '       ▒')
+        self.assertEqual(lines[3], '       █')
+        self.assertEqual(lines[7], '    ░  ░')
+        
+        lines = devflow.render_heatmap([0] * 7 * 60, first_day, (60, 180)).split('\n')
+        self.assertEqual(lines[0], 'Mar 01, 2025 - Feb 21, 2026')
+        self.assertTrue(lines[10].startswith('Feb 22, 2026 - '))
+
+if __name__ == '__main__':
+    unittest.main()